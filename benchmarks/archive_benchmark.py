@@ -0,0 +1,72 @@
+#!/usr/bin/env python
+# coding=utf-8
+"""
+Time to archive the completed todos at several done/pending ratios: the
+old list.remove loop writing done.txt a line at a time against the single
+partition pass of Todos.archive_done.
+
+Usage: python benchmarks/archive_benchmark.py [LINES ...]
+"""
+
+import os
+import shutil
+import tempfile
+import time
+
+import synthetic
+from todotxt_machine.todo import Todos
+
+RATIOS = [0.01, 0.2, 0.5, 0.9]
+
+
+def lines_with_ratio(count, ratio):
+    """*count* todo lines of which a fraction *ratio*, spread evenly, is completed."""
+    lines = []
+    for index, line in enumerate(synthetic.todo_lines(count)):
+        if line.startswith("x "):
+            line = line[len("x 2014-01-01 "):]
+        if int((index + 1) * ratio) > int(index * ratio):
+            line = "x 2014-01-01 " + line
+        lines.append(line)
+    return lines
+
+
+def remove_loop(todos):
+    with open(todos.archive_path, "a") as donetxt_file:
+        for t in todos.done_items():
+            donetxt_file.write(t.raw + '\n')
+            todos.todo_items.remove(t)
+            todos._unregister(t)
+            t.todos = None
+    todos._order_changed()
+    todos._needs_rewrite = True
+    todos._mutated()
+    todos.save()
+
+
+def timed(function, lines, directory):
+    todos = Todos(lines, os.path.join(directory, "todo.txt"), os.path.join(directory, "done.txt"),
+                  durability='none')
+    start = time.time()
+    function(todos)
+    return time.time() - start
+
+
+def main():
+    directory = tempfile.mkdtemp()
+    try:
+        for count in synthetic.sizes_from_argv([10000, 100000]):
+            print("{0} lines".format(count))
+            for ratio in RATIOS:
+                lines = lines_with_ratio(count, ratio)
+                done = sum(1 for line in lines if line.startswith("x "))
+                old = timed(remove_loop, lines, directory)
+                new = timed(Todos.archive_done, lines, directory)
+                print("  {0:>6} done  list.remove {1:9.1f}ms  partition {2:8.1f}ms  {3:6.1f}x".format(
+                    done, 1000 * old, 1000 * new, old / new))
+    finally:
+        shutil.rmtree(directory)
+
+
+if __name__ == '__main__':
+    main()
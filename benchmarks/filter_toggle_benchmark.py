@@ -0,0 +1,68 @@
+#!/usr/bin/env python
+# coding=utf-8
+"""
+Cost of toggling a context filter on and off: the old body of one TodoWidget
+per item emptied and refilled a widget at a time, the TodoListWalker emptied
+and refilled a todo at a time, and TodoListWalker.replace.
+
+Usage: python benchmarks/filter_toggle_benchmark.py [LINES ...]
+"""
+
+import urwid
+
+import synthetic
+from todotxt_machine.todo import Todos
+from todotxt_machine.urwid_ui import TodoWidget, TodoListWalker
+
+
+class BenchmarkColorscheme(object):
+    focus_map = {}
+
+
+class BenchmarkUI(object):
+    key_bindings = None
+    colorscheme = BenchmarkColorscheme()
+    wrapping = ['clip']
+    border = ['no border']
+    searching = False
+    search_string = ''
+
+
+def toggle_widget_per_item(ui, todos, body):
+    for view in [todos.filter_context("@work"), todos.todo_items]:
+        for i in range(len(body) - 1, -1, -1):
+            body.pop(i)
+        for t in view:
+            body.append(TodoWidget(t, ui.key_bindings, ui.colorscheme, ui))
+
+
+def toggle_one_at_a_time(todos, body):
+    for view in [todos.filter_context("@work"), todos.todo_items]:
+        for i in range(len(body) - 1, -1, -1):
+            body.pop(i)
+        for t in view:
+            body.append(t)
+
+
+def toggle_replace(todos, body):
+    for view in [todos.filter_context("@work"), todos.todo_items]:
+        body.replace(view)
+
+
+def main():
+    ui = BenchmarkUI()
+    for count in synthetic.sizes_from_argv([50000]):
+        todos = Todos(synthetic.todo_lines(count), "todo.txt", None)
+        widgets = urwid.SimpleListWalker([TodoWidget(t, ui.key_bindings, ui.colorscheme, ui) for t in todos.todo_items])
+        walker = TodoListWalker(ui, todos.todo_items)
+        listbox = urwid.ListBox(walker)
+        print("{0} lines, filter on and off".format(count))
+        for name, toggle in [("widget per item", lambda: toggle_widget_per_item(ui, todos, widgets)),
+                             ("lazy, one at a time", lambda: toggle_one_at_a_time(todos, walker)),
+                             ("lazy, replace", lambda: toggle_replace(todos, walker))]:
+            seconds = synthetic.best_of(lambda: (toggle(), listbox.render((80, 40), focus=True)))
+            print("  {0:<20} {1:10.2f}ms".format(name, 1000 * seconds))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,38 @@
+#!/usr/bin/env python
+# coding=utf-8
+"""
+Latency of Todos.insert and Todos.delete near the top of a large file,
+with the order keys against renumbering raw_index on every todo each time
+as the old update_raw_indices() call did. Deletes look the todo up with
+Todos.position() first, like the UI does.
+
+Usage: python benchmarks/insert_benchmark.py [LINES ...]
+"""
+
+import synthetic
+from todotxt_machine.todo import Todos
+
+OPERATIONS = 200
+
+
+def insert_delete(todos, renumber):
+    for n in range(OPERATIONS):
+        todos.insert(1, "Call the plumber @phone", add_creation_date=False)
+        if renumber:
+            todos.update_raw_indices()
+        todos.delete(todos.position(todos[2]))
+        if renumber:
+            todos.update_raw_indices()
+
+
+def main():
+    for count in synthetic.sizes_from_argv([10000, 100000]):
+        print("{0} lines".format(count))
+        for name, renumber in [("renumber all", True), ("order keys", False)]:
+            todos = Todos(synthetic.todo_lines(count), "todo.txt", None)
+            seconds = synthetic.best_of(lambda: insert_delete(todos, renumber), repeat=3)
+            print("  {0:<14} {1:8.3f}ms per insert + delete".format(name, 1000 * seconds / OPERATIONS))
+
+
+if __name__ == '__main__':
+    main()
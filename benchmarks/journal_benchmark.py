@@ -0,0 +1,47 @@
+#!/usr/bin/env python
+# coding=utf-8
+"""
+Cost of saving a single toggle-complete: rewriting the whole todo.txt
+against appending the change to a journal.
+
+Usage: python benchmarks/journal_benchmark.py [LINES ...]
+"""
+
+import os
+import shutil
+import tempfile
+
+import synthetic
+from todotxt_machine.todo import Todos
+from todotxt_machine.journal import Journal
+
+
+def toggle_and_save(todos):
+    todo = todos[len(todos) // 2]
+    if todo.is_complete():
+        todo.incomplete()
+    else:
+        todo.complete()
+    todos.save()
+
+
+def main():
+    directory = tempfile.mkdtemp()
+    try:
+        for count in synthetic.sizes_from_argv([1000, 10000, 100000]):
+            lines = [line + "\n" for line in synthetic.todo_lines(count)]
+            path = os.path.join(directory, "todo.txt")
+            print("{0} lines".format(count))
+            for name, journal in [("rewrite", None), ("journal", Journal(path + ".journal"))]:
+                with open(path, "w") as todo_file:
+                    todo_file.write("".join(lines))
+                items = journal.replay(lines) if journal else lines
+                todos = Todos(items, path, None, durability='fsync', journal=journal)
+                seconds = synthetic.best_of(lambda: toggle_and_save(todos), repeat=20)
+                print("  {0:<8} {1:8.2f}ms per save".format(name, 1000 * seconds))
+    finally:
+        shutil.rmtree(directory)
+
+
+if __name__ == '__main__':
+    main()
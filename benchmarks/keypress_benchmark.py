@@ -0,0 +1,67 @@
+#!/usr/bin/env python
+# coding=utf-8
+"""
+Key throughput of the keystroke handlers: the if/elif chain of
+is_binded_to calls they used to run against a linear scan of the bound keys,
+a dispatch table lookup, and AdvancedEdit.keypress typing into a todo.
+
+Usage: python benchmarks/keypress_benchmark.py [KEYSTROKES ...]
+"""
+
+import random
+
+import synthetic
+from todotxt_machine.keys import KeyBindings
+from todotxt_machine.urwid_ui import AdvancedEdit
+
+UI_BINDS = ['quit', 'top', 'bottom', 'swap-down', 'swap-up', 'change-focus', 'toggle-help',
+            'toggle-toolbar', 'toggle-filter', 'clear-filter', 'toggle-wrapping', 'toggle-borders',
+            'toggle-sorting', 'search', 'search-clear', 'toggle-complete', 'archive', 'delete',
+            'append', 'insert-before', 'insert-after', 'priority-up', 'priority-down', 'save', 'reload']
+EDIT_BINDS = ['edit-home', 'edit-end', 'edit-delete-end', 'edit-paste', 'edit-delete-word',
+              'edit-delete-beginning', 'edit-word-left', 'edit-word-right', 'edit-complete']
+
+
+class BenchmarkUI(object):
+    yanked_text = ''
+
+
+def elif_chain(key_bindings, binds, keys):
+    for key in keys:
+        for bind in binds:
+            if key in key_bindings.getKeyBinding(bind):
+                break
+
+
+def dispatch_table(table, keys):
+    for key in keys:
+        table.get(key)
+
+
+def main():
+    key_bindings = KeyBindings({})
+    rng = random.Random(0)
+    for count in synthetic.sizes_from_argv([100000]):
+        # typing is mostly plain characters that fall through every branch
+        typed = [rng.choice("abcdefghijklmnopqrstuvwxyz @+:-") for _ in range(count)]
+        commands = [rng.choice(['j', 'k', 'x', 'n', 'D', 'f', 'z']) for _ in range(count)]
+        print("{0} keystrokes".format(count))
+        for name, binds, keys in [("keystroke", UI_BINDS, commands), ("edit keypress", EDIT_BINDS, typed)]:
+            table = key_bindings.dispatchTable([(bind, bind) for bind in binds])
+            chain = synthetic.best_of(lambda: elif_chain(key_bindings, binds, keys))
+            lookup = synthetic.best_of(lambda: dispatch_table(table, keys))
+            print("  {0:<14} elif chain {1:12,.0f} keys/s   table {2:12,.0f} keys/s".format(
+                name, count / chain, count / lookup))
+
+        edit = AdvancedEdit(BenchmarkUI(), key_bindings, edit_text="")
+
+        def type_todo():
+            edit.set_edit_text("")
+            for key in typed[:2000]:
+                edit.keypress((80,), key)
+        seconds = synthetic.best_of(type_todo)
+        print("  AdvancedEdit.keypress typing {0:,.0f} keys/s".format(2000 / seconds))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,68 @@
+#!/usr/bin/env python
+# coding=utf-8
+"""
+Bytes per todo for the slotted Todo layout compared with the previous
+layout: a plain instance __dict__ holding string dates, per item tag lists
+and eagerly built highlight markup.
+
+Usage: python benchmarks/memory_benchmark.py [LINES ...]
+"""
+
+import gc
+import tracemalloc
+
+import synthetic
+from todotxt_machine.todo import Todos
+
+
+class DictTodo(object):
+    """The Todo layout from before __slots__ and interning."""
+
+    def __init__(self, line, index, colored):
+        self.raw = line.strip()
+        self.raw_index = index
+        (self.priority, self.contexts, self.projects,
+         self.creation_date, self.due_date, self.completed_date) = Todos.tokenize(line)
+        self.colored = colored
+
+
+def dict_layout(lines):
+    markup = Todos(lines, "todo.txt", None)
+    return [DictTodo(line, index, markup[index].colored) for index, line in enumerate(lines)]
+
+
+def slotted_layout(lines):
+    return Todos(lines, "todo.txt", None)
+
+
+def slotted_layout_rendered(lines):
+    todos = Todos(lines, "todo.txt", None)
+    for t in todos.todo_items:
+        t.colored
+    return todos
+
+
+def allocated(build, lines):
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    result = build(lines)
+    gc.collect()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del result
+    return after - before
+
+
+def main():
+    for count in synthetic.sizes_from_argv([10000, 100000]):
+        lines = synthetic.todo_lines(count)
+        print("{0} lines".format(count))
+        for name, build in [("dict, eager markup", dict_layout),
+                            ("slotted, lazy markup", slotted_layout),
+                            ("slotted, all markup", slotted_layout_rendered)]:
+            print("  {0:<22} {1:>6.0f} bytes/todo".format(name, allocated(build, lines) / float(count)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,47 @@
+#!/usr/bin/env python
+# coding=utf-8
+"""
+Latency of "what next" queries: sorting every pending todo by (overdue,
+priority, due date) against the NextActions index, which answers from its
+priority buckets without a full sort, and what an edit costs the index.
+
+Usage: python benchmarks/next_actions_benchmark.py [LINES ...]
+"""
+
+import time
+from datetime import date
+
+import synthetic
+from todotxt_machine.todo import Todos
+from todotxt_machine.sorting import NextActions, today_ordinal
+
+TODAY = date(2013, 6, 1)
+COUNTS = [10, 100, 1000]
+
+
+def full_sort(todos, count):
+    index = NextActions()
+    today = today_ordinal(TODAY)
+    pending = [t for t in todos.todo_items if not t.is_complete()]
+    return sorted(pending, key=lambda t: index.key(t, today))[:count]
+
+
+def main():
+    for count in synthetic.sizes_from_argv([100000, 1000000]):
+        todos = Todos(synthetic.todo_lines(count), "todo.txt", None)
+        print("{0} lines".format(count))
+        start = time.time()
+        todos.next_action_index()
+        print("  {0:<24} {1:10.2f}ms".format("build index", 1000 * (time.time() - start)))
+        for wanted in COUNTS:
+            assert full_sort(todos, wanted) == todos.next_actions(wanted, TODAY)
+            seconds = synthetic.best_of(lambda: full_sort(todos, wanted), repeat=1)
+            print("  next {0:<5} {1:<12} {2:10.2f}ms".format(wanted, "full sort", 1000 * seconds))
+            seconds = synthetic.best_of(lambda: todos.next_actions(wanted, TODAY), repeat=5)
+            print("  next {0:<5} {1:<12} {2:10.3f}ms".format(wanted, "index", 1000 * seconds))
+        seconds = synthetic.best_of(lambda: todos[count // 2].change_priority('A'), repeat=5)
+        print("  {0:<24} {1:10.3f}ms".format("edit one todo", 1000 * seconds))
+
+
+if __name__ == '__main__':
+    main()
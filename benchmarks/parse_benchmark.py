@@ -0,0 +1,41 @@
+#!/usr/bin/env python
+# coding=utf-8
+"""
+Lines parsed per second by the single pass tokenizer compared with running
+the six static parsers one after another.
+
+Usage: python benchmarks/parse_benchmark.py [LINES ...]
+"""
+
+import synthetic
+from todotxt_machine.todo import Todos
+
+
+def six_regex_parse(lines):
+    for line in lines:
+        Todos.priority(line)
+        Todos.contexts(line)
+        Todos.projects(line)
+        Todos.creation_date(line)
+        Todos.due_date(line)
+        Todos.completed_date(line)
+
+
+def tokenize(lines):
+    for line in lines:
+        Todos.tokenize(line)
+
+
+def main():
+    for count in synthetic.sizes_from_argv([10000, 80000]):
+        lines = synthetic.todo_lines(count)
+        print("{0} lines".format(count))
+        for name, function in [("six regexes", six_regex_parse), ("tokenize", tokenize)]:
+            seconds = synthetic.best_of(lambda: function(lines))
+            print("  {0:<12} {1:>12,.0f} lines/s".format(name, count / seconds))
+        seconds = synthetic.best_of(lambda: Todos(lines, "todo.txt", None))
+        print("  {0:<12} {1:>12,.0f} lines/s".format("Todos()", count / seconds))
+
+
+if __name__ == '__main__':
+    main()
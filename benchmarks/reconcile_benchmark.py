@@ -0,0 +1,50 @@
+#!/usr/bin/env python
+# coding=utf-8
+"""
+Reloading a file in which one line changed: a full reparse with
+Todos.update against Todos.reconcile, which reuses the unchanged Todo
+objects and reports what changed.
+
+Usage: python benchmarks/reconcile_benchmark.py [LINES ...]
+"""
+
+import time
+
+import synthetic
+from todotxt_machine.todo import Todos
+
+
+def one_line_changes(lines):
+    middle = len(lines) // 2
+    edited = list(lines)
+    edited[middle] += " edited"
+    added = list(lines)
+    added.insert(middle, "call the plumber @phone")
+    removed = list(lines)
+    del removed[middle]
+    moved = list(lines)
+    moved.insert(0, moved.pop(middle))
+    return [("edit", edited), ("add", added), ("delete", removed), ("move", moved)]
+
+
+def main():
+    for count in synthetic.sizes_from_argv([100000]):
+        lines = synthetic.todo_lines(count)
+        print("{0} lines, one line changed".format(count))
+        for name, changed in one_line_changes(lines):
+            todos = Todos(lines, "todo.txt", None)
+            start = time.time()
+            todos.update(changed)
+            full = time.time() - start
+
+            todos = Todos(lines, "todo.txt", None)
+            start = time.time()
+            changeset = todos.reconcile(changed)
+            incremental = time.time() - start
+            print("  {0:<7} update {1:8.1f}ms   reconcile {2:8.1f}ms   {3}".format(
+                name, 1000 * full, 1000 * incremental,
+                ", ".join("{0} {1}".format(field, len(getattr(changeset, field))) for field in changeset._fields)))
+
+
+if __name__ == '__main__':
+    main()
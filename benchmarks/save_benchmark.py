@@ -0,0 +1,46 @@
+#!/usr/bin/env python
+# coding=utf-8
+"""
+Latency of Todos.save: the old line at a time write into the open file
+against storage.write_file at each durability level.
+
+Usage: python benchmarks/save_benchmark.py [LINES ...]
+"""
+
+import os
+import shutil
+import tempfile
+
+import synthetic
+from todotxt_machine.todo import Todos
+from todotxt_machine.storage import DURABILITY_LEVELS
+
+
+def save_in_place(todos):
+    with open(todos.file_path, "w") as todotxt_file:
+        for t in todos.todo_items:
+            todotxt_file.write(t.raw + '\n')
+
+
+def main():
+    directory = tempfile.mkdtemp()
+    try:
+        for count in synthetic.sizes_from_argv([1000, 10000, 100000]):
+            todos = Todos(synthetic.todo_lines(count), os.path.join(directory, "todo.txt"), None)
+            print("{0} lines".format(count))
+            seconds = synthetic.best_of(lambda: save_in_place(todos), repeat=5)
+            print("  {0:<22} {1:8.2f}ms".format("in place, per line", 1000 * seconds))
+            for durability in DURABILITY_LEVELS:
+                todos.durability = durability
+
+                def save():
+                    todos.saved_generation = None
+                    todos.save()
+                seconds = synthetic.best_of(save, repeat=5)
+                print("  {0:<22} {1:8.2f}ms".format("atomic, " + durability, 1000 * seconds))
+    finally:
+        shutil.rmtree(directory)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,68 @@
+#!/usr/bin/env python
+# coding=utf-8
+"""
+Per keystroke latency of Todos.search while a query is typed one character
+at a time: a full scan, the character index narrowing the candidates, and a
+SearchSession that only rescans the previous results as the query grows.
+Searches return lazy views, so each is timed both reading every result and
+reading only the first screenful of them.
+
+Usage: python benchmarks/search_benchmark.py [LINES ...]
+"""
+
+import time
+import itertools
+
+import synthetic
+from todotxt_machine.todo import Todos
+from todotxt_machine.search import SearchSession
+
+QUERIES = ["invoice", "+Taxes2014 dentist"]
+SCREEN = 50
+
+
+def full_scan(todos, query):
+    regex = Todos.search_regex(query)
+    return [t for t in todos.todo_items if regex.search(t.raw)]
+
+
+def all_results(results):
+    return len(results)
+
+
+def first_screen(results):
+    return list(itertools.islice(results, SCREEN))
+
+
+def per_keystroke(search, todos, query):
+    timings = []
+    for end in range(1, len(query) + 1):
+        start = time.time()
+        search(todos, query[:end])
+        timings.append(time.time() - start)
+    return timings
+
+
+def main():
+    for count in synthetic.sizes_from_argv([10000, 100000, 1000000]):
+        todos = Todos(synthetic.todo_lines(count), "todo.txt", None)
+        start = time.time()
+        todos.search_index.build(todos.todo_items)
+        print("{0} lines, index built in {1:.3f}s".format(count, time.time() - start))
+        for query in QUERIES:
+            print("  typing {0!r}".format(query))
+            timings = per_keystroke(full_scan, todos, query)
+            print("    {0:<21} mean {1:8.2f}ms  worst {2:8.2f}ms per keystroke".format(
+                "full scan", 1000 * sum(timings) / len(timings), 1000 * max(timings)))
+            for read in [all_results, first_screen]:
+                session = SearchSession(todos)
+                for name, search in [("indexed", Todos.search),
+                                     ("session", lambda todos, query: session.search(query))]:
+                    timings = per_keystroke(lambda todos, query: read(search(todos, query)), todos, query)
+                    name = "{0}, {1}".format(name, read.__name__.replace("_", " "))
+                    print("    {0:<21} mean {1:8.2f}ms  worst {2:8.2f}ms per keystroke".format(
+                        name, 1000 * sum(timings) / len(timings), 1000 * max(timings)))
+
+
+if __name__ == '__main__':
+    main()
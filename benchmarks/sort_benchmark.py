@@ -0,0 +1,43 @@
+#!/usr/bin/env python
+# coding=utf-8
+"""
+Cost of switching sort modes: sorting todo_items in place on every switch
+against a SortedView that is built once and then only read, for a plain
+and a multi-key sort, and of keeping the view up to date through an edit.
+
+Usage: python benchmarks/sort_benchmark.py [LINES ...]
+"""
+
+import time
+
+import synthetic
+from todotxt_machine.todo import Todos
+
+KEYS = [('raw',), ('priority', 'due', 'created', 'project')]
+
+
+def in_place_cycle(todos):
+    todos.sorted()
+    todos.sorted_reverse()
+    todos.sorted_raw()
+
+
+def main():
+    for count in synthetic.sizes_from_argv([10000, 100000]):
+        print("{0} lines".format(count))
+        todos = Todos(synthetic.todo_lines(count), "todo.txt", None)
+        seconds = synthetic.best_of(lambda: in_place_cycle(todos))
+        print("  {0:<34} {1:8.2f}ms per switch".format("in place sort", 1000 * seconds / 3))
+        for keys in KEYS:
+            todos = Todos(synthetic.todo_lines(count), "todo.txt", None)
+            start = time.time()
+            view = todos.sorted_view(keys)
+            print("  {0:<34} {1:8.2f}ms".format("build view " + ",".join(keys), 1000 * (time.time() - start)))
+            seconds = synthetic.best_of(lambda: (view.items(), view.items(reverse=True), todos.todo_items))
+            print("  {0:<34} {1:8.2f}ms per switch".format("  switch", 1000 * seconds / 3))
+            seconds = synthetic.best_of(lambda: todos[count // 2].change_priority('B'), repeat=5)
+            print("  {0:<34} {1:8.2f}ms".format("  edit one todo", 1000 * seconds))
+
+
+if __name__ == '__main__':
+    main()
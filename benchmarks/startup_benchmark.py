@@ -0,0 +1,53 @@
+#!/usr/bin/env python
+# coding=utf-8
+"""
+Time to load todo.txt at startup: a cold start parsing every line, a warm
+start from the parse cache, and a warm start after one line in ten changed.
+
+Usage: python benchmarks/startup_benchmark.py [LINES ...]
+"""
+
+import os
+import shutil
+import tempfile
+
+import synthetic
+from todotxt_machine import cache
+from todotxt_machine.todo import Todos
+
+
+def start(path, use_cache):
+    with open(path, "r") as todotxt_file:
+        lines = todotxt_file.readlines()
+    parse_cache = cache.load(path) if use_cache else None
+    return Todos(lines, path, None, parse_cache=parse_cache)
+
+
+def main():
+    directory = tempfile.mkdtemp()
+    os.environ['XDG_CACHE_HOME'] = os.path.join(directory, "cache")
+    try:
+        for count in synthetic.sizes_from_argv([10000, 100000]):
+            path = os.path.join(directory, "todo.txt")
+            lines = synthetic.todo_lines(count)
+            with open(path, "w") as todotxt_file:
+                todotxt_file.write("".join(line + "\n" for line in lines))
+            print("{0} lines".format(count))
+            cold = synthetic.best_of(lambda: start(path, False))
+            print("  {0:<22} {1:8.1f}ms".format("cold", 1000 * cold))
+            seconds = synthetic.best_of(lambda: cache.store(path, start(path, False)), number=1)
+            print("  {0:<22} {1:8.1f}ms".format("cold + write cache", 1000 * seconds))
+            warm = synthetic.best_of(lambda: start(path, True))
+            print("  {0:<22} {1:8.1f}ms  {2:.1f}x".format("warm", 1000 * warm, cold / warm))
+            changed = synthetic.todo_lines(count, seed=1)
+            with open(path, "w") as todotxt_file:
+                todotxt_file.write("".join((changed[i] if i % 10 == 0 else line) + "\n"
+                                           for i, line in enumerate(lines)))
+            warm = synthetic.best_of(lambda: start(path, True))
+            print("  {0:<22} {1:8.1f}ms  {2:.1f}x".format("warm, 10% changed", 1000 * warm, cold / warm))
+    finally:
+        shutil.rmtree(directory)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,61 @@
+#!/usr/bin/env python
+# coding=utf-8
+"""Helpers shared by the benchmark scripts in this directory."""
+
+import os
+import sys
+import random
+import timeit
+
+# make the in-tree todotxt_machine package importable when a benchmark is
+# run directly, e.g. python benchmarks/parse_benchmark.py
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+WORDS = ["call", "email", "buy", "fix", "write", "review", "plan", "clean", "book",
+         "the", "a", "report", "groceries", "car", "garage", "invoice", "slides",
+         "dentist", "tickets", "notes", "garden", "backup", "server", "taxes"]
+CONTEXTS = ["@phone", "@home", "@work", "@computer", "@errands", "@GroceryStore"]
+PROJECTS = ["+GarageSale", "+Unpacking", "+TodoTxt", "+Taxes2014", "+Garden", "+Website"]
+
+
+def random_date(rng):
+    return "{0:04d}-{1:02d}-{2:02d}".format(rng.randrange(2010, 2016), rng.randrange(1, 13), rng.randrange(1, 29))
+
+
+def todo_line(rng):
+    """Return one todo.txt line with a realistic mix of fields."""
+    parts = []
+    done = rng.random() < 0.2
+    if done:
+        parts.append("x " + random_date(rng))
+    elif rng.random() < 0.4:
+        parts.append("({0})".format(rng.choice("ABCDEF")))
+    if rng.random() < 0.5:
+        parts.append(random_date(rng))
+    parts.extend(rng.choice(WORDS) for _ in range(rng.randrange(3, 10)))
+    if rng.random() < 0.7:
+        parts.append(rng.choice(CONTEXTS))
+    if rng.random() < 0.2:
+        parts.append(rng.choice(CONTEXTS))
+    if rng.random() < 0.6:
+        parts.append(rng.choice(PROJECTS))
+    if rng.random() < 0.3:
+        parts.append("due:" + random_date(rng))
+    return " ".join(parts)
+
+
+def todo_lines(count, seed=0):
+    rng = random.Random(seed)
+    return [todo_line(rng) for _ in range(count)]
+
+
+def best_of(function, repeat=3, number=1):
+    """Best wall clock time in seconds of *number* calls to *function*."""
+    return min(timeit.repeat(function, repeat=repeat, number=number)) / number
+
+
+def sizes_from_argv(default):
+    """Line counts given on the command line, or *default*."""
+    if len(sys.argv) > 1:
+        return [int(arg) for arg in sys.argv[1:]]
+    return default
@@ -17,4 +17,4 @@ __version__ = (2, 2, 2)
 
 version = "%s.%s.%s" % __version__
 
-__all__ = ["cli", "todo", "colorscheme", "urwid_ui", "terminal_operations"]
+__all__ = ["cli", "todo", "search", "sorting", "views", "storage", "journal", "cache", "watch", "colorscheme", "urwid_ui", "terminal_operations"]
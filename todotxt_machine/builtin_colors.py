@@ -0,0 +1,182 @@
+# coding=utf-8
+# Generated from todotxt_machine/colors by running
+#   python -m todotxt_machine.colorscheme
+# edit the files in colors/ and rerun it instead of editing this file.
+
+BUILT_IN_COLORS = {
+    'base16-dark': {
+        'completed': 'h8',
+        'context': 'h4',
+        'creation_date': 'h5',
+        'dialog_background': ',h10',
+        'dialog_color': 'h7,h8',
+        'dialog_shadow': ',h11',
+        'due_date': 'h1',
+        'footer': 'h7,h10',
+        'header': 'h7,h10',
+        'header_file': 'h4,h10',
+        'header_todo_count': 'h4,h10',
+        'header_todo_done_count': 'h2,h10',
+        'header_todo_pending_count': 'h3,h10',
+        'plain': 'h7',
+        'priority_a': 'h1',
+        'priority_b': 'h9',
+        'priority_c': 'h3',
+        'priority_d': 'h2',
+        'priority_e': 'h4',
+        'priority_f': 'h5',
+        'project': 'h9',
+        'search_match': 'h3',
+        'selected': ',h10',
+    },
+    'base16-dark-256': {
+        'completed': 'h8',
+        'context': 'h4',
+        'creation_date': 'h13',
+        'dialog_background': ',h18',
+        'dialog_color': 'h7,h8',
+        'dialog_shadow': ',h19',
+        'due_date': 'h1',
+        'footer': 'h7,h18',
+        'header': 'h7,h18',
+        'header_file': 'h4,h18',
+        'header_todo_count': 'h4,h18',
+        'header_todo_done_count': 'h2,h18',
+        'header_todo_pending_count': 'h3,h18',
+        'plain': 'h7',
+        'priority_a': 'h1',
+        'priority_b': 'h9',
+        'priority_c': 'h3',
+        'priority_d': 'h2',
+        'priority_e': 'h4',
+        'priority_f': 'h13',
+        'project': 'h16',
+        'search_match': 'h3',
+        'selected': ',h18',
+    },
+    'base16-light': {
+        'completed': 'h8',
+        'context': 'h4',
+        'creation_date': 'h5',
+        'dialog_background': ',h13',
+        'dialog_color': 'h11,h7',
+        'dialog_shadow': ',h12',
+        'due_date': 'h1',
+        'footer': 'h11,h13',
+        'header': 'h11,h13',
+        'header_file': 'h4,h13',
+        'header_todo_count': 'h4,h13',
+        'header_todo_done_count': 'h2,h13',
+        'header_todo_pending_count': 'h9,h13',
+        'plain': 'h11',
+        'priority_a': 'h1',
+        'priority_b': 'h9',
+        'priority_c': 'h3',
+        'priority_d': 'h2',
+        'priority_e': 'h4',
+        'priority_f': 'h5',
+        'project': 'h14',
+        'search_match': 'h3',
+        'selected': ',h13',
+    },
+    'base16-light-256': {
+        'completed': 'h8',
+        'context': 'h4',
+        'creation_date': 'h13',
+        'dialog_background': ',h21',
+        'dialog_color': 'h19,h7',
+        'dialog_shadow': ',h20',
+        'due_date': 'h1',
+        'footer': 'h19,h21',
+        'header': 'h19,h21',
+        'header_file': 'h4,h21',
+        'header_todo_count': 'h4,h21',
+        'header_todo_done_count': 'h2,h21',
+        'header_todo_pending_count': 'h16,h21',
+        'plain': 'h19',
+        'priority_a': 'h1',
+        'priority_b': 'h9',
+        'priority_c': 'h3',
+        'priority_d': 'h2',
+        'priority_e': 'h4',
+        'priority_f': 'h13',
+        'project': 'h17',
+        'search_match': 'h3',
+        'selected': ',h21',
+    },
+    'default': {
+        'completed': 'h59',
+        'context': 'h39',
+        'creation_date': 'h135',
+        'dialog_background': ',h248',
+        'dialog_color': ',h240',
+        'dialog_shadow': ',h238',
+        'due_date': 'h161',
+        'footer': 'h39,h235',
+        'header': 'h250,h235',
+        'header_file': 'h48,h235',
+        'header_todo_count': 'h39,h235',
+        'header_todo_done_count': 'h156,h235',
+        'header_todo_pending_count': 'h228,h235',
+        'plain': 'h250',
+        'priority_a': 'h167',
+        'priority_b': 'h173',
+        'priority_c': 'h185',
+        'priority_d': 'h77',
+        'priority_e': 'h80',
+        'priority_f': 'h62',
+        'project': 'h214',
+        'search_match': 'h222,h235',
+        'selected': ',h238',
+    },
+    'solarized-dark': {
+        'completed': 'h10',
+        'context': 'h4',
+        'creation_date': 'h13',
+        'dialog_background': ',h11',
+        'dialog_color': 'h7,h8',
+        'dialog_shadow': ',h10',
+        'due_date': 'h1',
+        'footer': 'h12,h0',
+        'header': 'h12,h0',
+        'header_file': 'h4,h0',
+        'header_todo_count': 'h4,h0',
+        'header_todo_done_count': 'h2,h0',
+        'header_todo_pending_count': 'h3,h0',
+        'plain': 'h12',
+        'priority_a': 'h1',
+        'priority_b': 'h9',
+        'priority_c': 'h3',
+        'priority_d': 'h2',
+        'priority_e': 'h4',
+        'priority_f': 'h13',
+        'project': 'h3',
+        'search_match': 'h3',
+        'selected': ',h0',
+    },
+    'solarized-light': {
+        'completed': 'h10',
+        'context': 'h4',
+        'creation_date': 'h13',
+        'dialog_background': ',h7',
+        'dialog_color': 'h8,h15',
+        'dialog_shadow': ',h11',
+        'due_date': 'h1',
+        'footer': 'h12,h7',
+        'header': 'h12,h7',
+        'header_file': 'h4,h7',
+        'header_todo_count': 'h4,h7',
+        'header_todo_done_count': 'h2,h7',
+        'header_todo_pending_count': 'h3,h7',
+        'plain': 'h12',
+        'priority_a': 'h1',
+        'priority_b': 'h9',
+        'priority_c': 'h3',
+        'priority_d': 'h2',
+        'priority_e': 'h4',
+        'priority_f': 'h13',
+        'project': 'h3',
+        'search_match': 'h3',
+        'selected': ',h7',
+    },
+}
@@ -0,0 +1,89 @@
+#!/usr/bin/env python
+# coding=utf-8
+import os
+import marshal
+import hashlib
+
+from todotxt_machine.storage import write_file
+
+# bump whenever the layout of Todo.parsed changes
+CACHE_VERSION = 1
+
+
+def cache_directory():
+    base = os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(base, "todotxt-machine")
+
+
+def cache_path(file_path):
+    """Where the parse cache of the todo.txt at *file_path* is kept."""
+    name = hashlib.sha1(os.path.abspath(file_path).encode('utf-8')).hexdigest()
+    return os.path.join(cache_directory(), name + ".cache")
+
+
+def _stat(file_path):
+    try:
+        st = os.stat(file_path)
+    except OSError:
+        return None, None
+    return st.st_size, getattr(st, 'st_mtime_ns', st.st_mtime)
+
+
+def _read(file_path):
+    try:
+        with open(cache_path(file_path), "rb") as cache_file:
+            data = marshal.loads(cache_file.read())
+    except Exception:
+        # unreadable or damaged, only a cache
+        return None
+    if (not isinstance(data, dict) or data.get('version') != CACHE_VERSION
+            or data.get('path') != os.path.abspath(file_path)
+            or not isinstance(data.get('items'), dict)):
+        return None
+    return data
+
+
+def load(file_path):
+    """
+    Return the parsed fields cached for the todo.txt at *file_path*, a dict
+    of Todo.parsed tuples by raw text for Todos(parse_cache=...). Lines are
+    looked up by their full text, so after the file changed the lines that
+    are still the same are reused and only the others get parsed. An empty
+    dict if there is no usable cache; this never raises.
+    """
+    data = _read(file_path)
+    if data is None:
+        return {}
+    return data['items']
+
+
+def store(file_path, todos, file_hash=None):
+    """
+    Cache the parsed fields of *todos*, read from or just written to
+    *file_path* with contents *file_hash*. Nothing is written if the cache
+    already describes the file as it is (same size, mtime and hash).
+    Returns True if the cache was written.
+    """
+    size, mtime = _stat(file_path)
+    data = _read(file_path)
+    if (data is not None and file_hash is not None and data.get('hash') == file_hash
+            and (data.get('size'), data.get('mtime')) == (size, mtime)):
+        return False
+    items = todos.parse_cache_entries()
+    data = {
+        'version': CACHE_VERSION,
+        'path': os.path.abspath(file_path),
+        'size': size,
+        'mtime': mtime,
+        'hash': file_hash,
+        'items': items,
+    }
+    path = cache_path(file_path)
+    try:
+        if not os.path.isdir(os.path.dirname(path)):
+            os.makedirs(os.path.dirname(path))
+        write_file(path, marshal.dumps(data), durability='none')
+    except (IOError, OSError):
+        # only a cache, the next start will just be slower
+        return False
+    return True
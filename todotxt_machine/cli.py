@@ -20,47 +20,14 @@ Options:
 import sys
 import os
 import random
-import threading
 from collections import OrderedDict
 from docopt import docopt
 
 import todotxt_machine
-from todotxt_machine.todo import Todos
-from todotxt_machine.urwid_ui import UrwidUI
-from todotxt_machine.colorscheme import ColorScheme
-from todotxt_machine.keys import KeyBindings
 
-
-# Import the correct version of configparser
-if sys.version_info[0] >= 3:
-    import configparser
-    config_parser_module = configparser
-elif sys.version_info[0] < 3:
-    import ConfigParser
-    config_parser_module = ConfigParser
-
-
-autosave_lock = threading.Lock()
-
-
-def autosave():
-    if not enable_autosave:
-        return
-
-    # print "autosaving..."
-    with autosave_lock:
-        # view.save_todos() # TODO: Saved message isn't displayed, need to force redraw urwid ui?
-        view.todos.save()
-
-    # Check the flag once again, as the flag may have been set
-    # after the last check but before this statement is executed.
-    if enable_autosave:
-        global timer
-        timer = threading.Timer(30.0, autosave)
-        timer.start()
-
-
-timer = threading.Timer(30.0, autosave)
+# The rest of todotxt_machine, urwid in particular, is imported in main()
+# only once it is clear the UI is going to start, so --version, --help and
+# --show-default-bindings return straight away.
 
 
 def exit_with_error(message):
@@ -89,9 +56,10 @@ def get_real_path(filename, description):
 
 def get_boolean_config_option(cfg, section, option, default=False):
     value = dict(cfg.items(section)).get(option, default)
-    if (type(value) != bool and
-        (str(value).lower() == 'true' or
-         str(value).lower() == '1')):
+    if type(value) == bool:
+        return value
+    if (str(value).lower() == 'true' or
+            str(value).lower() == '1'):
         value = True
     else:
         # If present but is not True or 1
@@ -99,6 +67,42 @@ def get_boolean_config_option(cfg, section, option, default=False):
     return value
 
 
+def replay_journal(journal, lines):
+    """
+    journal.replay(*lines*), or just *lines* if the journal cannot be read.
+    A damaged journal is moved aside to <journal>.damaged, with a warning,
+    so it neither stops todotxt-machine from starting nor gets overwritten.
+    """
+    try:
+        return journal.replay(lines)
+    except Exception as e:
+        damaged_path = journal.path + '.damaged'
+        try:
+            os.rename(journal.path, damaged_path)
+        except OSError:
+            damaged_path = journal.path
+        sys.stderr.write("WARNING: ignoring unreadable journal {0} ({1}), kept as {2}\n".format(
+            journal.path, e, damaged_path))
+    # start over on top of todo.txt alone
+    return journal.replay(lines)
+
+
+def save_on_quit(todos, saver):
+    """
+    Finish the background saves and fold any journal into todo.txt. The
+    changes of a background save that failed are saved again here. False,
+    after saying why, if they could not be saved.
+    """
+    for error in saver.close():
+        sys.stderr.write("WARNING: saving in the background failed ({0}), saving again\n".format(error))
+    try:
+        todos.compact()
+    except (IOError, OSError) as e:
+        sys.stderr.write("ERROR: unable to save {0}: {1}\n".format(todos.file_path, e))
+        return False
+    return True
+
+
 def main():
     random.seed()
 
@@ -110,6 +114,13 @@ def main():
     # if arguments['--readline-editing-mode'] not in ['vi', 'emacs']:
     #     exit_with_error("--readline-editing-mode must be set to either vi or emacs\n")
 
+    # Import the correct version of configparser
+    if sys.version_info[0] >= 3:
+        import configparser as config_parser_module
+    else:
+        import ConfigParser as config_parser_module
+    from todotxt_machine.keys import KeyBindings
+
     # Parse config file
     cfg = config_parser_module.ConfigParser(allow_no_value=True)
     cfg.add_section('keys')
@@ -120,6 +131,15 @@ def main():
         cfg.write(sys.stdout)
         exit(0)
 
+    from todotxt_machine.todo import Todos
+    from todotxt_machine.urwid_ui import UrwidUI
+    from todotxt_machine.colorscheme import ColorScheme
+    from todotxt_machine.storage import DURABILITY_LEVELS, BackgroundSaver
+    from todotxt_machine.journal import Journal, content_hash
+    from todotxt_machine.watch import FileWatcher
+    from todotxt_machine import cache
+    from todotxt_machine.sorting import check_sort_keys
+
     cfg.add_section('settings')
     cfg.read(os.path.expanduser(arguments['--config']))
 
@@ -129,9 +149,12 @@ def main():
     # load the colorscheme defined in the user config, else load the default scheme
     colorscheme = ColorScheme(dict(cfg.items('settings')).get('colorscheme', 'default'), cfg)
 
-    # Get auto-saving setting (defaults to False)
-    global enable_autosave
+    # Get auto-saving setting (defaults to False) and interval in seconds (defaults to 30)
     enable_autosave = get_boolean_config_option(cfg, 'settings', 'auto-save', default=False)
+    try:
+        autosave_interval = float(dict(cfg.items('settings')).get('auto-save-interval', 30))
+    except ValueError:
+        exit_with_error("ERROR: auto-save-interval must be a number of seconds")
 
     # Load the todo.txt file specified in the [settings] section of the config file
     # a todo.txt file on the command line takes precedence
@@ -150,44 +173,79 @@ def main():
 
     todotxt_file_path = get_real_path(todotxt_file, 'todo.txt')
 
+    # How carefully saves are flushed to disk (defaults to fsync)
+    save_durability = dict(cfg.items('settings')).get('save-durability', 'fsync')
+    if save_durability not in DURABILITY_LEVELS:
+        exit_with_error("ERROR: save-durability must be one of: {0}".format(", ".join(DURABILITY_LEVELS)))
+
     if donetxt_file is not None:
         donetxt_file_path = get_real_path(donetxt_file, 'done.txt')
     else:
         donetxt_file_path = None
 
+    # Save changes to a journal next to the todo.txt file instead of
+    # rewriting it every time (defaults to False)
+    journal = None
+    if get_boolean_config_option(cfg, 'settings', 'journal', default=False):
+        journal = Journal(todotxt_file_path + '.journal')
+
+    # Keep the parsed todos in ~/.cache/todotxt-machine so the next start
+    # does not have to parse them again (defaults to True)
+    use_parse_cache = get_boolean_config_option(cfg, 'settings', 'parse-cache', default=True)
+
     try:
         with open(todotxt_file_path, "r") as todotxt_file:
-            todos = Todos(todotxt_file.readlines(), todotxt_file_path, donetxt_file_path)
+            lines = todotxt_file.readlines()
     except:
         exit_with_error("ERROR: unable to open {0}\n\nEither specify one as an argument on the command line or set it in your configuration file ({0}).".format(todotxt_file_path, arguments['--config']))
-        todos = Todos([], todotxt_file_path, donetxt_file_path)
+
+    file_hash = content_hash(lines)
+    if journal is not None:
+        lines = replay_journal(journal, lines)
+    parse_cache = cache.load(todotxt_file_path) if use_parse_cache else None
+    todos = Todos(lines, todotxt_file_path, donetxt_file_path, durability=save_durability, journal=journal,
+                  parse_cache=parse_cache)
+    todos.file_hash = file_hash
 
     show_toolbar = get_boolean_config_option(cfg, 'settings', 'show-toolbar')
     show_filter_panel = get_boolean_config_option(cfg, 'settings', 'show-filter-panel')
     enable_borders = get_boolean_config_option(cfg, 'settings', 'enable-borders')
     enable_word_wrap = get_boolean_config_option(cfg, 'settings', 'enable-word-wrap')
 
-    global view
-    view = UrwidUI(todos, keyBindings, colorscheme)
+    saver = BackgroundSaver(todos)
+
+    # What the sorted modes sort by (defaults to the whole line)
+    sort_keys = [key.strip() for key in dict(cfg.items('settings')).get('sort-keys', 'raw').split(',')]
+    try:
+        check_sort_keys(sort_keys)
+    except ValueError as e:
+        exit_with_error("ERROR: sort-keys: {0}".format(e))
+
+    # Reload todo.txt when another program changes it (defaults to True)
+    watcher = None
+    if get_boolean_config_option(cfg, 'settings', 'auto-reload', default=True):
+        watcher = FileWatcher(todotxt_file_path)
 
-    timer.start()
+    view = UrwidUI(todos, keyBindings, colorscheme, saver=saver, watcher=watcher, sort_keys=sort_keys)
 
     view.main(  # start up the urwid UI event loop
         enable_borders,
         enable_word_wrap,
         show_toolbar,
-        show_filter_panel)
+        show_filter_panel,
+        autosave_interval if enable_autosave else 0)
 
     # UI is now shut down
-
-    # Shut down the auto-saving thread.
-    enable_autosave = False
-    timer.cancel()
-
-    # Final save
-    with autosave_lock:
-        # print("Writing: {0}".format(todotxt_file_path))
-        view.todos.save()
+    if watcher is not None:
+        watcher.close()
+
+    # Final save, folding any journal into the todo.txt file, once the
+    # background saves still in flight are done
+    # print("Writing: {0}".format(todotxt_file_path))
+    if not save_on_quit(view.todos, saver):
+        exit(1)
+    if use_parse_cache:
+        cache.store(todotxt_file_path, view.todos, view.todos.file_hash)
 
     exit(0)
 
@@ -4,13 +4,43 @@
 import os
 import sys
 
-# Import the correct version of configparser
-if sys.version_info[0] >= 3:
-    import configparser
-    config_parser_module = configparser
-elif sys.version_info[0] < 3:
-    import ConfigParser
-    config_parser_module = ConfigParser
+from todotxt_machine.builtin_colors import BUILT_IN_COLORS
+
+
+def read_colors_directory(directory):
+    """
+    Read the colorscheme files in *directory* into a dict of scheme name to
+    {key: "fg,bg"}, the format of builtin_colors.BUILT_IN_COLORS.
+    """
+    # Import the correct version of configparser
+    if sys.version_info[0] >= 3:
+        import configparser as config_parser_module
+    else:
+        import ConfigParser as config_parser_module
+
+    schemes = {}
+    for name in sorted(os.listdir(directory)):
+        cfg = config_parser_module.ConfigParser()
+        cfg.read(os.path.join(directory, name))
+        section = "colorscheme-{0}".format(name)
+        if cfg.has_section(section):
+            schemes[name] = dict(cfg.items(section))
+    return schemes
+
+
+def write_builtin_colors(schemes, path):
+    with open(path, "w") as module:
+        module.write("# coding=utf-8\n")
+        module.write("# Generated from todotxt_machine/colors by running\n")
+        module.write("#   python -m todotxt_machine.colorscheme\n")
+        module.write("# edit the files in colors/ and rerun it instead of editing this file.\n\n")
+        module.write("BUILT_IN_COLORS = {\n")
+        for name in sorted(schemes):
+            module.write("    {0!r}: {{\n".format(name))
+            for key in sorted(schemes[name]):
+                module.write("        {0!r}: {1!r},\n".format(key, schemes[name][key]))
+            module.write("    },\n")
+        module.write("}\n")
 
 
 class ColorScheme:
@@ -30,16 +60,9 @@ class ColorScheme:
         if self.user_config.has_section(colorscheme_section):
             self.colors = dict(self.user_config.items(colorscheme_section))
         else:
-            # Try to load a built in theme
-            cfg = config_parser_module.ConfigParser()
-            if name in os.listdir(self.built_in_colors_directory):
-                cfg.read(self.built_in_colors_directory + "/" + name)
-            # Load default theme
-            else:
-                cfg.read(self.built_in_colors_directory + "/default")
-                colorscheme_section = "colorscheme-default"
-            if cfg.has_section(colorscheme_section):
-                self.colors = dict(cfg.items(colorscheme_section))
+            # Use a built in theme, precompiled from the colors directory,
+            # or the default one
+            self.colors = dict(BUILT_IN_COLORS.get(name, BUILT_IN_COLORS['default']))
 
         # Split foreground and background values
         for key, value in self.colors.items():
@@ -57,3 +80,10 @@ class ColorScheme:
                 self.colors[key + '_dialog_color'] = {'fg': self.colors[key]['fg'], 'bg': dialog_color}
                 self.focus_map[key] = key + '_selected'
                 self.dialog_focus_map[key] = key + '_dialog_color'
+
+
+if __name__ == '__main__':
+    # regenerate builtin_colors.py after changing the files in colors/
+    directory = os.path.dirname(os.path.abspath(__file__))
+    write_builtin_colors(read_colors_directory(os.path.join(directory, 'colors')),
+                         os.path.join(directory, 'builtin_colors.py'))
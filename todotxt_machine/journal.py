@@ -0,0 +1,147 @@
+#!/usr/bin/env python
+# coding=utf-8
+import os
+import hashlib
+
+from todotxt_machine.storage import write_file
+
+_header_prefix = "todotxt-machine journal 1 "
+# header line: prefix, 40 hex digits of sha1 and the newline
+_header_size = len(_header_prefix) + 41
+
+# records, one per line, applied in order to the non-blank lines of todo.txt
+#   I <index> <text>   insert a todo
+#   D <index>          delete a todo
+#   S <index> <index>  swap two todos
+#   U <index> <text>   replace the text of a todo
+
+
+def content_hash(lines):
+    text = "".join(lines)
+    if not isinstance(text, bytes):
+        text = text.encode('utf-8')
+    return hashlib.sha1(text).hexdigest()
+
+
+def apply_record(items, record):
+    """Apply one journal *record* to the list *items* in place."""
+    kind, _, rest = record.partition(" ")
+    if kind == "I":
+        index, _, text = rest.partition(" ")
+        index = int(index)
+        if not 0 <= index <= len(items):
+            raise IndexError(index)
+        items.insert(index, text)
+    elif kind == "D":
+        del items[int(rest)]
+    elif kind == "S":
+        first, second = [int(i) for i in rest.split(" ")]
+        items[first], items[second] = items[second], items[first]
+    elif kind == "U":
+        index, _, text = rest.partition(" ")
+        items[int(index)] = text
+    else:
+        raise ValueError("unknown journal record {0!r}".format(record))
+
+
+class Journal(object):
+    """
+    Append only log of the changes made to a todo.txt file since it was
+    last written in full.
+
+    The first line names the todo.txt contents the records apply to by
+    hash, so a journal left over from before todo.txt was rewritten (or
+    edited by another program) is recognised and ignored. Changes are
+    buffered by record() and appended by flush(); a crash part way through
+    an append loses at most the unfinished last line, and every prefix of
+    the records is a consistent list of todos.
+    """
+
+    def __init__(self, path, minimum_compact_size=64 * 1024):
+        self.path = path
+        self.minimum_compact_size = minimum_compact_size
+        self.pending = []
+        self.base_hash = None
+        self.base_size = 0
+        self.size = 0
+        self.current = False
+
+    def replay(self, lines):
+        """
+        Return the todos described by the todo.txt *lines* with the journal
+        applied, dropping any changes that were never flushed.
+        """
+        items = [line.strip() for line in lines if line.strip() != ""]
+        self.pending = []
+        self.base_hash = content_hash(lines)
+        self.base_size = sum(len(line) for line in lines)
+        self.size = 0
+        self.current = False
+        try:
+            with open(self.path, "r") as journal_file:
+                journal = journal_file.read()
+        except (IOError, OSError):
+            return items
+
+        records = journal.split("\n")
+        if records[0] != _header_prefix + self.base_hash:
+            return items
+        applied = []
+        # the last element is empty after a complete final line, or a
+        # record torn by a crash mid-append
+        for record in records[1:-1]:
+            try:
+                apply_record(items, record)
+            except (ValueError, IndexError):
+                break
+            applied.append(record)
+        if records[-1] == "" and len(applied) == len(records) - 2:
+            self.current = True
+            self.size = len(journal)
+        else:
+            # damaged tail, the next flush rewrites the journal with the
+            # records that applied cleanly
+            self.pending = applied
+        return [item for item in items if item != ""]
+
+    def record(self, *fields):
+        self.pending.append(" ".join(str(field) for field in fields))
+
+    def is_empty(self):
+        """True if there are no changes on top of todo.txt, flushed or not."""
+        return not self.pending and self.size <= _header_size
+
+    def needs_compaction(self):
+        return self.size > max(self.minimum_compact_size, self.base_size)
+
+    def flush(self, durability='fsync'):
+        """Append the recorded changes to the journal file."""
+        records, self.pending = self.pending, []
+        self.append(records, durability)
+
+    def append(self, records, durability='fsync'):
+        """Append *records*, taken from pending, to the journal file."""
+        if not records:
+            return
+        data = "".join(record + "\n" for record in records)
+        if self.current:
+            with open(self.path, "a") as journal_file:
+                journal_file.write(data)
+                if durability != 'none':
+                    journal_file.flush()
+                    os.fsync(journal_file.fileno())
+        else:
+            header = _header_prefix + self.base_hash + "\n"
+            write_file(self.path, header + data, durability)
+            self.size = len(header)
+            self.current = True
+        self.size += len(data)
+
+    def reset(self, lines, durability='fsync'):
+        """Start an empty journal on top of todo.txt now holding *lines*."""
+        self.base_hash = content_hash(lines)
+        self.base_size = sum(len(line) for line in lines)
+        header = _header_prefix + self.base_hash + "\n"
+        write_file(self.path, header, durability)
+        self.size = len(header)
+        self.current = True
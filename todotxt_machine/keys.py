@@ -4,8 +4,17 @@ class KeyBindings:
 
     def __init__(self, user_keys):
         self.user_keys = user_keys
+        self.key_bindings = {}
         self.fillWithDefault()
         self.fillWithUserKeys(user_keys)
+        self.indexKeys()
+
+    def indexKeys(self):
+        # key -> set of the binds it triggers, so a keypress is one lookup
+        self.key_actions = {}
+        for bind, keys in self.key_bindings.items():
+            for key in keys:
+                self.key_actions.setdefault(key, set()).add(bind)
 
     def fillWithUserKeys(self, users_keys):
         for bind in users_keys:
@@ -75,4 +84,18 @@ class KeyBindings:
             return []
 
     def is_binded_to(self, key, bind):
-        return key in self.getKeyBinding(bind)
+        try:
+            return bind in self.key_actions[key]
+        except (KeyError, TypeError):
+            return False
+
+    def dispatchTable(self, handlers):
+        """Map keys to handlers from a list of (bind, handler) pairs.
+
+        A key bound to several of the binds goes to the first one listed,
+        like the first matching branch of an if/elif chain."""
+        table = {}
+        for bind, handler in handlers:
+            for key in self.getKeyBinding(bind):
+                table.setdefault(key, handler)
+        return table
@@ -0,0 +1,208 @@
+#!/usr/bin/env python
+# coding=utf-8
+import re
+import binascii
+
+from todotxt_machine.views import TodoView
+
+try:
+    _is_ascii = str.isascii
+except AttributeError:  # Python < 3.7
+    def _is_ascii(text):
+        try:
+            text.encode('ascii')
+        except UnicodeError:
+            return False
+        return True
+
+if hasattr(int, 'from_bytes'):
+    def _bitmap_to_int(bitmap):
+        return int.from_bytes(bitmap, 'little')
+
+    def _int_to_bitmap(value, length):
+        return value.to_bytes(length, 'little')
+else:  # Python 2
+    def _bitmap_to_int(bitmap):
+        return int(binascii.hexlify(bytes(bitmap[::-1])) or '0', 16)
+
+    def _int_to_bitmap(value, length):
+        return bytes(bytearray(binascii.unhexlify('%0*x' % (length * 2, value)))[::-1])
+
+_nonzero_byte_regex = re.compile(b'[^\x00]')
+
+
+class SearchIndex(object):
+    """
+    Character index over the text of todo items.
+
+    Todos.search matches the characters of the query in order with anything
+    in between, so the only thing every match has in common with the query
+    is its set of characters. For each character the index keeps a bitmap
+    of the items whose lower cased text contains it; AND-ing the bitmaps of
+    the query's characters gives the candidates the search regex needs to
+    look at.
+
+    Items get a slot (bit number) when added and give it back when removed.
+    The index stays empty until build() is called so loading a file does not
+    pay for it unless a search actually happens.
+    """
+
+    def __init__(self):
+        self.clear()
+
+    def clear(self):
+        self.built = False
+        self._todos = []
+        self._slots = {}
+        self._free_slots = []
+        self._bitmaps = {}
+        # items with non ASCII text are always candidates, IGNORECASE
+        # matching is more lenient than str.lower() for some of them
+        self._non_ascii = bytearray()
+        self._bitmap_size = 0
+
+    def build(self, todos):
+        self.clear()
+        self.built = True
+        self._grow(len(todos))
+        for todo in todos:
+            self.add(todo)
+
+    def _grow(self, slot_count):
+        size = (slot_count >> 3) + 1
+        if size <= self._bitmap_size:
+            return
+        size = max(size, self._bitmap_size * 2)
+        padding = bytearray(size - self._bitmap_size)
+        for bitmap in self._bitmaps.values():
+            bitmap.extend(padding)
+        self._non_ascii.extend(padding)
+        self._bitmap_size = size
+
+    def _characters(self, todo):
+        text = todo.raw.lower()
+        return set(text) if _is_ascii(text) else None
+
+    def add(self, todo):
+        if not self.built:
+            return
+        if self._free_slots:
+            slot = self._free_slots.pop()
+            self._todos[slot] = todo
+        else:
+            slot = len(self._todos)
+            self._todos.append(todo)
+            self._grow(slot + 1)
+        self._slots[todo] = slot
+
+        byte, bit = slot >> 3, 1 << (slot & 7)
+        characters = self._characters(todo)
+        if characters is None:
+            self._non_ascii[byte] |= bit
+            return
+        for character in characters:
+            bitmap = self._bitmaps.get(character)
+            if bitmap is None:
+                bitmap = self._bitmaps[character] = bytearray(self._bitmap_size)
+            bitmap[byte] |= bit
+
+    def remove(self, todo):
+        """Remove *todo*, which must still have the text it was added with."""
+        if not self.built:
+            return
+        slot = self._slots.pop(todo)
+        self._todos[slot] = None
+        self._free_slots.append(slot)
+
+        byte, mask = slot >> 3, ~(1 << (slot & 7)) & 0xff
+        characters = self._characters(todo)
+        if characters is None:
+            self._non_ascii[byte] &= mask
+            return
+        for character in characters:
+            self._bitmaps[character][byte] &= mask
+
+    def candidates(self, query):
+        """
+        Return the indexed items that may match *query*, in no particular
+        order, or None if the index cannot narrow the search.
+        """
+        characters = query.lower()
+        # search_regex splits the query on backslashes rather than
+        # requiring them, so such queries need not contain every character
+        if not self.built or not characters or not _is_ascii(characters) or "\\" in characters:
+            return None
+
+        matches = None
+        for character in set(characters):
+            bitmap = self._bitmaps.get(character)
+            if bitmap is None:
+                matches = 0
+                break
+            bits = _bitmap_to_int(bitmap)
+            matches = bits if matches is None else matches & bits
+        matches |= _bitmap_to_int(self._non_ascii)
+
+        todos = self._todos
+        result = []
+        bitmap = _int_to_bitmap(matches, self._bitmap_size)
+        for match in _nonzero_byte_regex.finditer(bitmap):
+            byte = match.start()
+            value = bytearray(match.group())[0]
+            slot = byte << 3
+            while value:
+                if value & 1:
+                    result.append(todos[slot])
+                value >>= 1
+                slot += 1
+        return result
+
+    def check(self, todos):
+        """Raise AssertionError unless the index holds exactly *todos*."""
+        if not self.built:
+            return
+        if set(self._slots) != set(todos):
+            raise AssertionError("search index holds the wrong items")
+        for todo, slot in self._slots.items():
+            byte, bit = slot >> 3, 1 << (slot & 7)
+            characters = self._characters(todo)
+            if characters is None:
+                bitmaps = [self._non_ascii]
+            else:
+                bitmaps = [self._bitmaps.get(c, bytearray(self._bitmap_size)) for c in characters]
+            if not all(bitmap[byte] & bit for bitmap in bitmaps):
+                raise AssertionError("search index out of date for {0!r}".format(todo.raw))
+
+
+class SearchSession(object):
+    """
+    Search as you type.
+
+    Adding characters to the end of a query only ever adds constraints to
+    the search regex, so the matches for the longer query are a subset of
+    the matches for the shorter one. The session remembers the previous
+    query and its results and only rescans those results while the query
+    keeps growing. Deleting or editing inside the query, or any change to
+    the todos, falls back to a full search. Results are views.TodoViews,
+    so a narrowed search reads the previous results only as far as its own
+    are read.
+    """
+
+    def __init__(self, todos):
+        self.todos = todos
+        self.reset()
+
+    def reset(self):
+        self.query = None
+        self.results = TodoView()
+        self.generation = None
+        self.narrowed = False
+
+    def search(self, query):
+        self.narrowed = (self.query is not None and
+                         query.startswith(self.query) and
+                         self.generation == self.todos.generation)
+        self.results = self.todos.search(query, within=self.results if self.narrowed else None)
+        self.query = query
+        self.generation = self.todos.generation
+        return self.results
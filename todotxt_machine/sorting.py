@@ -0,0 +1,248 @@
+#!/usr/bin/env python
+# coding=utf-8
+import bisect
+import operator
+from datetime import date
+
+from todotxt_machine.views import TodoView
+
+
+# sort after every value that is set
+_NO_TEXT = u"\uffff"
+_NO_DATE = 99999999
+
+
+def _date(packed):
+    # packed by todo.date_ordinal; the rare dates it could not pack (non
+    # ASCII digits) are not todo.txt dates and sort with the missing ones
+    return packed if packed and isinstance(packed, int) else _NO_DATE
+
+
+def _first_tag(tags):
+    return min(tags) if tags else _NO_TEXT
+
+
+# what SortedView can sort by, each a function of a Todo returning a value
+# that compares with the values of the other todos
+SORT_KEYS = {
+    'raw': operator.attrgetter('raw'),
+    'priority': lambda todo: todo.priority or _NO_TEXT,
+    'due': lambda todo: _date(todo._due_date),
+    'created': lambda todo: _date(todo._creation_date),
+    'completed': lambda todo: todo.is_complete(),
+    'project': lambda todo: _first_tag(todo._projects),
+    'context': lambda todo: _first_tag(todo._contexts),
+}
+
+
+def check_sort_keys(keys):
+    """Raise ValueError unless every name in *keys* is in SORT_KEYS."""
+    unknown = [key for key in keys if key not in SORT_KEYS]
+    if unknown or not keys:
+        raise ValueError("unknown sort keys {0!r}, choose from: {1}".format(
+            unknown, ", ".join(sorted(SORT_KEYS))))
+
+
+class SortedView(object):
+    """
+    The todos of a Todos in sorted order, without reordering todo_items.
+
+    Every todo's key (a tuple of the SORT_KEYS values of *keys* and the raw
+    text to break ties, key() works it out) is computed once and kept along with a sorted list
+    of the tuples, so the view is only sorted in full when it is built.
+    After that Todos keeps it up to date like its other indexes: an edited
+    todo is taken out under its old key and put back under its new one, by
+    bisection. Descending order is the same view read backwards.
+    """
+
+    def __init__(self, keys=('raw',)):
+        check_sort_keys(keys)
+        self.keys = tuple(keys)
+        functions = [SORT_KEYS[key] for key in self.keys]
+        if self.keys[-1] != 'raw':
+            functions.append(SORT_KEYS['raw'])
+        if len(functions) == 1:
+            # plain strings compare faster than 1-tuples
+            self.key = functions[0]
+        else:
+            self.key = lambda todo: tuple([function(todo) for function in functions])
+        self._keys = []
+        self._todos = []
+        self._todo_keys = {}
+
+    def build(self, todos):
+        keys = [self.key(todo) for todo in todos]
+        order = sorted(range(len(keys)), key=keys.__getitem__)
+        self._keys = [keys[index] for index in order]
+        self._todos = [todos[index] for index in order]
+        self._todo_keys = dict(zip(todos, keys))
+
+    def add(self, todo):
+        key = self._todo_keys[todo] = self.key(todo)
+        index = bisect.bisect_right(self._keys, key)
+        self._keys.insert(index, key)
+        self._todos.insert(index, todo)
+
+    def remove(self, todo):
+        key = self._todo_keys.pop(todo)
+        index = bisect.bisect_left(self._keys, key)
+        # only todos with the same text share a key
+        while self._todos[index] is not todo:
+            index += 1
+        del self._keys[index]
+        del self._todos[index]
+
+    def remove_all(self, todos):
+        """Remove many *todos* at once, in one pass over the view."""
+        gone = set(todos)
+        for todo in gone:
+            del self._todo_keys[todo]
+        kept = [(key, todo) for key, todo in zip(self._keys, self._todos) if todo not in gone]
+        self._keys = [key for key, todo in kept]
+        self._todos = [todo for key, todo in kept]
+
+    def __len__(self):
+        return len(self._todos)
+
+    def items(self, reverse=False):
+        """The todos in view order."""
+        if reverse:
+            return self._todos[::-1]
+        return list(self._todos)
+
+    def in_view_order(self, todos, reverse=False):
+        """A views.TodoView of *todos*, all of which must be in the view, in view order."""
+        if not isinstance(todos, TodoView):
+            todos = TodoView(todos)
+        return todos.sorted(self._todo_keys.__getitem__, reverse)
+
+    def check(self, todos):
+        """Raise AssertionError unless the view holds exactly *todos*, sorted."""
+        if sorted(self._todo_keys.values()) != self._keys or self._keys != sorted(self.key(t) for t in todos):
+            raise AssertionError("sorted view {0!r} out of date".format(self.keys))
+        if any(self._todo_keys[todo] != key for key, todo in zip(self._keys, self._todos)):
+            raise AssertionError("sorted view {0!r} out of date".format(self.keys))
+
+
+def today_ordinal(today=None):
+    """*today* (a date, today by default) packed like todo.date_ordinal does."""
+    today = today or date.today()
+    return today.year * 10000 + today.month * 100 + today.day
+
+
+class NextActions(object):
+    """
+    The pending todos in the order to do them: overdue first, then by
+    priority, then by due date, undated last.
+
+    Pending todos are kept in a bucket per priority, each sorted by due
+    date (and text). Priority comes before the due date both among the
+    overdue todos and among the rest, so the order is the overdue front of
+    every bucket in priority order followed by the remainder of every
+    bucket: finding the next *count* todos takes a bisection for today's
+    date per bucket and slicing, O(buckets * log n + count), however many
+    todos there are. Like SortedView it is kept up to date by Todos.
+    """
+
+    def __init__(self):
+        self._priorities = []
+        # priority: ([(due, raw), ...], [todo, ...]) in due date order
+        self._buckets = {}
+        # todo: (priority, (due, raw)) for every pending todo
+        self._entries = {}
+
+    @staticmethod
+    def _entry(todo):
+        return todo.priority or _NO_TEXT, (_date(todo._due_date), todo.raw)
+
+    def key(self, todo, today):
+        """What the todos are ordered by on the date *today* (an ordinal)."""
+        priority, (due, raw) = self._entry(todo)
+        return (due >= today, priority, due, raw)
+
+    def build(self, todos):
+        entries = {}
+        for todo in todos:
+            if not todo.is_complete():
+                entry = self._entries[todo] = self._entry(todo)
+                entries.setdefault(entry[0], []).append((entry[1], todo))
+        for priority, bucket in entries.items():
+            bucket.sort(key=lambda entry: entry[0])
+            self._buckets[priority] = ([key for key, todo in bucket], [todo for key, todo in bucket])
+        self._priorities = sorted(self._buckets)
+
+    def add(self, todo):
+        if todo.is_complete():
+            return
+        priority, key = self._entries[todo] = self._entry(todo)
+        bucket = self._buckets.get(priority)
+        if bucket is None:
+            bucket = self._buckets[priority] = ([], [])
+            bisect.insort(self._priorities, priority)
+        keys, todos = bucket
+        index = bisect.bisect_right(keys, key)
+        keys.insert(index, key)
+        todos.insert(index, todo)
+
+    def remove(self, todo):
+        entry = self._entries.pop(todo, None)
+        if entry is None:
+            return
+        priority, key = entry
+        keys, todos = self._buckets[priority]
+        index = bisect.bisect_left(keys, key)
+        while todos[index] is not todo:
+            index += 1
+        del keys[index]
+        del todos[index]
+        if not todos:
+            del self._buckets[priority]
+            self._priorities.remove(priority)
+
+    def remove_all(self, todos):
+        for todo in todos:
+            self.remove(todo)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def next(self, count=None, today=None):
+        """The first *count* (all by default) todos to do as of *today*."""
+        today = today_ordinal(today)
+        if count is None:
+            count = len(self._entries)
+        result = []
+        cuts = []
+        for priority in self._priorities:
+            keys, todos = self._buckets[priority]
+            cut = bisect.bisect_left(keys, (today,))
+            cuts.append(cut)
+            result.extend(todos[:min(cut, count - len(result))])
+        for priority, cut in zip(self._priorities, cuts):
+            if len(result) >= count:
+                break
+            todos = self._buckets[priority][1]
+            result.extend(todos[cut:cut + count - len(result)])
+        return result
+
+    def items(self, reverse=False):
+        if reverse:
+            return self.next()[::-1]
+        return self.next()
+
+    def in_view_order(self, todos, reverse=False, today=None):
+        """A views.TodoView of the pending todos among *todos*, in order as of *today*."""
+        today = today_ordinal(today)
+        if not isinstance(todos, TodoView):
+            todos = TodoView(todos)
+        return todos.filter(self._entries.__contains__).sorted(lambda todo: self.key(todo, today), reverse)
+
+    def check(self, todos):
+        """Raise AssertionError unless the index holds exactly the pending *todos*, in order."""
+        expected = NextActions()
+        expected.build(todos)
+        if (expected._priorities != self._priorities or expected._entries != self._entries or
+                any(expected._buckets[p][0] != self._buckets[p][0] for p in self._priorities) or
+                any(self._entries[todo] != (p, key) for p in self._priorities
+                    for key, todo in zip(*self._buckets[p]))):
+            raise AssertionError("next actions out of date")
@@ -0,0 +1,152 @@
+#!/usr/bin/env python
+# coding=utf-8
+import os
+import stat
+import tempfile
+import threading
+import collections
+
+try:
+    import queue
+except ImportError:  # Python 2
+    import Queue as queue
+
+# how hard write_file tries to get the data onto the disk:
+#   none       rename the new file into place, leave flushing to the OS
+#   fsync      fsync the new file before renaming it
+#   fsync-dir  also fsync the directory so the rename itself is durable
+DURABILITY_LEVELS = ('none', 'fsync', 'fsync-dir')
+
+try:
+    _replace = os.replace
+except AttributeError:  # Python 2
+    _replace = os.rename
+
+
+def _new_file_mode():
+    umask = os.umask(0)
+    os.umask(umask)
+    return 0o666 & ~umask
+
+
+def _fsync_directory(directory):
+    try:
+        fd = os.open(directory, os.O_RDONLY)
+    except OSError:  # directories can't be opened on Windows
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def write_file(path, data, durability='fsync'):
+    """
+    Replace the contents of *path* with the string (or bytes) *data*.
+
+    The data is written in one go to a temporary file next to *path* which
+    is then renamed over it, so readers and crashes see either the old or
+    the new contents, never a partial file. The original file's permissions
+    are kept.
+    """
+    if durability not in DURABILITY_LEVELS:
+        raise ValueError("unknown durability level {0!r}".format(durability))
+
+    directory = os.path.dirname(os.path.abspath(path))
+    try:
+        mode = stat.S_IMODE(os.stat(path).st_mode)
+    except OSError:
+        mode = _new_file_mode()
+
+    fd, temp_path = tempfile.mkstemp(dir=directory, prefix="." + os.path.basename(path) + ".", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb" if isinstance(data, bytes) else "w") as temp_file:
+            temp_file.write(data)
+            if durability != 'none':
+                temp_file.flush()
+                os.fsync(temp_file.fileno())
+        os.chmod(temp_path, mode)
+        _replace(temp_path, path)
+    except BaseException:
+        try:
+            os.remove(temp_path)
+        except OSError:
+            pass
+        raise
+
+    if durability == 'fsync-dir':
+        _fsync_directory(directory)
+
+
+class BackgroundSaver(object):
+    """
+    Saves Todos on a worker thread.
+
+    save() takes a snapshot of the todos on the calling (UI) thread, which
+    is cheap, and queues it; the worker writes the snapshots one after the
+    other. Finished saves are handed back through collect(), again on the
+    UI thread, so the todos are only ever touched by that thread.
+    *on_done* is called on the worker thread after every save, e.g. to
+    wake up the UI.
+    """
+
+    def __init__(self, todos, on_done=None):
+        self.todos = todos
+        self.on_done = on_done
+        self._queue = queue.Queue()
+        self._finished = collections.deque()
+        self._thread = threading.Thread(target=self._run, name="todotxt-machine saver")
+        self._thread.daemon = True
+        self._thread.start()
+
+    def save(self):
+        """Queue a save of the current todos, False if there is nothing new to save."""
+        if self.todos.generation == self.todos.snapshot_generation:
+            return False
+        self._queue.put(self.todos.snapshot())
+        return True
+
+    def _run(self):
+        while True:
+            snapshot = self._queue.get()
+            if snapshot is None:
+                self._queue.task_done()
+                return
+            try:
+                self.todos.write_snapshot(snapshot)
+                error = None
+            except Exception as e:
+                error = e
+            self._finished.append((snapshot, error))
+            self._queue.task_done()
+            if self.on_done is not None:
+                self.on_done()
+
+    def collect(self):
+        """
+        Apply the results of finished saves to the todos, returning the
+        errors of the ones that failed.
+        """
+        errors = []
+        while self._finished:
+            snapshot, error = self._finished.popleft()
+            if error is None:
+                self.todos.snapshot_saved(snapshot)
+            else:
+                self.todos.snapshot_failed(snapshot)
+                errors.append(error)
+        return errors
+
+    def wait(self):
+        """Block until every queued save has been written, then collect()."""
+        self._queue.join()
+        return self.collect()
+
+    def close(self):
+        """Finish the queued saves and stop the worker thread."""
+        errors = self.wait()
+        self._queue.put(None)
+        self._thread.join()
+        return errors
@@ -0,0 +1,96 @@
+#!/usr/bin/env python
+# coding=utf-8
+import pytest
+from .. import todo
+from .. import cache
+from ..journal import content_hash
+
+LINES = [
+    "(A) Thank Mom for the dinner @phone\n",
+    "(B) Schedule Goodwill pickup +GarageSale @phone\n",
+    "Unpack the guest bedroom +Unpacking due:2013-10-20\n",
+    "x 2013-10-01 @GroceryStore Eskimo pies\n"]
+
+
+@pytest.fixture
+def todo_file(tmpdir, monkeypatch):
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmpdir.join("cache")))
+    path = tmpdir.join("todo.txt")
+    path.write("".join(LINES))
+    return path
+
+
+def fields(todos):
+    return [(t.raw, t.priority, t.contexts, t.projects, t.creation_date, t.due_date, t.completed_date)
+            for t in todos.todo_items]
+
+
+def test_cache_round_trip(todo_file):
+    path = str(todo_file)
+    assert cache.load(path) == {}
+    todos = todo.Todos(LINES, path, None)
+    assert cache.store(path, todos, content_hash(LINES))
+    # unchanged file, nothing to write
+    assert not cache.store(path, todos, content_hash(LINES))
+
+    parsed = cache.load(path)
+    assert len(parsed) == 4
+    warm = todo.Todos(LINES, path, None, consistency_checks=True, parse_cache=parsed)
+    assert fields(warm) == fields(todos)
+    assert warm.parse_cache == {}
+    assert warm.all_contexts() == todos.all_contexts()
+    assert warm.all_projects() == todos.all_projects()
+    # edits after a warm start parse as usual
+    warm[0].update("(C) Thank Dad @phone +Family")
+    assert warm.all_projects() == ["+Family", "+GarageSale", "+Unpacking"]
+
+
+def test_cache_reparses_changed_lines(todo_file):
+    path = str(todo_file)
+    cache.store(path, todo.Todos(LINES, path, None))
+    parsed = cache.load(path)
+    # a stale entry for a line is never used for different text
+    parsed["(A) Thank Mom for the dinner @phone"] = (None, (), (), 0, 0, 0)
+    lines = ["(A) Thank Mom for the dinner @phone @home\n"] + LINES[1:]
+    warm = todo.Todos(lines, path, None, parse_cache=parsed)
+    assert fields(warm) == fields(todo.Todos(lines, path, None))
+
+
+def test_cache_ignores_damaged_or_foreign_files(todo_file, tmpdir):
+    path = str(todo_file)
+    cache.store(path, todo.Todos(LINES, path, None))
+    other = str(tmpdir.join("other.txt"))
+    assert cache.load(other) == {}
+    with open(cache.cache_path(path), "wb") as f:
+        f.write(b"not marshal data")
+    assert cache.load(path) == {}
+    with open(cache.cache_path(path), "wb") as f:
+        f.write(b"\xff" * 64)
+    assert cache.load(path) == {}
+
+
+def test_cache_damaged_entries_are_parsed_again(todo_file):
+    path = str(todo_file)
+    cache.store(path, todo.Todos(LINES, path, None))
+    parsed = cache.load(path)
+    raws = sorted(parsed)
+    parsed[raws[0]] = ("A", "B")
+    parsed[raws[1]] = None
+    parsed[raws[2]] = 42
+    warm = todo.Todos(LINES, path, None, consistency_checks=True, parse_cache=parsed)
+    assert fields(warm) == fields(todo.Todos(LINES, path, None))
+
+
+def test_cache_matches_a_cold_start_for_indented_lines(todo_file):
+    path = str(todo_file)
+    indented = ["  (A) 2014-01-01 Call mom @phone\n", "x 2014-01-01 \n"]
+    bare = ["(A) 2014-01-01 Call mom @phone\n", "x 2014-01-01\n"]
+    for first, second in [(indented, bare), (bare, indented)]:
+        cache.store(path, todo.Todos(first, path, None))
+        warm = todo.Todos(second, path, None, parse_cache=cache.load(path))
+        assert fields(warm) == fields(todo.Todos(second, path, None))
+    edited = todo.Todos(bare, path, None)
+    edited[0].update("  " + bare[0])
+    cache.store(path, edited)
+    warm = todo.Todos(bare, path, None, parse_cache=cache.load(path))
+    assert fields(warm) == fields(todo.Todos(bare, path, None))
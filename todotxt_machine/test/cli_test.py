@@ -0,0 +1,102 @@
+#!/usr/bin/env python
+# coding=utf-8
+import os
+import sys
+import subprocess
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# what main() imports once the UI is going to start
+HEAVY_MODULES = ["urwid", "todotxt_machine.urwid_ui", "todotxt_machine.todo", "todotxt_machine.colorscheme",
+                 "todotxt_machine.builtin_colors", "todotxt_machine.storage", "todotxt_machine.cache"]
+
+
+def import_times(*args):
+    """Cumulative import time in microseconds of each module imported by running python *args."""
+    env = dict(os.environ, PYTHONPATH=ROOT)
+    process = subprocess.Popen([sys.executable, "-X", "importtime"] + list(args), cwd=ROOT, env=env,
+                               stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    _, stderr = process.communicate()
+    times = {}
+    for line in stderr.decode('utf-8').splitlines():
+        if line.startswith("import time:") and "|" in line:
+            _, cumulative, module = line.split("|")
+            if cumulative.strip().isdigit():
+                times[module.strip()] = int(cumulative)
+    return times
+
+
+requires_importtime = pytest.mark.skipif(sys.version_info < (3, 7), reason="-X importtime needs Python 3.7")
+
+
+def test_cli_import_is_light():
+    # a fresh interpreter, this one has imported everything already
+    env = dict(os.environ, PYTHONPATH=ROOT)
+    script = "import sys, todotxt_machine.cli; print(' '.join(sorted(sys.modules)))"
+    process = subprocess.Popen([sys.executable, "-c", script], cwd=ROOT, env=env, stdout=subprocess.PIPE)
+    modules = process.communicate()[0].decode('utf-8').split()
+    assert "todotxt_machine.cli" in modules
+    for module in HEAVY_MODULES:
+        assert module not in modules
+
+
+@requires_importtime
+@pytest.mark.parametrize("option", ["--version", "--show-default-bindings"])
+def test_cli_options_skip_the_ui(option):
+    times = import_times("-m", "todotxt_machine.cli", option)
+    # run as __main__, so look for what it imports
+    assert "docopt" in times
+    assert "urwid" not in times
+    assert "todotxt_machine.urwid_ui" not in times
+
+
+def test_damaged_journal_is_moved_aside(tmpdir, capsys):
+    from .. import cli
+    from ..journal import Journal
+
+    class DamagedJournal(Journal):
+        def replay(self, lines):
+            if os.path.exists(self.path):
+                raise UnicodeError("damaged")
+            return Journal.replay(self, lines)
+
+    path = tmpdir.join("todo.txt.journal")
+    path.write("todotxt-machine journal 1 garbage\n")
+    journal = DamagedJournal(str(path))
+    assert cli.replay_journal(journal, ["Call mom\n"]) == ["Call mom"]
+    assert not path.check()
+    assert tmpdir.join("todo.txt.journal.damaged").read() == "todotxt-machine journal 1 garbage\n"
+    assert "ignoring unreadable journal" in capsys.readouterr().err
+
+
+def test_save_on_quit_saves_again_after_a_failed_background_save(tmpdir, monkeypatch, capsys):
+    from .. import cli
+    from .. import todo
+    from ..storage import BackgroundSaver
+    path = tmpdir.join("todo.txt")
+    path.write("Call mom\n")
+    todos = todo.Todos(["Call mom\n"], str(path), None, durability='none')
+    saver = BackgroundSaver(todos)
+
+    def fail_once(*args):
+        monkeypatch.undo()
+        raise IOError("disk full")
+    monkeypatch.setattr(todo, "write_file", fail_once)
+    todos[0].complete()
+    saver.save()
+    assert cli.save_on_quit(todos, saver)
+    assert path.read() == todos[0].raw + "\n"
+    assert "disk full" in capsys.readouterr().err
+
+
+def test_save_on_quit_reports_failure(tmpdir, capsys):
+    from .. import cli
+    from .. import todo
+    from ..storage import BackgroundSaver
+    todos = todo.Todos(["Call mom\n"], str(tmpdir.join("missing", "todo.txt")), None)
+    saver = BackgroundSaver(todos)
+    todos[0].complete()
+    saver.save()
+    assert not cli.save_on_quit(todos, saver)
+    err = capsys.readouterr().err
+    assert "saving in the background failed" in err and "ERROR: unable to save" in err
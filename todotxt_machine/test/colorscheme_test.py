@@ -0,0 +1,38 @@
+#!/usr/bin/env python
+# coding=utf-8
+import os
+from .. import colorscheme
+from ..builtin_colors import BUILT_IN_COLORS
+
+
+class FakeConfig:
+
+    def __init__(self, sections):
+        self.sections = sections
+
+    def has_section(self, section):
+        return section in self.sections
+
+    def items(self, section):
+        return list(self.sections[section].items())
+
+
+def test_builtin_colors_match_colors_directory():
+    # rerun python -m todotxt_machine.colorscheme if this fails
+    directory = os.path.join(os.path.dirname(colorscheme.__file__), "colors")
+    assert colorscheme.read_colors_directory(directory) == BUILT_IN_COLORS
+
+
+def test_colorscheme_loading():
+    scheme = colorscheme.ColorScheme("solarized-dark", FakeConfig({}))
+    fg, bg = BUILT_IN_COLORS["solarized-dark"]["context"].partition(",")[::2]
+    assert scheme.colors["context"] == {'fg': fg, 'bg': bg}
+    assert scheme.focus_map["context"] == "context_selected"
+    assert scheme.colors["context_selected"]["bg"] == scheme.colors["selected"]["bg"]
+
+    unknown = colorscheme.ColorScheme("no-such-scheme", FakeConfig({}))
+    assert unknown.colors == colorscheme.ColorScheme("default", FakeConfig({})).colors
+
+    user = dict(BUILT_IN_COLORS["default"], context="h1,h2")
+    scheme = colorscheme.ColorScheme("mine", FakeConfig({"colorscheme-mine": user}))
+    assert scheme.colors["context"] == {'fg': 'h1', 'bg': 'h2'}
@@ -0,0 +1,139 @@
+#!/usr/bin/env python
+# coding=utf-8
+import random
+import pytest
+from .. import todo
+from .. import journal
+
+LINES = [
+    "(A) Thank Mom for the dinner @phone\n",
+    "(B) Schedule Goodwill pickup +GarageSale @phone\n",
+    "\n",
+    "Unpack the guest bedroom +Unpacking due:2013-10-20\n",
+    "x 2013-10-01 @GroceryStore Eskimo pies\n"]
+
+
+@pytest.fixture
+def todo_file(tmpdir):
+    path = tmpdir.join("todo.txt")
+    path.write("".join(LINES))
+    return path
+
+
+def load(todo_file, consistency_checks=True):
+    log = journal.Journal(str(todo_file) + ".journal")
+    with open(str(todo_file)) as f:
+        lines = log.replay(f.readlines())
+    return todo.Todos(lines, str(todo_file), None, consistency_checks=consistency_checks, journal=log)
+
+
+def raws(todos):
+    return [t.raw for t in todos.todo_items]
+
+
+def test_journal_apply_record():
+    items = ["a", "b", "c"]
+    for record in ["I 1 new item", "D 0", "S 0 2", "U 1 changed"]:
+        journal.apply_record(items, record)
+    assert items == ["c", "changed", "new item"]
+    with pytest.raises(ValueError):
+        journal.apply_record(items, "Z 1")
+    with pytest.raises(IndexError):
+        journal.apply_record(items, "I 9 too far")
+
+
+def test_journal_save_appends_changes(todo_file):
+    todos = load(todo_file)
+    todos[0].complete()
+    todos.swap(0, 1)
+    todos.append("Call the plumber @phone", add_creation_date=False)
+    todos.delete(2)
+    assert todos.save()
+    assert todo_file.read() == "".join(LINES)
+    assert raws(load(todo_file)) == raws(todos)
+
+
+def test_journal_replay_without_journal(todo_file):
+    assert raws(load(todo_file)) == [line.strip() for line in LINES if line.strip()]
+
+
+def test_journal_unsaved_changes_are_not_replayed(todo_file):
+    todos = load(todo_file)
+    todos[0].update("Saved change")
+    todos.save()
+    todos[1].update("Unsaved change")
+    assert raws(load(todo_file))[:2] == ["Saved change", LINES[1].strip()]
+
+
+def test_journal_ignores_torn_last_record(todo_file):
+    todos = load(todo_file)
+    todos[0].update("First change")
+    todos.save()
+    with open(str(todo_file) + ".journal", "a") as journal_file:
+        journal_file.write("U 1 half writ")
+    reloaded = load(todo_file)
+    assert raws(reloaded) == raws(todos)
+    reloaded[2].update("Next change")
+    reloaded.save()
+    assert raws(load(todo_file)) == raws(reloaded)
+
+
+def test_journal_ignored_after_external_edit(todo_file):
+    todos = load(todo_file)
+    todos[0].update("Journaled change")
+    todos.save()
+    todo_file.write("Edited elsewhere\n")
+    assert raws(load(todo_file)) == ["Edited elsewhere"]
+
+
+def test_journal_compact(todo_file):
+    todos = load(todo_file)
+    todos[0].update("Journaled change")
+    todos.save()
+    assert not todos.is_modified()
+    assert todos.compact()
+    assert todo_file.read().startswith("Journaled change\n")
+    assert todos.journal.is_empty()
+    assert not todos.compact()
+    assert raws(load(todo_file)) == raws(todos)
+
+
+def test_journal_sort_and_threshold_rewrite_todo_file(todo_file):
+    todos = load(todo_file)
+    todos.sorted()
+    todos.save()
+    assert todo_file.read().splitlines() == raws(todos)
+    assert todos.journal.is_empty()
+
+    todos.journal.minimum_compact_size = 0
+    for count in range(100):
+        todos[0].update("Change {0}".format(count))
+        todos.save()
+        if todos.journal.is_empty():
+            break
+    # compacted once the journal outgrew todo.txt
+    assert todos.journal.is_empty()
+    assert todo_file.read().splitlines() == raws(todos)
+
+
+def test_journal_random_mutations_replay(todo_file):
+    rng = random.Random(7)
+    todos = load(todo_file, consistency_checks=False)
+    for step in range(300):
+        action = rng.randrange(6)
+        if action == 0 or len(todos) < 2:
+            todos.insert(rng.randrange(len(todos) + 1), "Task {0} @ctx{1}".format(step, step % 3),
+                         add_creation_date=rng.random() < 0.5)
+        elif action == 1:
+            todos.delete(rng.randrange(len(todos)))
+        elif action == 2:
+            todos.swap(rng.randrange(len(todos)), rng.randrange(len(todos)))
+        elif action == 3:
+            todos[rng.randrange(len(todos))].complete()
+        elif action == 4:
+            todos[rng.randrange(len(todos))].change_priority(rng.choice("ABC"))
+        else:
+            todos.save()
+            assert raws(load(todo_file)) == raws(todos)
+    todos.save()
+    assert raws(load(todo_file)) == raws(todos)
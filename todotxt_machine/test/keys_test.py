@@ -0,0 +1,31 @@
+#!/usr/bin/env python
+# coding=utf-8
+import pytest
+from .. import keys
+
+
+@pytest.fixture
+def key_bindings():
+    return keys.KeyBindings({'quit': 'Q, ctrl q', 'search': '/'})
+
+
+def test_key_bindings_is_binded_to(key_bindings):
+    assert key_bindings.is_binded_to('Q', 'quit')
+    assert key_bindings.is_binded_to('ctrl q', 'quit')
+    assert not key_bindings.is_binded_to('q', 'quit')
+    assert key_bindings.is_binded_to('enter', 'edit')
+    assert key_bindings.is_binded_to('enter', 'save-item')
+    assert not key_bindings.is_binded_to('enter', 'quit')
+    assert not key_bindings.is_binded_to('F12', 'quit')
+    assert not key_bindings.is_binded_to('Q', 'no-such-bind')
+    assert not key_bindings.is_binded_to(('mouse press', 1, 2, 3), 'quit')
+
+
+def test_key_bindings_are_not_shared(key_bindings):
+    assert keys.KeyBindings({}).getKeyBinding('quit') == ['q']
+    assert key_bindings.getKeyBinding('quit') == ['Q', 'ctrl q']
+
+
+def test_key_bindings_dispatch_table_prefers_first_bind(key_bindings):
+    table = key_bindings.dispatchTable([('save-item', 'save'), ('edit', 'edit'), ('quit', 'quit')])
+    assert table == {'enter': 'save', 'A': 'edit', 'e': 'edit', 'Q': 'quit', 'ctrl q': 'quit'}
@@ -0,0 +1,111 @@
+#!/usr/bin/env python
+# coding=utf-8
+import pytest
+from .. import todo
+from .. import search
+
+
+@pytest.fixture
+def todos():
+    return todo.Todos([
+        "(A) Thank Mom for the dinner @phone",
+        "(B) Schedule Goodwill pickup +GarageSale @phone",
+        "Unpack the guest bedroom +Unpacking due:2013-10-20",
+        "2013-10-19 Post signs around the neighborhood +GarageSale",
+        "x 2013-10-01 @GroceryStore Eskimo pies"], './todo.txt', './archive.txt', consistency_checks=True)
+
+
+@pytest.fixture
+def index(todos):
+    index = search.SearchIndex()
+    index.build(todos.todo_items)
+    return index
+
+
+def raws(todos):
+    return sorted(t.raw for t in todos)
+
+
+def test_search_index_starts_unbuilt():
+    index = search.SearchIndex()
+    assert not index.built
+    assert index.candidates("the") is None
+
+
+def test_search_index_candidates_hold_every_query_character(index, todos):
+    assert raws(index.candidates("eskimo")) == [
+        "Unpack the guest bedroom +Unpacking due:2013-10-20",
+        "x 2013-10-01 @GroceryStore Eskimo pies"]
+    assert raws(index.candidates("GW")) == ["(B) Schedule Goodwill pickup +GarageSale @phone"]
+    for query in ["th", "@P", "2013-", "x z"]:
+        assert raws(index.candidates(query)) == raws(
+            t for t in todos if set(query.lower()) <= set(t.raw.lower()))
+    assert index.candidates("qz") == []
+
+
+def test_search_index_cannot_narrow_empty_or_non_ascii_queries(index):
+    assert index.candidates("") is None
+    assert index.candidates(u"caf\xe9") is None
+
+
+def test_search_index_non_ascii_items_are_always_candidates(index, todos):
+    t = todos[0]
+    index.remove(t)
+    t.raw = u"Caf\xe9 with K"
+    index.add(t)
+    assert t in index.candidates("k")
+    assert t in index.candidates("xyz")
+    index.check(todos.todo_items)
+
+
+def test_search_index_reuses_slots(index, todos):
+    index.remove(todos[1])
+    index.remove(todos[2])
+    index.add(todos[2])
+    index.add(todos[1])
+    index.check(todos.todo_items)
+    assert raws(index.candidates("GW")) == ["(B) Schedule Goodwill pickup +GarageSale @phone"]
+
+
+def test_search_index_grows(index, todos):
+    for i in range(100):
+        todos.append("Task number {0} +Bulk".format(i))
+    todos.search("bulk")
+    for i in range(100):
+        todos.append("Later task number {0} +Bulk".format(i))
+    regex = todo.Todos.search_regex("bulk")
+    assert todos.search("bulk") == [t for t in todos.todo_items if regex.search(t.raw)]
+    assert len(todos.search("+bulk")) == 200
+    todos.check_consistency()
+
+
+def full_search(todos, query):
+    regex = todo.Todos.search_regex(query)
+    return [t for t in todos.todo_items if regex.search(t.raw)]
+
+
+def test_search_session_narrows_while_the_query_grows(todos):
+    session = search.SearchSession(todos)
+    for query, narrowed in [("t", False), ("th", True), ("the", True), ("th", False),
+                            ("the", True), ("the n", True), ("xthe", False), ("x.", False), ("x.*", True)]:
+        assert session.search(query) == full_search(todos, query)
+        assert session.narrowed == narrowed
+
+
+def test_search_session_rescans_after_changes(todos):
+    session = search.SearchSession(todos)
+    assert session.search("eskimo") == [todos[4]]
+    todos.append("Bake eskimo pies", add_creation_date=False)
+    assert session.search("eskimo p") == [todos[4], todos[5]]
+    assert not session.narrowed
+    todos.swap(0, 5)
+    assert session.search("pie") == full_search(todos, "pie")
+    assert not session.narrowed
+
+
+def test_search_session_reset(todos):
+    session = search.SearchSession(todos)
+    session.search("the")
+    session.reset()
+    session.search("they")
+    assert not session.narrowed
@@ -0,0 +1,131 @@
+#!/usr/bin/env python
+# coding=utf-8
+import random
+from datetime import date
+import pytest
+from .. import todo
+from .. import sorting
+
+
+@pytest.fixture
+def todos():
+    return todo.Todos([
+        "(B) Schedule Goodwill pickup +GarageSale @phone",
+        "Unpack the guest bedroom +Unpacking due:2013-10-20",
+        "(A) Thank Mom for the dinner @phone",
+        "2013-10-19 Post signs around the neighborhood +GarageSale due:2013-10-25",
+        "(B) 2013-10-18 Call the bank due:2013-10-20",
+        "x 2013-10-01 @GroceryStore Eskimo pies"], './todo.txt', './archive.txt', consistency_checks=True)
+
+
+def raws(items):
+    return [t.raw for t in items]
+
+
+def test_sort_keys_are_checked():
+    with pytest.raises(ValueError):
+        sorting.SortedView(('priority', 'colour'))
+    with pytest.raises(ValueError):
+        sorting.check_sort_keys(())
+
+
+def test_sorted_view_multiple_keys(todos):
+    items = list(todos.todo_items)
+    view = todos.sorted_view(('priority', 'due', 'created', 'project'))
+    assert raws(view.items()) == [
+        "(A) Thank Mom for the dinner @phone",
+        "(B) 2013-10-18 Call the bank due:2013-10-20",
+        "(B) Schedule Goodwill pickup +GarageSale @phone",
+        "Unpack the guest bedroom +Unpacking due:2013-10-20",
+        "2013-10-19 Post signs around the neighborhood +GarageSale due:2013-10-25",
+        "x 2013-10-01 @GroceryStore Eskimo pies"]
+    assert view.items(reverse=True) == view.items()[::-1]
+    assert todos.todo_items == items
+    assert todos.sorted_view(('priority', 'due', 'created', 'project')) is view
+    assert raws(view.in_view_order([items[5], items[0], items[2]])) == [
+        "(A) Thank Mom for the dinner @phone",
+        "(B) Schedule Goodwill pickup +GarageSale @phone",
+        "x 2013-10-01 @GroceryStore Eskimo pies"]
+
+
+def test_sorted_view_follows_changes(todos, tmpdir):
+    by_raw = todos.sorted_view()
+    by_due = todos.sorted_view(('due', 'priority'))
+    todos[5].update("(C) Eskimo pies due:2013-10-01")
+    todos.append("Aardvark food due:2013-10-02", add_creation_date=False)
+    todos.insert(0, "Zebra food")
+    todos.delete(1)
+    todos.swap(0, 2)
+    assert raws(by_due.items())[:3] == [
+        "(C) Eskimo pies due:2013-10-01",
+        "Aardvark food due:2013-10-02",
+        "(B) 2013-10-18 Call the bank due:2013-10-20"]
+    assert raws(by_raw.items()) == sorted(raws(todos))
+
+    todos[0].complete()
+    todos.archive_path = str(tmpdir.join("done.txt"))
+    todos.file_path = str(tmpdir.join("todo.txt"))
+    todos.archive_done()
+    assert raws(by_raw.items()) == sorted(raws(todos))
+    assert len(by_due) == len(todos)
+
+
+def test_sorted_view_random_edits(todos):
+    rng = random.Random(5)
+    views = [todos.sorted_view(), todos.sorted_view(('project', 'completed'))]
+    todos.next_action_index()
+    for n in range(200):
+        t = rng.choice(todos.todo_items)
+        choice = rng.random()
+        if choice < 0.3:
+            t.change_priority(rng.choice("ABC"))
+        elif choice < 0.5:
+            t.complete() if not t.is_complete() else t.incomplete()
+        elif choice < 0.7:
+            todos.append("{0} +{1}".format(t.raw, rng.choice(["Garden", "Taxes"])), add_creation_date=False)
+        elif len(todos) > 3:
+            # duplicates share their key, the right one must go
+            todos.delete(todos.position(t))
+    # consistency_checks has compared the views with a rebuild after every change
+    for view in views:
+        assert len(view) == len(todos)
+        assert [view.key(t) for t in view.items()] == sorted(view.key(t) for t in todos)
+
+
+def test_next_actions(todos):
+    today = date(2013, 10, 20)
+    todos.append("Pay the rent due:2013-10-01", add_creation_date=False)
+    todos.append("(C) Renew passport due:2013-10-19", add_creation_date=False)
+    todos.append("x 2013-10-02 (A) Done already due:2013-10-01", add_creation_date=False)
+    assert raws(todos.next_actions(today=today)) == [
+        # overdue, by priority then due date
+        "(C) Renew passport due:2013-10-19",
+        "Pay the rent due:2013-10-01",
+        # the rest, the same way
+        "(A) Thank Mom for the dinner @phone",
+        "(B) 2013-10-18 Call the bank due:2013-10-20",
+        "(B) Schedule Goodwill pickup +GarageSale @phone",
+        "Unpack the guest bedroom +Unpacking due:2013-10-20",
+        "2013-10-19 Post signs around the neighborhood +GarageSale due:2013-10-25"]
+    assert raws(todos.next_actions(3, today=today)) == [
+        "(C) Renew passport due:2013-10-19",
+        "Pay the rent due:2013-10-01",
+        "(A) Thank Mom for the dinner @phone"]
+    assert raws(todos.next_actions(2, today=date(2013, 10, 1))) == [
+        "(A) Thank Mom for the dinner @phone",
+        "(B) 2013-10-18 Call the bank due:2013-10-20"]
+    assert todos.next_actions(0) == []
+
+    index = todos.next_action_index()
+    todos[0].complete()
+    todos[1].change_priority('A')
+    todos.delete(2)
+    assert len(index) == 5
+    assert raws(todos.next_actions(2, today=today)) == [
+        "(C) Renew passport due:2013-10-19",
+        "Pay the rent due:2013-10-01"]
+    assert raws(todos.next_actions(1, today=date(2013, 10, 1))) == [
+        "(A) Unpack the guest bedroom +Unpacking due:2013-10-20"]
+    assert raws(index.in_view_order([todos[3], todos[0], todos[1]], today=today)) == [
+        "(A) Unpack the guest bedroom +Unpacking due:2013-10-20",
+        "(B) 2013-10-18 Call the bank due:2013-10-20"]
@@ -0,0 +1,127 @@
+#!/usr/bin/env python
+# coding=utf-8
+import os
+import stat
+import random
+import pytest
+from .. import todo
+from .. import journal
+from .. import storage
+
+
+@pytest.mark.parametrize("durability", storage.DURABILITY_LEVELS)
+def test_write_file_replaces_contents(tmpdir, durability):
+    path = tmpdir.join("todo.txt")
+    path.write("old contents\n")
+    storage.write_file(str(path), "new\ncontents\n", durability)
+    assert path.read() == "new\ncontents\n"
+    assert tmpdir.listdir() == [path]
+
+
+def test_write_file_creates_missing_file(tmpdir):
+    path = tmpdir.join("todo.txt")
+    storage.write_file(str(path), "first\n")
+    assert path.read() == "first\n"
+
+
+@pytest.mark.skipif(os.name != 'posix', reason="POSIX permissions")
+def test_write_file_keeps_permissions(tmpdir):
+    path = tmpdir.join("todo.txt")
+    path.write("private\n")
+    os.chmod(str(path), 0o640)
+    storage.write_file(str(path), "still private\n")
+    assert stat.S_IMODE(os.stat(str(path)).st_mode) == 0o640
+
+
+def test_write_file_leaves_original_on_error(tmpdir):
+    path = tmpdir.join("todo.txt")
+    path.write("keep me\n")
+    with pytest.raises(TypeError):
+        storage.write_file(str(path), None)
+    assert path.read() == "keep me\n"
+    assert tmpdir.listdir() == [path]
+
+
+def test_write_file_rejects_unknown_durability(tmpdir):
+    with pytest.raises(ValueError):
+        storage.write_file(str(tmpdir.join("todo.txt")), "", 'sometimes')
+
+
+def mutate(todos, rng, step):
+    action = rng.randrange(5)
+    if action == 0 or len(todos) < 2:
+        todos.append("Task {0} @ctx{1}".format(step, step % 3), add_creation_date=False)
+    elif action == 1:
+        todos.delete(rng.randrange(len(todos)))
+    elif action == 2:
+        todos.swap(rng.randrange(len(todos)), rng.randrange(len(todos)))
+    elif action == 3:
+        todos[rng.randrange(len(todos))].complete()
+    elif rng.random() < 0.05:
+        todos.sorted()
+    else:
+        todos[rng.randrange(len(todos))].change_priority(rng.choice("ABC"))
+
+
+@pytest.mark.parametrize("use_journal", [False, True])
+def test_background_saver_under_mutation(tmpdir, use_journal):
+    path = tmpdir.join("todo.txt")
+    path.write("".join("Item {0}\n".format(i) for i in range(200)))
+    log = journal.Journal(str(path) + ".journal") if use_journal else None
+    lines = path.readlines()
+    todos = todo.Todos(log.replay(lines) if log else lines, str(path), None, durability='none', journal=log)
+    saver = storage.BackgroundSaver(todos)
+    rng = random.Random(3)
+    for step in range(1000):
+        mutate(todos, rng, step)
+        if step % 25 == 0:
+            saver.save()
+        if step % 5 == 0:
+            assert saver.collect() == []
+    saver.save()
+    assert saver.close() == []
+    assert not todos.is_modified()
+
+    lines = path.readlines()
+    if use_journal:
+        lines = journal.Journal(str(path) + ".journal").replay(lines)
+    assert [line.strip() for line in lines] == [t.raw for t in todos.todo_items]
+
+
+def test_background_saver_reports_failures(tmpdir):
+    todos = todo.Todos(["Item"], str(tmpdir.join("missing", "todo.txt")), None)
+    saver = storage.BackgroundSaver(todos)
+    assert not saver.save()
+    todos[0].complete()
+    assert saver.save()
+    assert len(saver.wait()) == 1
+    assert todos.is_modified()
+    assert saver.save()
+    assert len(saver.close()) == 1
+
+
+def test_background_saver_skips_journal_after_failed_rewrite(tmpdir, monkeypatch):
+    path = tmpdir.join("todo.txt")
+    path.write("z\nc\na\nb\n")
+    log = journal.Journal(str(path) + ".journal")
+    todos = todo.Todos(log.replay(path.readlines()), str(path), None, durability='none', journal=log)
+    saver = storage.BackgroundSaver(todos)
+    todos.delete(0)
+    saver.save()
+    assert saver.wait() == []
+
+    def fail_once(*args):
+        monkeypatch.undo()
+        raise IOError("disk full")
+    monkeypatch.setattr(todo, "write_file", fail_once)
+    todos.sorted()
+    saver.save()
+    todos.delete(0)
+    saver.save()
+    assert len(saver.wait()) == 2
+    assert [line.strip() for line in log.replay(path.readlines())] == ["c", "a", "b"]
+
+    assert saver.save()
+    assert saver.close() == []
+    assert [t.raw for t in todos.todo_items] == ["b", "c"]
+    assert [line.strip() for line in log.replay(path.readlines())] == ["b", "c"]
@@ -1,8 +1,10 @@
 #!/usr/bin/env python
 # coding=utf-8
 import pytest
+import random
 from datetime import date
 from .. import todo
+from ..journal import content_hash
 
 import pprint
 pp = pprint.PrettyPrinter(indent=4).pprint
@@ -15,7 +17,7 @@ def todos():
         "(B) Schedule Goodwill pickup +GarageSale @phone",
         "Unpack the guest bedroom +Unpacking due:2013-10-20",
         "2013-10-19 Post signs around the neighborhood +GarageSale",
-        "x 2013-10-01 @GroceryStore Eskimo pies"], './todo.txt', './archive.txt')
+        "x 2013-10-01 @GroceryStore Eskimo pies"], './todo.txt', './archive.txt', consistency_checks=True)
 
 
 @pytest.fixture
@@ -399,19 +401,97 @@ def test_todos_insert(todos, today):
     assert [todo.raw_index for todo in todos.todo_items] == [0, 1, 2, 3, 4, 5, 6, 7]
 
 
+def test_todos_insert_keeps_file_order(todos):
+    todos.sorted()
+    todos.insert(1, "Call the plumber", add_creation_date=False)
+    todos.insert(0, "Water the plants", add_creation_date=False)
+    # each goes right after its neighbour above in the list, the first one
+    # before the first todo
+    todos.sorted_raw()
+    assert [t.raw for t in todos] == [
+        "Water the plants",
+        "(A) Thank Mom for the dinner @phone",
+        "Call the plumber",
+        "(B) Schedule Goodwill pickup +GarageSale @phone",
+        "Unpack the guest bedroom +Unpacking due:2013-10-20",
+        "2013-10-19 Post signs around the neighborhood +GarageSale",
+        "x 2013-10-01 @GroceryStore Eskimo pies"]
+    assert [t.raw_index for t in todos] == list(range(7))
+
+
+def test_todos_order_keys_renumber(todos):
+    # halves the same gap until the keys run out
+    for n in range(30):
+        todos.insert(1, "Squeezed {0}".format(n), add_creation_date=False)
+    assert [t.raw for t in todos][1:3] == ["Squeezed 29", "Squeezed 28"]
+    assert [t.raw_index for t in todos] == list(range(len(todos)))
+    for n in range(50):
+        todos.insert(1, "Insert {0}".format(n), add_creation_date=False)
+        todos.delete(len(todos) - 1 if n % 7 == 0 else 3)
+        todos.insert(0, "First {0}".format(n), add_creation_date=False)
+    assert [t.raw_index for t in todos] == list(range(len(todos)))
+    before = [t.raw for t in todos]
+    todos.swap(0, 1)
+    assert [t.raw_index for t in todos][:3] == [1, 0, 2]
+    todos.sorted_raw()
+    assert [t.raw for t in todos] == before
+
+
+def test_todos_position_without_a_position_map(todos):
+    for n in range(20):
+        todos.insert(n % 3, "Insert {0}".format(n), add_creation_date=False)
+        todos.delete(todos.position(todos[n % 5 + 1]))
+        assert [todos.position(t) for t in todos] == list(range(len(todos)))
+    # in file order a bisection finds the todo, no map needs building
+    assert todos._positions is None
+    assert todos.in_list_order([todos[3], todos[0], todos[2]]) == [todos[0], todos[2], todos[3]]
+    with pytest.raises(KeyError):
+        todos.position(todo.Todo("Not in the list", 0))
+    todos.swap(0, 1)
+    todos.insert(1, "After the swap", add_creation_date=False)
+    assert [todos.position(t) for t in todos] == list(range(len(todos)))
+    assert todos.in_list_order([todos[3], todos[0], todos[2]]) == [todos[0], todos[2], todos[3]]
+    todos.sorted_raw()
+    assert [todos.position(t) for t in todos] == list(range(len(todos)))
+
+
+def test_todos_order_keys_random_edits(todos):
+    rng = random.Random(3)
+    todos.sorted()
+    expected = [t.raw for t in sorted(todos, key=lambda t: t.raw_index)]
+    for n in range(400):
+        index = rng.choice([0, 1, 2, len(todos)]) if n % 3 else rng.randrange(len(todos) + 1)
+        if rng.random() < 0.3 and len(todos) > 1:
+            index = min(index, len(todos) - 1)
+            expected.remove(todos[index].raw)
+            todos.delete(index)
+        else:
+            raw = "Todo {0}".format(n)
+            # right after its neighbour above in the list, or first
+            position = expected.index(todos[index - 1].raw) + 1 if index else (
+                expected.index(todos[0].raw) if len(todos) else 0)
+            expected.insert(position, raw)
+            todos.insert(index, raw, add_creation_date=False)
+    assert [t.raw for t in sorted(todos, key=lambda t: t.raw_index)] == expected
+    todos.sorted_raw()
+    assert [t.raw for t in todos] == expected
+
+
 def test_todos_search(todos):
     assert [t.raw for t in todos.search("the")] == [
         "(A) Thank Mom for the dinner @phone",
         "Unpack the guest bedroom +Unpacking due:2013-10-20",
         "2013-10-19 Post signs around the neighborhood +GarageSale"]
     # one match per line!
-    assert [t.search_matches for t in todos.search("the")] == [('the',), ('the',), ('the',)]
+    results = todos.search("the")
+    assert [results.matches(t) for t in results] == [('the',), ('the',), ('the',)]
     assert [t.raw for t in todos.search("te")] == [
         "(A) Thank Mom for the dinner @phone",
         "Unpack the guest bedroom +Unpacking due:2013-10-20",
         "2013-10-19 Post signs around the neighborhood +GarageSale",
         "x 2013-10-01 @GroceryStore Eskimo pies"]
-    assert [t.search_matches for t in todos.search("te")] == [('the',), ('t be',), ('the',), ('tore',)]
+    results = todos.search("te")
+    assert [results.matches(t) for t in results] == [('the',), ('t be',), ('the',), ('tore',)]
 
     assert todos.search(".*") == []
     assert todos.search("{b}") == []
@@ -424,9 +504,11 @@ def test_todos_search(todos):
         "x 2013-10-01 @GroceryStore Eskimo pies"])
 
     assert [t.raw for t in todos.search(".*")] == ["(A) 1999-12-24 .Thank* Mom for the .dinner* @phone"]
-    assert [t.search_matches for t in todos.search(".*")] == [('.dinner*',)]
+    results = todos.search(".*")
+    assert [results.matches(t) for t in results] == [('.dinner*',)]
     assert [t.raw for t in todos.search("{b}")] == ["Unpack the guest {bedroom} +Unpacking due:2013-10-20"]
-    assert [t.search_matches for t in todos.search("{b}")] == [('{bedroom}',)]
+    results = todos.search("{b}")
+    assert [results.matches(t) for t in results] == [('{bedroom}',)]
 
 
 def test_todos_swap(todos):
@@ -455,3 +537,365 @@ def test_change_priority(todos):
     assert todos[4].raw == "x 2013-10-01 (C) @GroceryStore Eskimo pies"
     todos[4].change_priority('')
     assert todos[4].raw == "x 2013-10-01 @GroceryStore Eskimo pies"
+
+
+def legacy_parse(item):
+    return (todo.Todos.priority(item),
+            todo.Todos.contexts(item),
+            todo.Todos.projects(item),
+            todo.Todos.creation_date(item),
+            todo.Todos.due_date(item),
+            todo.Todos.completed_date(item))
+
+
+@pytest.mark.parametrize("line", [
+    "",
+    "   ",
+    "(A) Thank Mom for the dinner @phone",
+    "(A)No Priority",
+    "(a) 2011-03-02 lowercase priority still has a creation date",
+    "(1) 2011-03-02 digit priority",
+    "No Priority (A) @phone",
+    "x 2012-03-03 (A) 2011-03-02 Document +TodoTxt task format",
+    "x 2012-03-03 2011-03-02 Document +TodoTxt task format",
+    "x 2012-03-03 just done",
+    "x2012-03-03 not done",
+    "X 2012-03-03 not done either",
+    "2013-10-19abc glued creation date",
+    "  (A) leading whitespace @phone",
+    "Thank Mom @phone @email mom@email.com NotA+Project +GarageSale",
+    "lonely @ and + signs",
+    "@start +start mid@dle end@",
+    "@dup @dup +dup +dup",
+    "tabs\t@tab\t+tab\tdue:2013-10-20",
+    "nbsp @nbsp +nbsp",
+    "due:2013-10-20 due:2014-01-01 first one wins",
+    "overdue:2013-10-20 still counts",
+    "@ctx-due:2013-10-20 due inside a context",
+    "due:2013-1-20 bad due date due:2013-10-21",
+    "due: 2013-10-20 detached",
+    "(A) x 2012-03-03 priority before completion",
+    "line with trailing newline @phone\n",
+])
+def test_todos_tokenize_matches_static_parsers(line):
+    assert todo.Todos.tokenize(line) == legacy_parse(line)
+
+
+def test_todos_tokenize_matches_static_parsers_random_lines():
+    words = ["x", "(A)", "(b)", "(Z)", "()", "2013-10-19", "2013-1-19", "due:2013-10-20",
+             "due:", "overdue:2014-02-02", "@phone", "@", "+", "+Project", "mom@email.com",
+             "a+b", "@a@b", "Eskimo", "pies", "\t", "  ", " ", "x 2012-03-03"]
+    rng = random.Random(1)
+    for _ in range(2000):
+        line = " ".join(rng.choice(words) for _ in range(rng.randrange(1, 9)))
+        assert todo.Todos.tokenize(line) == legacy_parse(line), line
+
+
+def test_todo_update_uses_all_fields(todos):
+    t = todos[0]
+    t.update("x 2013-10-25 2013-10-01 Unpack +Unpacking @home due:2013-10-20")
+    assert t.priority == ""
+    assert t.contexts == ["@home"]
+    assert t.projects == ["+Unpacking"]
+    assert t.creation_date == "2013-10-01"
+    assert t.due_date == "2013-10-20"
+    assert t.completed_date == "2013-10-25"
+
+
+def test_todo_highlight_is_lazy_and_cached(todos):
+    t = todos[1]
+    assert t._highlights is None
+    colored = t.colored
+    assert t.colored is colored
+    bordered = t.highlight(show_due_date=False, show_contexts=False, show_projects=False)
+    assert t.highlight(show_due_date=False, show_contexts=False, show_projects=False) is bordered
+    assert bordered is not colored
+    assert ('context', '@phone') in colored[1]
+    assert ('context', '@phone') not in bordered[1]
+
+
+def test_todo_highlight_cache_follows_raw(todos):
+    t = todos[0]
+    colored = t.colored
+    t.update(t.raw)
+    assert t.colored is colored
+    t.change_priority('B')
+    assert t.colored[0] == 'priority_b'
+    t.complete()
+    assert t.colored[0] == 'completed'
+
+
+def test_todo_has_no_instance_dict(todos):
+    assert not hasattr(todos[0], '__dict__')
+
+
+def test_todos_intern_tags_and_dates(todos):
+    todos.append("(C) 2013-10-19 Another garage sale task +GarageSale @phone", add_creation_date=False)
+    first, second = todos[1], todos[5]
+    assert first._projects is second._projects
+    assert first._contexts[0] is second._contexts[0]
+    assert todos[3]._creation_date is second._creation_date
+    assert second._creation_date == 20131019
+    assert second.creation_date == "2013-10-19"
+
+
+@pytest.mark.parametrize("value", ["", "2013-10-20", "2000-20-12", "0001-01-01"])
+def test_date_ordinal_round_trip(value):
+    assert todo.date_string(todo.date_ordinal(value)) == value
+
+
+def test_date_ordinal_sorts_by_date():
+    dates = ["2014-01-01", "2013-12-31", "2013-02-28", "2013-10-20"]
+    assert sorted(dates) == [todo.date_string(o) for o in sorted(todo.date_ordinal(d) for d in dates)]
+
+
+def test_todos_tag_index_follows_mutations(todos):
+    todos.check_consistency()
+    todos.append("New task @phone +NewProject")
+    todos.insert(0, "Another @errands")
+    todos.check_consistency()
+    todos[1].update("(A) Thank Mom for the dinner @email")
+    todos.delete(2)
+    todos.check_consistency()
+    assert todos.all_contexts() == ["@GroceryStore", "@email", "@errands", "@phone"]
+    assert todos.all_projects() == ["+GarageSale", "+NewProject", "+Unpacking"]
+    assert todos.tag_count("@phone") == 1
+    assert todos.tag_count("@nowhere") == 0
+    todos.update(["Fresh start @home"])
+    todos.check_consistency()
+    assert todos.all_contexts() == ["@home"]
+    assert todos.all_projects() == []
+
+
+def test_todos_tag_count(todos):
+    assert todos.tag_count("@phone") == 2
+    assert todos.tag_count("+GarageSale") == 2
+    assert todos.tag_count("+Unpacking") == 1
+
+
+def test_todos_complete_tag(todos):
+    assert todos.complete_tag("@") == ["@phone", "@GroceryStore"]
+    assert todos.complete_tag("+") == ["+GarageSale", "+Unpacking"]
+    assert todos.complete_tag("@g") == ["@GroceryStore"]
+    assert todos.complete_tag("+garage") == ["+GarageSale"]
+    assert todos.complete_tag("@x") == []
+    assert todos.complete_tag("") == ["+GarageSale", "@phone", "+Unpacking", "@GroceryStore"]
+
+
+def test_todos_complete_tag_follows_mutations(todos):
+    todos.complete_tag("@")
+    todos.append("Buy glue @GroceryStore", add_creation_date=False)
+    todos.append("Buy paint @GroceryStore @garage", add_creation_date=False)
+    assert todos.complete_tag("@g") == ["@GroceryStore", "@garage"]
+    todos.delete(len(todos) - 1)
+    assert todos.complete_tag("@g") == ["@GroceryStore"]
+    todos.update(["Fresh start @home"])
+    assert todos.complete_tag("@") == ["@home"]
+
+
+def test_todos_filters_follow_list_order(todos):
+    todos.sorted_reverse()
+    assert [t.raw for t in todos.filter_contexts_and_projects(["@phone"], ["+Unpacking"])] == [
+        "Unpack the guest bedroom +Unpacking due:2013-10-20",
+        "(B) Schedule Goodwill pickup +GarageSale @phone",
+        "(A) Thank Mom for the dinner @phone"]
+    todos.swap(3, 4)
+    assert [t.raw for t in todos.filter_context("@phone")] == [
+        "(A) Thank Mom for the dinner @phone",
+        "(B) Schedule Goodwill pickup +GarageSale @phone"]
+
+
+def test_todos_counts_follow_mutations(todos, tmpdir):
+    assert (todos.pending_items_count(), todos.done_items_count()) == (4, 1)
+    todos[0].complete()
+    todos[1].change_priority('C')
+    assert (todos.pending_items_count(), todos.done_items_count()) == (3, 2)
+    todos[4].incomplete()
+    todos.append("x 2013-10-02 Already done", add_creation_date=False)
+    todos.insert(0, "Not done yet")
+    assert (todos.pending_items_count(), todos.done_items_count()) == (5, 2)
+    todos[1].update("Reopened (A) 1999-12-24 Thank Mom")
+    todos.delete(len(todos) - 1)
+    assert (todos.pending_items_count(), todos.done_items_count()) == (6, 0)
+
+    todos[2].complete()
+    todos.archive_path = str(tmpdir.join("done.txt"))
+    todos.file_path = str(tmpdir.join("todo.txt"))
+    assert todos.archive_done()
+    assert (todos.pending_items_count(), todos.done_items_count()) == (5, 0)
+
+
+def test_todos_archive(todos, tmpdir):
+    todos.archive_path = str(tmpdir.join("done.txt"))
+    todos.file_path = str(tmpdir.join("todo.txt"))
+    todos.append("x 2014-02-01 Sold the lamp +GarageSale", add_creation_date=False)
+    todos.append("x 2013-10-05 Priced the books +GarageSale", add_creation_date=False)
+    todos[1].complete()
+    completed = todos[1].raw
+
+    assert todos.archive(lambda t: "+GarageSale" in t.projects and t.completed_date < "2014-01-01")
+    assert tmpdir.join("done.txt").read() == "x 2013-10-05 Priced the books +GarageSale\n"
+    assert [t.raw_index for t in todos] == list(range(6))
+    assert todos.filter_project("+GarageSale") == [todos[1], todos[3], todos[5]]
+    assert todos.done_items_count() == 3
+
+    assert todos.archive_done()
+    assert tmpdir.join("done.txt").read().splitlines()[1:] == [
+        completed, "x 2013-10-01 @GroceryStore Eskimo pies", "x 2014-02-01 Sold the lamp +GarageSale"]
+    assert [t.raw for t in todos] == [
+        "(A) Thank Mom for the dinner @phone",
+        "Unpack the guest bedroom +Unpacking due:2013-10-20",
+        "2013-10-19 Post signs around the neighborhood +GarageSale"]
+    assert tmpdir.join("todo.txt").read() == "".join(t.raw + "\n" for t in todos)
+    assert todos.done_items_count() == 0
+    assert todos.filter_context("@GroceryStore") == []
+
+    todos.archive_path = None
+    assert not todos.archive_done()
+
+
+def test_todos_save_skips_unchanged_file(todos, tmpdir):
+    todo_file = tmpdir.join("todo.txt")
+    todos.file_path = str(todo_file)
+    assert not todos.is_modified()
+    assert not todos.save()
+    assert not todo_file.check()
+
+    todos[0].change_priority('C')
+    assert todos.is_modified()
+    assert todos.save()
+    assert todo_file.read().startswith("(C) Thank Mom")
+    assert not todos.is_modified()
+
+    todo_file.write("Changed behind our back\n")
+    assert not todos.save()
+    assert todo_file.read() == "Changed behind our back\n"
+    todos.swap(0, 1)
+    assert todos.save()
+    assert todo_file.read().startswith("(B) Schedule")
+
+
+def test_todos_reload_leaves_nothing_to_save(todos, tmpdir):
+    todo_file = tmpdir.join("todo.txt")
+    todo_file.write("Reloaded @home\n")
+    todos.file_path = str(todo_file)
+    todos.delete(0)
+    todos.reload_from_file()
+    assert not todos.is_modified()
+    assert [t.raw for t in todos] == ["Reloaded @home"]
+
+
+def test_todos_reconcile_reuses_unchanged_todos(todos):
+    before = list(todos.todo_items)
+    changeset = todos.reconcile([
+        "x 2013-10-01 @GroceryStore Eskimo pies\n",
+        "(A) Thank Mom for the dinner @phone\n",
+        "\n",
+        "New line @home +Unpacking\n",
+        "2013-10-19 Post signs around the neighborhood +GarageSale\n"])
+    assert [t.raw for t in todos] == [
+        "x 2013-10-01 @GroceryStore Eskimo pies",
+        "(A) Thank Mom for the dinner @phone",
+        "New line @home +Unpacking",
+        "2013-10-19 Post signs around the neighborhood +GarageSale"]
+    assert todos[0] is before[4]
+    assert todos[1] is before[0]
+    assert todos[3] is before[3]
+    # the new line took the place of the second line, so it is an edit of it
+    assert todos[2] is before[1]
+    assert changeset == todo.Changeset(added=[], removed=[2], modified=[2], moved=[0])
+    assert [t.raw_index for t in todos] == [0, 1, 2, 3]
+    assert before[2].todos is None
+    assert todos.all_contexts() == ["@GroceryStore", "@home", "@phone"]
+    assert todos.tag_count("+Unpacking") == 1
+
+
+def test_todos_reconcile_random_edits():
+    rng = random.Random(11)
+    lines = ["Task {0} @ctx{1} +proj{2}".format(i, i % 5, i % 3) for i in range(300)]
+    todos = todo.Todos(lines, './todo.txt', './archive.txt', consistency_checks=True)
+    for round in range(20):
+        before = list(todos.todo_items)
+        lines = [t.raw for t in before]
+        for edit in range(rng.randrange(1, 6)):
+            action = rng.randrange(4)
+            index = rng.randrange(len(lines))
+            if action == 0:
+                lines.insert(index, "Inserted {0}.{1} @new".format(round, edit))
+            elif action == 1:
+                del lines[index]
+            elif action == 2:
+                lines[index] += " edited"
+            else:
+                lines.insert(rng.randrange(len(lines)), lines.pop(index))
+        changeset = todos.reconcile(lines)
+        assert [t.raw for t in todos] == lines
+        assert len(todos) == len(before) - len(changeset.removed) + len(changeset.added)
+        kept = set(before) - set(before[i] for i in changeset.removed)
+        assert set(todos.todo_items) - set(todos[i] for i in changeset.added) == kept
+        for index in changeset.modified + changeset.moved:
+            assert todos[index] in kept
+        assert len(changeset.added) + len(changeset.removed) + len(changeset.modified) + len(changeset.moved) <= 10
+    generation = todos.generation
+    assert todos.reconcile([t.raw + "\n" for t in todos]) == todo.Changeset([], [], [], [])
+    assert todos.generation == generation
+
+
+def test_todos_reload_from_file_keeps_todos(todos, tmpdir):
+    todo_file = tmpdir.join("todo.txt")
+    todo_file.write("".join(t.raw + "\n" for t in todos) + "Added elsewhere\n")
+    todos.file_path = str(todo_file)
+    first = todos[0]
+    todos.reload_from_file()
+    assert todos[0] is first
+    assert todos[5].raw == "Added elsewhere"
+    assert not todos.is_modified()
+    assert todos.file_hash is not None
+
+
+def test_todos_file_hash_is_known_before_the_file_changes(todos, tmpdir, monkeypatch):
+    todos.file_path = str(tmpdir.join("todo.txt"))
+    todos[0].complete()
+    seen = []
+    write_file = todo.write_file
+
+    def checking_write_file(path, data, durability):
+        seen.append(todos.file_hash == content_hash(data.splitlines(True)))
+        write_file(path, data, durability)
+    monkeypatch.setattr(todo, "write_file", checking_write_file)
+    todos.save()
+    assert seen == [True]
+
+    def failing_write_file(path, data, durability):
+        raise IOError("disk full")
+    monkeypatch.setattr(todo, "write_file", failing_write_file)
+    saved_hash = todos.file_hash
+    todos[1].complete()
+    with pytest.raises(IOError):
+        todos.save()
+    assert todos.file_hash == saved_hash
+
+
+def test_todos_deleted_todo_no_longer_counts(todos):
+    t = todos[4]
+    todos.delete(4)
+    t.incomplete()
+    assert (todos.pending_items_count(), todos.done_items_count()) == (4, 0)
+
+
+def test_todos_search_keeps_index_current(todos):
+    assert [t.raw for t in todos.search("eskimo")] == ["x 2013-10-01 @GroceryStore Eskimo pies"]
+    todos[4].update("x 2013-10-01 @GroceryStore Ice cream")
+    todos.append("Buy eskimo pies @GroceryStore", add_creation_date=False)
+    todos.insert(0, "Eskimo pies again", add_creation_date=False)
+    todos.delete(5)
+    assert [t.raw for t in todos.search("eskimo")] == ["Eskimo pies again", "Buy eskimo pies @GroceryStore"]
+    todos.check_consistency()
+
+
+def test_todos_search_matches_full_scan(todos):
+    lines = [t.raw for t in todos] + [u"Caf\xe9 au lait @Kitchen", "The end"]
+    todos.update(lines)
+    for query in ["the", "te", "k", "e @", "2013", ".*", "Z", "ph", "\\?", "a\\b"]:
+        regex = todo.Todos.search_regex(query)
+        assert todos.search(query) == [t for t in todos.todo_items if regex.search(t.raw)]
@@ -0,0 +1,327 @@
+#!/usr/bin/env python
+# coding=utf-8
+import pytest
+from .. import todo
+from .. import keys
+from .. import urwid_ui
+
+
+class FakeColorscheme(object):
+    focus_map = {}
+    colors = {}
+
+
+class FakeUI(object):
+    key_bindings = keys.KeyBindings({})
+    colorscheme = FakeColorscheme()
+    wrapping = ['clip']
+    border = ['no border']
+    searching = False
+    search_string = ''
+
+
+@pytest.fixture
+def todos():
+    return todo.Todos(["Item {0} @context{1}".format(i, i % 7) for i in range(1000)],
+                      './todo.txt', './archive.txt', consistency_checks=True)
+
+
+@pytest.fixture
+def walker(todos):
+    return urwid_ui.TodoListWalker(FakeUI(), todos.todo_items, cache_size=16)
+
+
+def test_walker_builds_widgets_on_demand(walker, todos):
+    assert len(walker) == 1000
+    assert walker.cached_widgets() == []
+    widget = walker[500]
+    assert widget.todo is todos[500]
+    assert walker[500] is widget
+    assert len(walker.cached_widgets()) == 1
+
+
+def test_walker_cache_is_bounded(walker):
+    for position in walker.positions():
+        walker[position]
+    assert len(walker.cached_widgets()) == 16
+
+
+def test_walker_keeps_editing_widgets(walker, todos):
+    walker.insert(0, todos[0], editing=True)
+    editing = walker[0]
+    assert editing.editing
+    for position in walker.positions():
+        walker[position]
+    assert walker[0] is editing
+
+
+def test_walker_positions(walker):
+    assert walker.next_position(0) == 1
+    assert walker.prev_position(1) == 0
+    with pytest.raises(IndexError):
+        walker.prev_position(0)
+    with pytest.raises(IndexError):
+        walker.next_position(999)
+    with pytest.raises(IndexError):
+        walker[-1]
+    assert list(walker.positions(reverse=True))[:2] == [999, 998]
+
+
+def test_walker_mutations(walker, todos):
+    walker.set_focus(999)
+    assert walker.pop().raw == "Item 999 @context5"
+    assert walker.focus == 998
+    walker.swap(0, 1)
+    assert walker[0].todo is todos[1]
+    del walker[0]
+    assert walker[0].todo is todos[0]
+    walker.append(todos[999])
+    assert walker[len(walker) - 1].todo is todos[999]
+
+
+def test_walker_updates_cached_widgets(walker):
+    widget = walker[3]
+    walker.update_widgets(wrapping='space')
+    assert widget.wrapping == 'space'
+
+
+def test_walker_replace_signals_once(walker, todos):
+    walker[10]
+    walker.set_focus(500)
+    signals = []
+    walker._modified = lambda: signals.append(True)
+    walker.replace(todos.todo_items[:3])
+    assert signals == [True]
+    assert len(walker) == 3
+    assert walker.focus == 0
+    assert walker.cached_widgets() == []
+
+
+def test_walker_reads_views_lazily(walker, todos):
+    read = []
+    view = todos.search("item").filter(lambda todo: read.append(todo) or True)
+    walker.replace(view)
+    assert walker[0].todo is todos[0]
+    assert walker.next_position(0) == 1
+    assert len(read) == 2
+    walker.swap(0, 1)
+    assert walker[0].todo is todos[1]
+    assert len(walker) == 1000
+
+
+def test_advanced_edit_dispatches_bound_keys():
+    ui = FakeUI()
+    edit = urwid_ui.AdvancedEdit(ui, ui.key_bindings, edit_text="call mom @phone")
+    edit.set_edit_pos(len(edit.edit_text))
+    edit.keypress((40,), 'ctrl w')
+    assert edit.edit_text == "call mom "
+    assert ui.yanked_text == "@phone"
+    edit.keypress((40,), 'ctrl a')
+    assert edit.edit_pos == 0
+    edit.keypress((40,), 'x')
+    assert edit.edit_text == "xcall mom "
+
+
+def test_todo_widget_completions_cycle_most_used_first(todos):
+    ui = FakeUI()
+    ui.todos = todos
+    widget = urwid_ui.TodoWidget(todos[0], ui.key_bindings, ui.colorscheme, ui)
+    completion_data = {}
+    assert widget.completions("Call @context", completion_data) == "Call @context0"
+    assert widget.completions("Call @context", completion_data) == "Call @context1"
+    assert widget.completions("@context6", {}) == "@context6: "
+    assert widget.completions("Call @nowhere", {}) == "Call @nowhere"
+
+
+class FakeLoop(object):
+
+    def __init__(self):
+        self.alarms = []
+
+    def set_alarm_in(self, seconds, callback):
+        self.alarms.append((seconds, callback))
+
+    def fire(self):
+        seconds, callback = self.alarms.pop(0)
+        callback(self, None)
+
+
+@pytest.fixture
+def ui(todos, tmpdir):
+    todos.file_path = str(tmpdir.join("todo.txt"))
+    ui = urwid_ui.UrwidUI(todos, keys.KeyBindings({}), FakeColorscheme())
+    ui.loop = FakeLoop()
+    ui.update_header = lambda message="": setattr(ui, 'header_message', message)
+    return ui
+
+
+def test_every_reschedules_on_the_loop(ui):
+    calls = []
+    ui.every(30, lambda: calls.append(True))
+    assert [seconds for seconds, callback in ui.loop.alarms] == [30]
+    ui.loop.fire()
+    ui.loop.fire()
+    assert calls == [True, True]
+    assert len(ui.loop.alarms) == 1
+
+
+def test_autosave_only_writes_changes(ui, tmpdir):
+    ui.autosave()
+    assert not tmpdir.join("todo.txt").check()
+    ui.todos[0].complete()
+    ui.autosave()
+    assert ui.header_message == "Saved"
+    assert tmpdir.join("todo.txt").read().startswith("x ")
+
+
+class FakeWatcher(object):
+    changes = True
+
+    def changed(self):
+        changed, self.changes = self.changes, False
+        return changed
+
+
+@pytest.fixture
+def watched_ui(ui, tmpdir):
+    tmpdir.join("todo.txt").write("".join(t.raw + "\n" for t in ui.todos))
+    ui.todos.reload_from_file()
+    ui.listbox = urwid_ui.ViListBox(ui.key_bindings, urwid_ui.TodoListWalker(ui, ui.todos.todo_items))
+    ui.watcher = FakeWatcher()
+    return ui
+
+
+def test_check_file_ignores_own_writes(watched_ui):
+    items = list(watched_ui.todos.todo_items)
+    watched_ui.check_file()
+    assert watched_ui.todos.todo_items == items
+    assert watched_ui.header_message == ""
+
+
+def test_check_file_reloads_keeping_focus(watched_ui, tmpdir):
+    walker = watched_ui.listbox.body
+    walker.set_focus(500)
+    focused = walker[500]
+    tmpdir.join("todo.txt").write("Added elsewhere\n" + "".join(t.raw + "\n" for t in watched_ui.todos))
+    watched_ui.check_file()
+    assert watched_ui.header_message == "Reloaded"
+    assert walker.focus == 501
+    assert walker[501] is focused
+    assert walker[0].todo.raw == "Added elsewhere"
+
+
+def test_check_file_keeps_unsaved_changes(watched_ui, tmpdir):
+    watched_ui.todos[0].complete()
+    tmpdir.join("todo.txt").write("Changed elsewhere\n")
+    watched_ui.check_file()
+    assert watched_ui.save_conflict
+    assert watched_ui.todos[0].is_complete()
+    watched_ui.autosave()
+    assert tmpdir.join("todo.txt").read() == "Changed elsewhere\n"
+
+
+def test_check_file_waits_for_edits(watched_ui, tmpdir):
+    watched_ui.listbox.body.insert(0, watched_ui.todos[0], editing=True)
+    tmpdir.join("todo.txt").write("Changed elsewhere\n")
+    watched_ui.check_file()
+    assert watched_ui.external_change
+    assert len(watched_ui.loop.alarms) == 1
+
+
+def test_check_file_rebuilds_only_changed_widgets(watched_ui, tmpdir):
+    walker = watched_ui.listbox.body
+    unchanged, edited = walker[0], walker[1]
+    lines = [t.raw for t in watched_ui.todos]
+    lines[1] = "Edited elsewhere"
+    tmpdir.join("todo.txt").write("".join(line + "\n" for line in lines))
+    watched_ui.check_file()
+    assert walker[0] is unchanged
+    assert walker[1] is not edited
+    assert walker[1].todo is edited.todo
+    assert walker[1].todo.raw == "Edited elsewhere"
+
+
+@pytest.mark.parametrize("narrowing", ["search", "filter"])
+def test_check_file_reload_keeps_search_and_filter_focus(watched_ui, tmpdir, narrowing):
+    if narrowing == "search":
+        watched_ui.search_string = "@context3"
+        watched_ui.search_todo_list(watched_ui.search_string)
+    else:
+        watched_ui.active_contexts = ["@context3"]
+        watched_ui.filter_todo_list()
+    walker = watched_ui.listbox.body
+    walker.set_focus(50)
+    focused, other = walker[50], walker[10]
+    lines = [t.raw for t in watched_ui.todos]
+    lines[3] = "Edited elsewhere @context3"
+    tmpdir.join("todo.txt").write("Added elsewhere @context3\n" + "".join(line + "\n" for line in lines))
+    watched_ui.check_file()
+    assert watched_ui.header_message == "Reloaded"
+    assert walker[0].todo.raw == "Added elsewhere @context3"
+    assert walker.focus == 51
+    assert walker[51] is focused
+    assert walker[11] is other
+    assert walker[1].todo.raw == "Edited elsewhere @context3"
+
+
+@pytest.fixture
+def listed_ui(ui):
+    ui.listbox = urwid_ui.ViListBox(ui.key_bindings, urwid_ui.TodoListWalker(ui, ui.todos.todo_items))
+    return ui
+
+
+def test_toggle_sorting_leaves_todo_items_alone(listed_ui):
+    items = list(listed_ui.todos.todo_items)
+    walker = listed_ui.listbox.body
+    listed_ui.toggle_sorting()
+    assert listed_ui.sorting[0] == "Ascending"
+    assert walker.todos == sorted(items, key=lambda t: t.raw)
+    listed_ui.toggle_sorting()
+    assert listed_ui.sorting[0] == "Descending"
+    assert walker.todos == sorted(items, key=lambda t: t.raw, reverse=True)
+    listed_ui.toggle_sorting()
+    assert listed_ui.sorting[0] == "Next"
+    assert walker.todos == listed_ui.todos.next_actions()
+    listed_ui.toggle_sorting()
+    assert listed_ui.sorting[0] == "Unsorted"
+    assert walker.todos == items
+    assert listed_ui.todos.todo_items == items
+    listed_ui.toggle_sorting()
+
+    # edits are picked up without sorting again
+    items[5].update("AAA top of the list")
+    # nothing to swap in a sorted list
+    listed_ui.swap_down()
+    listed_ui.refresh_todo_list()
+    assert walker.todos[0] is items[5]
+    assert listed_ui.todos.todo_items == items
+
+
+def test_next_mode_with_everything_done(listed_ui):
+    for t in listed_ui.todos:
+        t.complete()
+    while listed_ui.sorting[0] != "Next":
+        listed_ui.toggle_sorting()
+    walker = listed_ui.listbox.body
+    assert len(walker) == 0
+    listed_ui.move_selection_top()
+    listed_ui.move_selection_bottom()
+    listed_ui.toggle_complete()
+    listed_ui.priority_up()
+    listed_ui.swap_down()
+    listed_ui.toggle_sorting()
+    assert listed_ui.sorting[0] == "Unsorted"
+    assert len(walker) == len(listed_ui.todos)
+
+
+def test_insert_in_sorted_mode(listed_ui):
+    listed_ui.toggle_sorting()
+    walker = listed_ui.listbox.body
+    walker.set_focus(3)
+    focused = walker.todos[3]
+    listed_ui.add_new_todo(position='insert_after')
+    assert walker.focus == 4
+    new = walker.todos[4]
+    assert new.raw == ""
+    # next to the focused todo in todo.txt as well
+    assert listed_ui.todos.position(new) == listed_ui.todos.position(focused) + 1
@@ -0,0 +1,74 @@
+#!/usr/bin/env python
+# coding=utf-8
+import re
+import pytest
+from .. import todo
+from .. import views
+
+
+@pytest.fixture
+def todos():
+    return todo.Todos(["Item {0} @context{1}".format(i, i % 7) for i in range(100)],
+                      './todo.txt', './archive.txt', consistency_checks=True)
+
+
+class CountingRegex(object):
+    def __init__(self, pattern):
+        self.regex = re.compile(pattern)
+        self.searched = 0
+
+    def search(self, text):
+        self.searched += 1
+        return self.regex.search(text)
+
+
+def test_view_reads_only_what_is_asked_for(todos):
+    regex = CountingRegex("(Item 1)")
+    view = views.SearchView(todos.todo_items, regex)
+    assert view[0] is todos[1]
+    assert regex.searched == 2
+    assert view[1] is todos[10]
+    assert regex.searched == 11
+    assert [t.raw for t in view][:2] == ["Item 1 @context1", "Item 10 @context3"]
+    assert regex.searched == 100
+    assert len(view) == 11
+    assert regex.searched == 100
+
+
+def test_view_sequence_methods(todos):
+    view = views.TodoView(todos.todo_items[:5])
+    assert view
+    assert not views.TodoView([])
+    assert view[-1] is todos[4]
+    assert view[1:3] == [todos[1], todos[2]]
+    assert todos[3] in view
+    assert todos[5] not in view
+    assert view.index(todos[2]) == 2
+    with pytest.raises(ValueError):
+        view.index(todos[5])
+    with pytest.raises(IndexError):
+        view[5]
+
+
+def test_views_compose(todos):
+    view = todos.search("@context1").filter(lambda t: t.raw < "Item 3").sorted(lambda t: t.raw, reverse=True)
+    assert [t.raw for t in view] == ["Item 29 @context1", "Item 22 @context1", "Item 15 @context1",
+                                     "Item 1 @context1"]
+    assert view.matches(todos[1]) == ('@context1',)
+    assert view.matches(todos[2]) == ()
+
+
+def test_view_iterators_are_independent(todos):
+    view = todos.search("@context3")
+    first, second = iter(view), iter(view)
+    assert next(first) is next(second) is todos[3]
+    assert next(first) is todos[10]
+    assert list(second) == list(view)[1:]
+
+
+def test_search_matches_are_kept_per_view(todos):
+    first = todos.search("item 5 ")
+    second = todos.search("5 @")
+    assert first[0] is second[0] is todos[5]
+    assert first.matches(todos[5]) == ('Item 5 ',)
+    assert second.matches(todos[5]) == ('5 @',)
@@ -0,0 +1,51 @@
+#!/usr/bin/env python
+# coding=utf-8
+import os
+import pytest
+from .. import watch
+
+
+@pytest.fixture(params=[True, False], ids=["inotify", "polling"])
+def watched(request, tmpdir):
+    path = tmpdir.join("todo.txt")
+    path.write("first\n")
+    watcher = watch.FileWatcher(str(path), use_inotify=request.param)
+    yield path, watcher
+    watcher.close()
+
+
+def test_file_watcher_sees_changes(watched):
+    path, watcher = watched
+    assert not watcher.changed()
+    path.write("second, longer\n")
+    if watcher.fileno() is not None:
+        assert watcher.read_events()
+        assert not watcher.read_events()
+    assert watcher.changed()
+    assert not watcher.changed()
+
+
+def test_file_watcher_sees_replacement(watched, tmpdir):
+    path, watcher = watched
+    other = tmpdir.join("new.txt")
+    other.write("replaced\n")
+    os.rename(str(other), str(path))
+    assert watcher.changed()
+
+
+def test_file_watcher_ignores_other_files(watched, tmpdir):
+    path, watcher = watched
+    tmpdir.join("done.txt").write("unrelated\n")
+    assert not watcher.read_events()
+    assert not watcher.changed()
+
+
+def test_file_watcher_close_releases_the_descriptor(watched):
+    path, watcher = watched
+    fd = watcher.fileno()
+    watcher.close()
+    assert watcher.fileno() is None
+    if fd is not None:
+        with pytest.raises(OSError):
+            os.fstat(fd)
+    watcher.close()
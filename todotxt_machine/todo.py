@@ -1,38 +1,189 @@
 #!/usr/bin/env python
 # coding=utf-8
+import os
 import re
+import bisect
 import random
+import operator
+import string
+import collections
 from datetime import date
 
+from todotxt_machine.search import SearchIndex
+from todotxt_machine.sorting import SortedView, NextActions
+from todotxt_machine.views import TodoView, SearchView
+from todotxt_machine.storage import write_file
+from todotxt_machine.journal import content_hash
 
-class Todo:
+
+# what a save has to write: every line of todo.txt when lines is set,
+# otherwise the journal records
+Snapshot = collections.namedtuple('Snapshot', 'generation lines records')
+
+# what Todos.reconcile() changed: indices into the new list for added,
+# modified (edited in place) and moved todos, into the old one for removed
+Changeset = collections.namedtuple('Changeset', 'added removed modified moved')
+
+# spacing of Todo.order_key values: the keys only need to sort in file
+# order, so an insert takes the midpoint of its neighbours' keys and
+# renumbers nothing until a gap has been split 20 times
+ORDER_KEY_GAP = 1 << 20
+_order_key = operator.attrgetter('order_key')
+
+_packable_date_regex = re.compile(r'[0-9]{4}-[0-9]{2}-[0-9]{2}$')
+
+
+def date_ordinal(value):
+    """
+    Pack a YYYY-MM-DD date string into an int like 20131020.
+
+    The ints sort in date order and take less room than the strings. An
+    empty string packs to 0 and anything that does not round trip (non
+    ASCII digits) is kept as the original string.
+    """
+    if not value:
+        return 0
+    if _packable_date_regex.match(value):
+        ordinal = int(value[:4]) * 10000 + int(value[5:7]) * 100 + int(value[8:])
+        if ordinal:
+            return ordinal
+    return value
+
+
+def date_string(ordinal):
+    """Inverse of date_ordinal."""
+    if not ordinal:
+        return ""
+    if isinstance(ordinal, int):
+        return "{0:04d}-{1:02d}-{2:02d}".format(ordinal // 10000, ordinal // 100 % 100, ordinal % 100)
+    return ordinal
+
+
+class Todo(object):
     """Single Todo item"""
     _priority_regex = re.compile(r'\(([A-Z])\) ')
 
+    # Large todo.txt files hold a lot of these so keep them small: no
+    # instance dict, tags stored as tuples shared through the owning Todos'
+    # symbol table and dates packed into ints with date_ordinal.
+    __slots__ = ('_raw', 'order_key', 'priority', '_contexts', '_projects',
+                 '_creation_date', '_due_date', '_completed_date',
+                 '_highlights', 'todos')
+
     def __init__(self, item, index,
                  colored="", priority="", contexts=[], projects=[],
-                 creation_date="", due_date="", completed_date=""):
+                 creation_date="", due_date="", completed_date="", todos=None, parsed=None):
+        self.todos = todos
+        self._highlights = None
         self.raw = item.strip()
-        self.raw_index = index
+        # where the todo goes in file order, see ORDER_KEY_GAP
+        self.order_key = index
+        if parsed is not None:
+            self.parsed = parsed
+            return
         self.creation_date = creation_date
         self.priority = priority
         self.contexts = contexts
         self.projects = projects
         self.due_date = due_date
         self.completed_date = completed_date
-        self.colored = self.highlight()
-        # self.colored_length = TerminalOperations.length_ignoring_escapes(self.colored)
 
     def update(self, item):
+        todos = self.todos
+        if todos is not None:
+            todos._unregister(self)
+        self._parse(item)
+        if todos is not None:
+            todos._register(self)
+            todos._journal_edit(self)
+            todos._mutated()
+
+    def _parse(self, item):
         self.raw = item.strip()
-        self.priority = Todos.priority(item)
-        self.contexts = Todos.contexts(item)
-        self.projects = Todos.projects(item)
-        self.creation_date = Todos.creation_date(item)
-        self.due_date = Todos.due_date(item)
-        self.completed_date = Todos.completed_date(item)
-        self.colored = self.highlight()
-        # self.colored_length = TerminalOperations.length_ignoring_escapes(self.colored)
+        if self.todos is not None:
+            self.todos._note_parsed_text(item, self.raw)
+        (self.priority, self.contexts, self.projects,
+         self.creation_date, self.due_date, self.completed_date) = Todos.tokenize(item)
+
+    @property
+    def raw(self):
+        return self._raw
+
+    @raw.setter
+    def raw(self, value):
+        # highlight markup is derived from raw, drop it only when raw changes
+        if self._highlights and value != self._raw:
+            self._highlights = None
+        self._raw = value
+
+    @property
+    def colored(self):
+        return self.highlight()
+
+    @property
+    def raw_index(self):
+        """Position of the todo in file order, the order sorted_raw() restores."""
+        if self.todos is None:
+            return self.order_key
+        return self.todos.rank(self)
+
+    @property
+    def parsed(self):
+        """The parsed fields in their stored form, see Todos.parse_cache."""
+        return (self.priority, self._contexts, self._projects,
+                self._creation_date, self._due_date, self._completed_date)
+
+    @parsed.setter
+    def parsed(self, value):
+        (self.priority, contexts, projects,
+         self._creation_date, self._due_date, self._completed_date) = value
+        self._contexts = self._intern(contexts)
+        self._projects = self._intern(projects)
+
+    def _intern(self, value):
+        if self.todos is None:
+            return value
+        return self.todos.intern(value)
+
+    @property
+    def contexts(self):
+        return list(self._contexts)
+
+    @contexts.setter
+    def contexts(self, value):
+        self._contexts = self._intern(tuple(self._intern(c) for c in value))
+
+    @property
+    def projects(self):
+        return list(self._projects)
+
+    @projects.setter
+    def projects(self, value):
+        self._projects = self._intern(tuple(self._intern(p) for p in value))
+
+    @property
+    def creation_date(self):
+        return date_string(self._creation_date)
+
+    @creation_date.setter
+    def creation_date(self, value):
+        self._creation_date = self._intern(date_ordinal(value))
+
+    @property
+    def due_date(self):
+        return date_string(self._due_date)
+
+    @due_date.setter
+    def due_date(self, value):
+        self._due_date = self._intern(date_ordinal(value))
+
+    @property
+    def completed_date(self):
+        return date_string(self._completed_date)
+
+    @completed_date.setter
+    def completed_date(self, value):
+        self._completed_date = self._intern(date_ordinal(value))
 
     def __repr__(self):
         return repr({
@@ -48,28 +199,50 @@ class Todo:
         })
 
     def highlight(self, line="", show_due_date=True, show_contexts=True, show_projects=True):
-        colored = self.raw if line == "" else line
+        """
+        Return urwid markup for the todo.
+
+        Markup for the todo's own raw text is built the first time each
+        show_* combination is asked for and cached until raw changes.
+        """
+        if line != "":
+            return self._build_highlight(line, show_due_date, show_contexts, show_projects)
+        variant = (show_due_date, show_contexts, show_projects)
+        if self._highlights is None:
+            self._highlights = {}
+        elif variant in self._highlights:
+            return self._highlights[variant]
+        markup = self._build_highlight(self.raw, show_due_date, show_contexts, show_projects)
+        self._highlights[variant] = markup
+        return markup
+
+    def _build_highlight(self, line, show_due_date, show_contexts, show_projects):
+        colored = line
         color_list = [colored]
 
         if colored[:2] == "x ":
             color_list = ('completed', color_list)
         else:
-            words_to_be_highlighted = self.contexts + self.projects
-            if self.due_date:
-                words_to_be_highlighted.append("due:" + self.due_date)
-            if self.creation_date:
-                words_to_be_highlighted.append(self.creation_date)
+            contexts = self._contexts
+            projects = self._projects
+            due_date = "due:" + self.due_date
+            creation_date = self.creation_date
+            words_to_be_highlighted = list(contexts + projects)
+            if self._due_date:
+                words_to_be_highlighted.append(due_date)
+            if creation_date:
+                words_to_be_highlighted.append(creation_date)
 
             if words_to_be_highlighted:
                 color_list = re.split("(" + "|".join([re.escape(w) for w in words_to_be_highlighted]) + ")", self.raw)
                 for index, w in enumerate(color_list):
-                    if w in self.contexts:
+                    if w in contexts:
                         color_list[index] = ('context', w) if show_contexts else ''
-                    elif w in self.projects:
+                    elif w in projects:
                         color_list[index] = ('project', w) if show_projects else ''
-                    elif w == "due:" + self.due_date:
+                    elif w == due_date:
                         color_list[index] = ('due_date', w) if show_due_date else ''
-                    elif w == self.creation_date:
+                    elif w == creation_date:
                         color_list[index] = ('creation_date', w)
 
             if self.priority and self.priority in "ABCDEF":
@@ -79,28 +252,29 @@ class Todo:
 
         return color_list
 
-    def highlight_search_matches(self, line=""):
-        colored = self.raw if line == "" else line
-        color_list = [colored]
-        if self.search_matches:
-            color_list = re.split("(" + "|".join([re.escape(match) for match in self.search_matches]) + ")", self.raw)
+    def highlight_search_matches(self, search_matches=()):
+        """Markup of the text with *search_matches*, e.g. from TodoView.matches(), highlighted."""
+        color_list = [self.raw]
+        if search_matches:
+            color_list = re.split("(" + "|".join([re.escape(match) for match in search_matches]) + ")", self.raw)
             for index, w in enumerate(color_list):
-                if w in self.search_matches:
+                if w in search_matches:
                     color_list[index] = ('search_match', w)
         return color_list
 
     def change_priority(self, new_priority):
-        self.priority = new_priority
         if new_priority:
             new_priority = '({}) '.format(new_priority)
 
+        # go through update() with the new text so the owning Todos can
+        # unregister the item as it was before the change
         if re.search(self._priority_regex, self.raw):
-            self.raw = re.sub(self._priority_regex, '{}'.format(new_priority), self.raw)
+            raw = re.sub(self._priority_regex, '{}'.format(new_priority), self.raw)
         elif re.search(r'^x \d{4}-\d{2}-\d{2}', self.raw):
-            self.raw = re.sub(r'^(x \d{4}-\d{2}-\d{2}) ', r'\1 {}'.format(new_priority), self.raw)
+            raw = re.sub(r'^(x \d{4}-\d{2}-\d{2}) ', r'\1 {}'.format(new_priority), self.raw)
         else:
-            self.raw = '{}{}'.format(new_priority, self.raw)
-        self.update(self.raw)
+            raw = '{}{}'.format(new_priority, self.raw)
+        self.update(raw)
 
     def is_complete(self):
         if self.raw[0:2] == "x ":
@@ -111,15 +285,10 @@ class Todo:
             return True
 
     def complete(self):
-        today = date.today()
-        self.raw = "x {0} ".format(today) + self.raw
-        self.completed_date = "{0}".format(today)
-        self.update(self.raw)
+        self.update("x {0} ".format(date.today()) + self.raw)
 
     def incomplete(self):
-        self.raw = re.sub(Todos._completed_regex, "", self.raw)
-        self.completed_date = ""
-        self.update(self.raw)
+        self.update(re.sub(Todos._completed_regex, "", self.raw))
 
     def add_creation_date(self):
         if self.creation_date == "":
@@ -138,33 +307,316 @@ class Todos:
     _due_date_regex = re.compile(r'\s*due:(\d\d\d\d-\d\d-\d\d)\s*')
     _priority_regex = re.compile(r'\(([A-Z])\) ')
     _completed_regex = re.compile(r'^x (\d\d\d\d-\d\d-\d\d) ')
-
-    def __init__(self, todo_items, file_path, archive_path):
+    # completed date, priority and creation date all live at the start of
+    # the line so a single anchored match picks up all three
+    _header_regex = re.compile(r'(?:x (\d\d\d\d-\d\d-\d\d) )?'
+                               r'(?:\((\w)\) )?'
+                               r'(\d\d\d\d-\d\d-\d\d)?')
+    _priorities = frozenset(string.ascii_uppercase)
+
+    def __init__(self, todo_items, file_path, archive_path, consistency_checks=False, durability='fsync',
+                 journal=None, parse_cache=None):
         self.file_path = file_path
         self.archive_path = archive_path
+        # see storage.DURABILITY_LEVELS
+        self.durability = durability
+        # a journal.Journal to save changes to instead of rewriting file_path,
+        # todo_items must then come from its replay()
+        self.journal = journal
+        # content_hash() of file_path as we last read or wrote it, to tell
+        # our own writes from changes made by other programs
+        self.file_hash = None
+        # set by write_snapshot() when a write fails and cleared by the next
+        # full rewrite; until then the journal may not describe the file
+        self._write_failed = False
+        # when set every change is followed by check_consistency(), slow
+        # but handy in tests
+        self.consistency_checks = consistency_checks
+        # bumped on every change to the items or their order
+        self.generation = 0
+        self.symbols = {}
+        # Todo.parsed fields by raw text, e.g. from cache.load(), so the
+        # lines in it need not be parsed again; only used here
+        self.parse_cache = parse_cache or {}
+        # raw texts of todos parsed from a line with whitespace around it,
+        # which can parse differently from the bare text: never cached
+        self._unstripped_texts = set()
         self.update(todo_items)
+        self.parse_cache = {}
+        # the items came from file_path, nothing to save yet
+        self._mark_clean()
+
+    def intern(self, value):
+        """Return the shared copy of a tag, tag tuple or packed date."""
+        return self.symbols.setdefault(value, value)
+
+    def _register(self, todo):
+        """Add *todo* to the tag and search indexes, the sorted views and the done count."""
+        if todo.is_complete():
+            self._done_count += 1
+        self.search_index.add(todo)
+        for view in self._sorted_views.values():
+            view.add(todo)
+        for tag in todo._contexts + todo._projects:
+            items = self.tag_index.get(tag)
+            if items is None:
+                items = self.tag_index[tag] = set()
+                self._forget_sorted_tags(tag)
+            items.add(todo)
+
+    def _unregister(self, todo):
+        """Remove *todo* from the tag and search indexes, the sorted views and the done count."""
+        if todo.is_complete():
+            self._done_count -= 1
+        self.search_index.remove(todo)
+        for view in self._sorted_views.values():
+            view.remove(todo)
+        for tag in todo._contexts + todo._projects:
+            items = self.tag_index.get(tag)
+            if items is not None:
+                items.discard(todo)
+                if not items:
+                    del self.tag_index[tag]
+                    self._forget_sorted_tags(tag)
+
+    def _forget_sorted_tags(self, tag):
+        self._completion_tags = None
+        if tag[0] == "@":
+            self._all_contexts = None
+        else:
+            self._all_projects = None
 
-    def reload_from_file(self):
-        with open(self.file_path, "r") as todotxt_file:
-            self.update(todotxt_file.readlines())
+    def _order_changed(self, in_file_order=None):
+        """
+        todo_items was reordered. *in_file_order* says whether it now lists
+        the todos in file order, None if inserting or deleting left that as
+        it was.
+        """
+        self._positions = None
+        if in_file_order is not None:
+            self._list_in_file_order = in_file_order
+
+    def _journal_record(self, *fields):
+        if self.journal is not None:
+            self.journal.record(*fields)
+
+    def _journal_edit(self, todo):
+        if self.journal is not None:
+            self.journal.record("U", self.position(todo), todo.raw)
+
+    def _mutated(self):
+        self.generation += 1
+        if self.consistency_checks:
+            self.check_consistency()
+
+    def position(self, todo):
+        """Index of *todo* in todo_items."""
+        if self._list_in_file_order:
+            # the usual case, only sorting or swapping todo_items leaves it:
+            # a bisection instead of a position map rebuilt after every
+            # insert or delete
+            index = self.rank(todo)
+            if index < len(self._file_order) and self._file_order[index] is todo:
+                return index
+            raise KeyError(todo)
+        if self._positions is None:
+            self._positions = dict(zip(self.todo_items, range(len(self.todo_items))))
+        return self._positions[todo]
+
+    def in_list_order(self, todos):
+        """Return *todos* sorted by their position in todo_items."""
+        if self._list_in_file_order:
+            return sorted(todos, key=_order_key)
+        return sorted(todos, key=self.position)
+
+    def check_consistency(self):
+        """
+        Compare the incrementally maintained indexes and done count with
+        a full rebuild from todo_items and raise AssertionError on any
+        difference.
+        """
+        self.search_index.check(self.todo_items)
+        for view in self._sorted_views.values():
+            view.check(self.todo_items)
+        done_count = len([t for t in self.todo_items if t.is_complete()])
+        if self._done_count != done_count:
+            raise AssertionError("done count is {0}, expected {1}".format(self._done_count, done_count))
+
+        expected = {}
+        for todo in self.todo_items:
+            for tag in todo._contexts + todo._projects:
+                expected.setdefault(tag, set()).add(todo)
+        if self.tag_index != expected:
+            raise AssertionError("tag index out of date")
+        if (self.all_contexts() != sorted(t for t in expected if t[0] == "@") or
+                self.all_projects() != sorted(t for t in expected if t[0] == "+")):
+            raise AssertionError("sorted tag lists out of date")
+        if self._completion_tags is not None and sorted(self._completion_tags) != sorted(expected):
+            raise AssertionError("completion index out of date")
+        order_keys = [t.order_key for t in self._file_order]
+        if (self._order_keys != order_keys or order_keys != sorted(set(order_keys)) or
+                set(self._file_order) != set(self.todo_items) or len(self._file_order) != len(self.todo_items)):
+            raise AssertionError("file order out of date")
+        if self._list_in_file_order and self._file_order != self.todo_items:
+            raise AssertionError("todo_items is not in file order")
+
+    def is_modified(self):
+        """True if there are changes that save() has not written yet."""
+        return self.generation != self.saved_generation
+
+    def reload_from_file(self, lines=None):
+        """
+        Reread file_path, or take its contents from *lines*, keeping the Todo
+        objects for lines that did not change. Returns the reconcile()
+        Changeset.
+        """
+        if lines is None:
+            with open(self.file_path, "r") as todotxt_file:
+                lines = todotxt_file.readlines()
+        self.file_hash = content_hash(lines)
+        if self.journal is not None:
+            lines = self.journal.replay(lines)
+        changeset = self.reconcile(lines)
+        self._mark_clean()
+        return changeset
+
+    def _mark_clean(self):
+        self.saved_generation = self.snapshot_generation = self.generation
+        self._needs_rewrite = False
 
     def save(self):
-        with open(self.file_path, "w") as todotxt_file:
-            for t in self.todo_items:
-                todotxt_file.write(t.raw + '\n')
+        """
+        Write the changes made since the last save, if any.
+
+        With a journal only the changes are appended to it, unless the whole
+        file has to be rewritten anyway (after a sort, archive or update) or
+        the journal has grown past its compaction size.
+        """
+        if not self.is_modified():
+            return False
+        self._write_snapshot_now(self.snapshot())
+        return True
+
+    def compact(self):
+        """Fold the journal into file_path, True if anything was written."""
+        if not self.is_modified() and (self.journal is None or self.journal.is_empty()):
+            return False
+        self._write_snapshot_now(self.snapshot(rewrite=True))
+        return True
+
+    def _write_snapshot_now(self, snapshot):
+        try:
+            self.write_snapshot(snapshot)
+        except BaseException:
+            self.snapshot_failed(snapshot)
+            raise
+        self.snapshot_saved(snapshot)
+
+    def snapshot(self, rewrite=False):
+        """
+        Freeze what the next save has to write, for write_snapshot() to
+        write later, possibly on another thread. Taking a snapshot hands
+        the journal records collected so far over to it.
+        """
+        rewrite = (rewrite or self.journal is None or self._needs_rewrite or
+                   self._write_failed or self.journal.needs_compaction())
+        records = ()
+        if self.journal is not None:
+            records, self.journal.pending = tuple(self.journal.pending), []
+        self._needs_rewrite = False
+        self.snapshot_generation = self.generation
+        if rewrite:
+            return Snapshot(self.generation, tuple(t.raw + '\n' for t in self.todo_items), ())
+        return Snapshot(self.generation, None, records)
+
+    def write_snapshot(self, snapshot):
+        """
+        Write *snapshot* to disk. Only touches the files and the journal's
+        file state, never the todos, so it can run on a worker thread
+        while the todos keep changing.
+
+        Once a write has failed, snapshots that only hold journal records
+        are refused until a full rewrite succeeds: their records follow
+        changes that never made it to disk.
+        """
+        if snapshot.lines is None and self._write_failed:
+            raise IOError("not saved after an earlier failed save, the next save rewrites {0}".format(self.file_path))
+        try:
+            if snapshot.lines is None:
+                self.journal.append(snapshot.records, self.durability)
+                return
+            # published before the file is renamed into place, so a watcher
+            # waking up right after the rename sees our own contents
+            previous_hash, self.file_hash = self.file_hash, content_hash(snapshot.lines)
+            try:
+                write_file(self.file_path, "".join(snapshot.lines), self.durability)
+            except BaseException:
+                self.file_hash = previous_hash
+                raise
+            if self.journal is not None:
+                self.journal.reset(snapshot.lines, self.durability)
+        except BaseException:
+            self._write_failed = True
+            raise
+        self._write_failed = False
+
+    def snapshot_saved(self, snapshot):
+        """Record that *snapshot* was written successfully."""
+        # after a failed save only a full rewrite brings the file up to date
+        if snapshot.lines is not None or not self._needs_rewrite:
+            self.saved_generation = snapshot.generation
+
+    def snapshot_failed(self, snapshot):
+        """Record that writing *snapshot* failed, the next save rewrites everything."""
+        self._needs_rewrite = True
+        self.saved_generation = self.snapshot_generation = None
 
     def archive_done(self):
-        if self.archive_path is not None:
-            with open(self.archive_path, "a") as donetxt_file:
-                done = self.done_items()
-                for t in done:
-                    donetxt_file.write(t.raw + '\n')
-                    self.todo_items.remove(t)
-
-            self.save()
+        return self.archive()
+
+    def archive(self, predicate=None):
+        """
+        Move the completed todos for which *predicate* is true (all of them
+        if it is None) to the end of done.txt and save, e.g.
+
+            todos.archive(lambda t: t.completed_date < "2014-01-01")
+            todos.archive(lambda t: "+GarageSale" in t.projects)
+
+        False if there is no done.txt to archive to.
+        """
+        if self.archive_path is None:
+            return False
+
+        keep, done = [], []
+        for t in self.todo_items:
+            if t.is_complete() and (predicate is None or predicate(t)):
+                done.append(t)
+            else:
+                keep.append(t)
+        if not done:
             return True
 
-        return False
+        with open(self.archive_path, "a") as donetxt_file:
+            donetxt_file.write("".join(t.raw + '\n' for t in done))
+            if self.durability != 'none':
+                donetxt_file.flush()
+                os.fsync(donetxt_file.fileno())
+        self.todo_items[:] = keep
+        # one pass over each sorted view instead of a removal per todo
+        views, self._sorted_views = self._sorted_views, {}
+        for t in done:
+            self._unregister(t)
+            t.todos = None
+        for view in views.values():
+            view.remove_all(done)
+        self._sorted_views = views
+        self._order_changed()
+        self._set_file_order([t for t in self._file_order if t.todos is self])
+        self._needs_rewrite = True
+        self._mutated()
+
+        self.save()
+        return True
 
     def update(self, todo_items):
         self.parse_raw_entries(todo_items)
@@ -174,16 +626,34 @@ class Todos:
         return len(self.todo_items) - 1
 
     def insert(self, index, item, add_creation_date=True):
-        self.todo_items.insert(index, self.create_todo(item, index))
-        self.update_raw_indices()
-        newtodo = self.todo_items[index]
+        if index < 0:
+            index = max(index + len(self.todo_items), 0)
+        index = min(index, len(self.todo_items))
+        position = self._file_position(index)
+        newtodo = self.create_todo(item, self._new_order_key(position))
+        self.todo_items.insert(index, newtodo)
+        self._order_keys.insert(position, newtodo.order_key)
+        self._file_order.insert(position, newtodo)
+        self._register(newtodo)
+        self._order_changed()
+        self._journal_record("I", index, newtodo.raw)
+        self._mutated()
         if add_creation_date and newtodo.creation_date == "":
             newtodo.add_creation_date()
         return index
 
     def delete(self, index):
-        del self.todo_items[index]
-        self.update_raw_indices()
+        if index < 0:
+            index += len(self.todo_items)
+        todo = self.todo_items.pop(index)
+        position = self.rank(todo)
+        del self._order_keys[position]
+        del self._file_order[position]
+        self._unregister(todo)
+        todo.todos = None
+        self._order_changed()
+        self._journal_record("D", index)
+        self._mutated()
 
     def __iter__(self):
         self.index = -1
@@ -211,10 +681,10 @@ class Todos:
         return [t for t in self.todo_items if t.is_complete()]
 
     def pending_items_count(self):
-        return len(self.pending_items())
+        return len(self.todo_items) - self._done_count
 
     def done_items_count(self):
-        return len(self.done_items())
+        return self._done_count
 
     def __getitem__(self, index):
         return self.todo_items[index]
@@ -223,22 +693,280 @@ class Todos:
         return repr([i for i in self.todo_items])
 
     def create_todo(self, todo, index):
+        # *index* becomes the new Todo's order_key
+        raw = todo.strip()
+        # whitespace around the text changes what tokenize() finds at the
+        # start of the line, the cache only holds fields of bare lines
+        if raw == todo.rstrip("\r\n"):
+            parsed = self.parse_cache.get(raw)
+            if parsed is not None:
+                try:
+                    return Todo(todo, index, todos=self, parsed=parsed)
+                except (ValueError, TypeError):
+                    pass  # a damaged cache entry, parse the line instead
+        else:
+            self._unstripped_texts.add(raw)
+        priority, contexts, projects, creation_date, due_date, completed_date = Todos.tokenize(todo)
         return Todo(todo, index,
-                    contexts=Todos.contexts(todo),
-                    projects=Todos.projects(todo),
-                    priority=Todos.priority(todo),
-                    creation_date=Todos.creation_date(todo),
-                    due_date=Todos.due_date(todo),
-                    completed_date=Todos.completed_date(todo))
+                    contexts=contexts,
+                    projects=projects,
+                    priority=priority,
+                    creation_date=creation_date,
+                    due_date=due_date,
+                    completed_date=completed_date,
+                    todos=self)
+
+    def _note_parsed_text(self, text, raw):
+        if raw != text.rstrip("\r\n"):
+            self._unstripped_texts.add(raw)
+
+    def parse_cache_entries(self):
+        """The Todo.parsed fields by raw text that a parse cache can hold."""
+        unstripped = self._unstripped_texts
+        return dict((todo.raw, todo.parsed) for todo in self.todo_items if todo.raw not in unstripped)
 
     def parse_raw_entries(self, raw_items):
+        for todo in getattr(self, 'todo_items', []):
+            todo.todos = None
+        self.symbols = {}
+        self.tag_index = {}
+        self.search_index = SearchIndex()
+        # SortedViews by their keys and the NextActions as 'next', all kept
+        # up to date by _register and _unregister once built
+        self._sorted_views = {}
+        self._done_count = 0
+        self._all_contexts = None
+        self._all_projects = None
+        self._completion_tags = None
         self.todo_items = [
-            self.create_todo(todo, index)
+            self.create_todo(todo, index * ORDER_KEY_GAP)
             for index, todo in enumerate(raw_items) if todo.strip() != ""]
+        self._set_file_order(list(self.todo_items))
+        for todo in self.todo_items:
+            self._register(todo)
+        self._order_changed(in_file_order=True)
+        self._needs_rewrite = True
+        self._mutated()
+
+    def reconcile(self, lines):
+        """
+        Make the todos match *lines* and return a Changeset of the
+        differences.
+
+        Lines are matched to the current todos by their text first, and the
+        Todo objects (with their parsed fields and highlighting) of matched
+        lines are reused. Of the rest, a new line that sits where an
+        unmatched old line used to be, between the same matched neighbours,
+        counts as an edit of that todo; only these and the added lines are
+        parsed.
+        """
+        old_items = self.todo_items
+        raws = [line.strip() for line in lines]
+        raws = [raw for raw in raws if raw != ""]
+        old_raws = [todo.raw for todo in old_items]
+        if raws == old_raws:
+            return Changeset([], [], [], [])
+
+        # the unchanged lines at either end are matched in place, only the
+        # lines between them need looking at
+        first = 0
+        while first < len(raws) and first < len(old_raws) and raws[first] == old_raws[first]:
+            first += 1
+        old_end, new_end = len(old_raws), len(raws)
+        while old_end > first and new_end > first and raws[new_end - 1] == old_raws[old_end - 1]:
+            old_end -= 1
+            new_end -= 1
+
+        unused = {}
+        for old_index in range(old_end - 1, first - 1, -1):
+            unused.setdefault(old_raws[old_index], []).append(old_index)
+        # old index of the todo reused for each new line, None for added lines
+        sources = []
+        for raw in raws[first:new_end]:
+            same = unused.get(raw)
+            sources.append(same.pop() if same else None)
+        reused = set(index for index in sources if index is not None)
+
+        # old index of the next matched line after each new line
+        next_anchor = [old_end] * len(sources)
+        anchor = old_end
+        for offset in range(len(sources) - 1, -1, -1):
+            next_anchor[offset] = anchor
+            if sources[offset] is not None:
+                anchor = sources[offset]
+
+        items = old_items[:first]
+        added, modified = [], []
+        edited = []
+        old_index = first
+        previous = first - 1
+        for offset, source in enumerate(sources):
+            new_index = first + offset
+            if source is not None:
+                items.append(old_items[source])
+                previous = source
+                continue
+            old_index = max(old_index, previous + 1)
+            while old_index in reused:
+                old_index += 1
+            if old_index < next_anchor[offset]:
+                todo = old_items[old_index]
+                reused.add(old_index)
+                sources[offset] = old_index
+                modified.append(new_index)
+                edited.append((todo, raws[new_index]))
+                items.append(todo)
+            else:
+                added.append(new_index)
+                items.append(self.create_todo(raws[new_index], new_index))
+        items.extend(old_items[old_end:])
+
+        removed = [index for index in range(first, old_end) if index not in reused]
+        for index in removed:
+            self._unregister(old_items[index])
+            old_items[index].todos = None
+        for todo, raw in edited:
+            self._unregister(todo)
+            todo._parse(raw)
+        for new_index in added:
+            self._register(items[new_index])
+        for todo, raw in edited:
+            self._register(todo)
+        moved = [first + offset for offset in Todos._moved(sources)]
+
+        self.todo_items = items
+        self._order_changed()
+        self.update_raw_indices()
+        self._needs_rewrite = True
+        self._mutated()
+        return Changeset(added, removed, modified, moved)
+
+    @staticmethod
+    def _moved(old_indices):
+        """
+        New indices of the items that changed places: everything outside
+        the longest run of items still in their old relative order. None
+        entries (added items) are skipped.
+        """
+        tails = []  # smallest old index ending an increasing run of each length
+        tail_at = []
+        previous = [None] * len(old_indices)
+        for new_index, old_index in enumerate(old_indices):
+            if old_index is None:
+                continue
+            length = bisect.bisect_left(tails, old_index)
+            if length == len(tails):
+                tails.append(old_index)
+                tail_at.append(new_index)
+            else:
+                tails[length] = old_index
+                tail_at[length] = new_index
+            previous[new_index] = tail_at[length - 1] if length else None
+        in_order = set()
+        new_index = tail_at[-1] if tail_at else None
+        while new_index is not None:
+            in_order.add(new_index)
+            new_index = previous[new_index]
+        return [new_index for new_index, old_index in enumerate(old_indices)
+                if old_index is not None and new_index not in in_order]
 
     def update_raw_indices(self):
+        """Make the current list order the file order."""
         for index, todo in enumerate(self.todo_items):
-            todo.raw_index = index
+            todo.order_key = index * ORDER_KEY_GAP
+        self._set_file_order(list(self.todo_items))
+        self._list_in_file_order = True
+
+    def _set_file_order(self, todos):
+        self._file_order = todos
+        self._order_keys = [todo.order_key for todo in todos]
+
+    def rank(self, todo):
+        """Position of *todo* in file order."""
+        return bisect.bisect_left(self._order_keys, todo.order_key)
+
+    def _file_position(self, index):
+        """
+        Where in file order a todo inserted at list position *index* goes:
+        right after the todo before it in the list, or before the first.
+        """
+        if index > 0:
+            return self.rank(self.todo_items[index - 1]) + 1
+        if self.todo_items:
+            return self.rank(self.todo_items[0])
+        return 0
+
+    def _new_order_key(self, position):
+        """An unused order key between the todos at *position* - 1 and *position* in file order."""
+        keys = self._order_keys
+        if not keys:
+            return 0
+        if position == 0:
+            return keys[0] - ORDER_KEY_GAP
+        if position == len(keys):
+            return keys[-1] + ORDER_KEY_GAP
+        if keys[position] - keys[position - 1] < 2:
+            self._respace_order_keys(position)
+        return (keys[position - 1] + keys[position]) // 2
+
+    def _respace_order_keys(self, position):
+        """
+        Spread out the order keys around *position* in file order. The
+        window doubles until the keys just outside it leave a gap of at
+        least ORDER_KEY_GAP >> 10 per todo inside, so repeated inserts at
+        one spot only ever renumber a few neighbours.
+        """
+        keys = self._order_keys
+        size = 4
+        while True:
+            start, end = max(position - size, 0), min(position + size, len(keys))
+            if start == 0 and end == len(keys):
+                low, gap = -ORDER_KEY_GAP, ORDER_KEY_GAP
+            elif start == 0:
+                low, gap = keys[end] - (end + 1) * ORDER_KEY_GAP, ORDER_KEY_GAP
+            elif end == len(keys):
+                low, gap = keys[start - 1], ORDER_KEY_GAP
+            else:
+                low = keys[start - 1]
+                gap = (keys[end] - low) // (end - start + 1)
+                if gap < ORDER_KEY_GAP >> 10:
+                    size *= 2
+                    continue
+            for index in range(start, end):
+                keys[index] = self._file_order[index].order_key = low + (index - start + 1) * gap
+            return
+
+    @staticmethod
+    def tokenize(item):
+        """
+        Parse every field of a todo line in one pass.
+
+        Returns a (priority, contexts, projects, creation_date, due_date,
+        completed_date) tuple with the same values the individual parsers
+        below return for *item*.
+        """
+        completed_date, priority, creation_date = Todos._header_regex.match(item).groups("")
+        if completed_date or priority not in Todos._priorities:
+            priority = ""
+
+        contexts = []
+        projects = []
+        due_date = ""
+        for word in item.split():
+            if len(word) > 1:
+                if word[0] == "@":
+                    contexts.append(word)
+                elif word[0] == "+":
+                    projects.append(word)
+            # a due date can never span whitespace so the first word holding
+            # one is where the old whole-line search would have found it
+            if not due_date and "due:" in word:
+                match = Todos._due_date_regex.search(word)
+                if match:
+                    due_date = match.group(1)
+        contexts.sort()
+        projects.sort()
+        return priority, contexts, projects, creation_date, due_date, completed_date
 
     @staticmethod
     def contexts(item):
@@ -269,39 +997,78 @@ class Todos:
         return match.group(1) if match else ""
 
     def all_contexts(self):
-        # Nested Loop
-        # all_contexts = []
-        # for item in self.raw_items:
-        #   for found_context in self.contexts(item):
-        #     if found_context not in all_contexts:
-        #       all_contexts.append(found_context)
-        # return all_contexts
-
-        # List comprehension
-        # return sorted(set( [found_context for item in self.raw_items for found_context in self.contexts(item)] ))
-
-        # Join all items and use one regex.findall
-        # return sorted(set( Todos._context_regex.findall(" ".join(self.raw_items))))
-
-        return sorted(set([context for todo in self.todo_items for context in todo.contexts]))
+        if self._all_contexts is None:
+            self._all_contexts = sorted(tag for tag in self.tag_index if tag[0] == "@")
+        return list(self._all_contexts)
 
     def all_projects(self):
-        # List comprehension
-        # return sorted(set( [project for item in self.raw_items for project in self.projects(item)] ))
+        if self._all_projects is None:
+            self._all_projects = sorted(tag for tag in self.tag_index if tag[0] == "+")
+        return list(self._all_projects)
 
-        # Join all items and use one regex.findall
-        # return sorted(set( Todos._project_regex.findall(" ".join(self.raw_items))))
+    def tag_count(self, tag):
+        """Number of todos with the context or project *tag*."""
+        return len(self.tag_index.get(tag, ()))
+
+    def complete_tag(self, prefix):
+        """
+        Contexts and projects starting with *prefix*, ignoring case, the ones
+        used by the most todos first.
+        """
+        if self._completion_tags is None:
+            # rebuilt only when a tag appears or disappears
+            self._completion_tags = sorted(self.tag_index, key=lambda tag: (tag.lower(), tag))
+            self._completion_keys = [tag.lower() for tag in self._completion_tags]
+        prefix = prefix.lower()
+        keys = self._completion_keys
+        start = end = bisect.bisect_left(keys, prefix)
+        while end < len(keys) and keys[end].startswith(prefix):
+            end += 1
+        return sorted(self._completion_tags[start:end], key=lambda tag: -self.tag_count(tag))
+
+    def sorted_view(self, keys=('raw',)):
+        """
+        Return a sorting.SortedView of the todos by *keys* (names from
+        sorting.SORT_KEYS), built on first use and kept up to date from
+        then on. Unlike sorted() this leaves todo_items alone.
+        """
+        keys = tuple(keys)
+        view = self._sorted_views.get(keys)
+        if view is None:
+            view = self._sorted_views[keys] = SortedView(keys)
+            view.build(self.todo_items)
+        return view
+
+    def next_action_index(self):
+        """Return the sorting.NextActions of the todos, built on first use."""
+        index = self._sorted_views.get('next')
+        if index is None:
+            index = self._sorted_views['next'] = NextActions()
+            index.build(self.todo_items)
+        return index
 
-        return sorted(set([project for todo in self.todo_items for project in todo.projects]))
+    def next_actions(self, count=None, today=None):
+        """
+        The first *count* (all by default) pending todos to do as of *today*
+        (a date, today by default): overdue first, then by priority, then by
+        due date.
+        """
+        return self.next_action_index().next(count, today)
 
     def sorted(self, reversed_sort=False):
         self.todo_items.sort(key=lambda todo: todo.raw, reverse=reversed_sort)
+        self._order_changed(in_file_order=False)
+        self._needs_rewrite = True
+        self._mutated()
 
     def sorted_reverse(self):
         self.sorted(reversed_sort=True)
 
     def sorted_raw(self):
-        self.todo_items.sort(key=lambda todo: todo.raw_index)
+        self.todo_items[:] = self._file_order
+        self._order_changed(in_file_order=True)
+        self._needs_rewrite = True
+        self._mutated()
 
     def swap(self, first, second):
         """
@@ -321,20 +1088,28 @@ class Todos:
             second = n_items - second
 
         self.todo_items[first], self.todo_items[second] = self.todo_items[second], self.todo_items[first]
+        self._order_changed(in_file_order=False)
+        self._journal_record("S", first, second % n_items)
+        self._mutated()
 
     def filter_context(self, context):
-        return [item for item in self.todo_items if context in item.contexts]
+        return self.in_list_order(self.tag_index.get(context, ()))
 
     def filter_project(self, project):
-        return [item for item in self.todo_items if project in item.projects]
+        return self.in_list_order(self.tag_index.get(project, ()))
 
     def filter_context_and_project(self, context, project):
-        return [item for item in self.todo_items if project in item.projects and context in item.contexts]
+        return self.in_list_order(self.tag_index.get(context, set()) & self.tag_index.get(project, set()))
 
     def filter_contexts_and_projects(self, contexts, projects):
-        return [item for item in self.todo_items if set(projects) & set(item.projects) or set(contexts) & set(item.contexts)]
+        matches = set()
+        for tag in list(contexts) + list(projects):
+            matches.update(self.tag_index.get(tag, ()))
+        return TodoView(self.in_list_order(matches))
 
-    def search(self, search_string):
+    @staticmethod
+    def search_regex(search_string):
+        """Compile the fuzzy, case insensitive regex used by search()."""
         search_string = re.escape(search_string)
         # print(search_string)
         ss = []
@@ -351,14 +1126,30 @@ class Todos:
         search_string_regex += ').*'
         # print(search_string_regex)
 
-        r = re.compile(search_string_regex, re.IGNORECASE)
-        results = []
-        for t in self.todo_items:
-            match = r.search(t.raw)
-            if match:
-                t.search_matches = match.groups()
-                results.append(t)
-        return results
+        return re.compile(search_string_regex, re.IGNORECASE)
+
+    def search(self, search_string, within=None):
+        """
+        Return a views.SearchView of the todos matching *search_string*,
+        which matches them as they are read. Its matches() has the parts of
+        each todo that matched.
+
+        *within* limits the search to todos already known to hold every
+        match, e.g. the results for a shorter prefix of the query.
+        """
+        r = Todos.search_regex(search_string)
+        if within is not None:
+            candidates = within
+        else:
+            if not self.search_index.built:
+                self.search_index.build(self.todo_items)
+            candidates = self.search_index.candidates(search_string)
+            if candidates is None:
+                # a snapshot, the view reads it later
+                candidates = list(self.todo_items)
+            else:
+                candidates = self.in_list_order(candidates)
+        return SearchView(candidates, r)
 
     quotes = [
         "What you really believe about the source of great performance thus becomes the foundation of all you will ever achieve -- Geoff Colvin, Talent is Overrated: What Really Separates World-Class Performers from Everybody Else",
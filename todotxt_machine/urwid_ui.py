@@ -1,9 +1,14 @@
 #!/usr/bin/env python
 # coding=utf-8
 
+import os
 import urwid
 import collections
 
+from todotxt_machine.search import SearchSession
+from todotxt_machine.views import TodoView
+from todotxt_machine.journal import content_hash
+
 # Modified from http://wiki.goffi.org/wiki/Urwid-satext/en
 
 
@@ -18,6 +23,17 @@ class AdvancedEdit(urwid.Edit):
     def __init__(self, parent_ui, key_bindings, *args, **kwargs):
         self.parent_ui = parent_ui
         self.key_bindings = key_bindings
+        self.key_handlers = key_bindings.dispatchTable([
+            ('edit-home', self.edit_home),
+            ('edit-end', self.edit_end),
+            ('edit-delete-end', self.edit_delete_end),
+            ('edit-paste', self.edit_paste),
+            ('edit-delete-word', self.edit_delete_word),
+            ('edit-delete-beginning', self.edit_delete_beginning),
+            ('edit-word-left', self.edit_word_left),
+            ('edit-word-right', self.edit_word_right),
+            ('edit-complete', self.edit_complete),
+        ])
         super(AdvancedEdit, self).__init__(*args, **kwargs)
 
     def setCompletionMethod(self, callback):
@@ -34,61 +50,72 @@ class AdvancedEdit(urwid.Edit):
         self.completion_data = {}
 
     def keypress(self, size, key):
-        # import ipdb; ipdb.set_trace()
-        if self.key_bindings.is_binded_to(key, 'edit-home'):
-            self.set_edit_pos(0)  # move to the beginning of the line
-        elif self.key_bindings.is_binded_to(key, 'edit-end'):
-            self.set_edit_pos(len(self.edit_text) - 1)  # move to the end of the line
-        elif self.key_bindings.is_binded_to(key, 'edit-delete-end'):
-            self.parent_ui.yanked_text = self.edit_text[self.edit_pos:]
-            self._delete_highlighted()
-            self.set_edit_text(self.edit_text[:self.edit_pos])
-        elif self.key_bindings.is_binded_to(key, 'edit-paste'):
-            self.set_edit_text(
-                self.edit_text[:self.edit_pos] +
-                self.parent_ui.yanked_text +
-                self.edit_text[self.edit_pos:])
-            self.set_edit_pos(self.edit_pos + len(self.parent_ui.yanked_text))
-        elif self.key_bindings.is_binded_to(key, 'edit-delete-word'):
-            before = self.edit_text[:self.edit_pos]
-            pos = before.rstrip().rfind(" ") + 1
-            self.parent_ui.yanked_text = self.edit_text[pos:self.edit_pos]
-            self.set_edit_text(before[:pos] + self.edit_text[self.edit_pos:])
-            self.set_edit_pos(pos)
-        elif self.key_bindings.is_binded_to(key, 'edit-delete-beginning'):
-            before = self.edit_text[:self.edit_pos]
-            self.parent_ui.yanked_text = self.edit_text[:self.edit_pos]
-            self.set_edit_text(self.edit_text[self.edit_pos:])
-            self.set_edit_pos(0)
-        elif self.key_bindings.is_binded_to(key, 'edit-word-left'):
-            before = self.edit_text[:self.edit_pos]
-            pos = before.rstrip().rfind(" ") + 1
-            self.set_edit_pos(pos)
-        elif self.key_bindings.is_binded_to(key, 'edit-word-right'):
-            after = self.edit_text[self.edit_pos:]
-            pos = after.rstrip().find(" ") + 1
-            self.set_edit_pos(self.edit_pos + pos)
-        elif self.key_bindings.is_binded_to(key, 'edit-complete'):
-            try:
-                before = self.edit_text[:self.edit_pos]
-                if self.completion_data:
-                    if (not self.completion_data['completed'] or
-                            self.completion_data['position'] != self.edit_pos or
-                            not before.endswith(self.completion_data['completed'])):
-                        self.completion_data.clear()
-                    else:
-                        before = before[:-len(self.completion_data['completed'])]
-                complet = self.completion_cb(before, self.completion_data)
-                self.completion_data['completed'] = complet[len(before):]
-                self.set_edit_text(complet + self.edit_text[self.edit_pos:])
-                self.set_edit_pos(len(complet))
-                self.completion_data['position'] = self.edit_pos
-                return
-            except AttributeError:
-                # No completion method defined
-                pass
+        handler = self.key_handlers.get(key)
+        if handler is not None and handler():
+            return
         return super(AdvancedEdit, self).keypress(size, key)
 
+    def edit_home(self):
+        self.set_edit_pos(0)  # move to the beginning of the line
+
+    def edit_end(self):
+        self.set_edit_pos(len(self.edit_text) - 1)  # move to the end of the line
+
+    def edit_delete_end(self):
+        self.parent_ui.yanked_text = self.edit_text[self.edit_pos:]
+        self._delete_highlighted()
+        self.set_edit_text(self.edit_text[:self.edit_pos])
+
+    def edit_paste(self):
+        self.set_edit_text(
+            self.edit_text[:self.edit_pos] +
+            self.parent_ui.yanked_text +
+            self.edit_text[self.edit_pos:])
+        self.set_edit_pos(self.edit_pos + len(self.parent_ui.yanked_text))
+
+    def edit_delete_word(self):
+        before = self.edit_text[:self.edit_pos]
+        pos = before.rstrip().rfind(" ") + 1
+        self.parent_ui.yanked_text = self.edit_text[pos:self.edit_pos]
+        self.set_edit_text(before[:pos] + self.edit_text[self.edit_pos:])
+        self.set_edit_pos(pos)
+
+    def edit_delete_beginning(self):
+        self.parent_ui.yanked_text = self.edit_text[:self.edit_pos]
+        self.set_edit_text(self.edit_text[self.edit_pos:])
+        self.set_edit_pos(0)
+
+    def edit_word_left(self):
+        before = self.edit_text[:self.edit_pos]
+        pos = before.rstrip().rfind(" ") + 1
+        self.set_edit_pos(pos)
+
+    def edit_word_right(self):
+        after = self.edit_text[self.edit_pos:]
+        pos = after.rstrip().find(" ") + 1
+        self.set_edit_pos(self.edit_pos + pos)
+
+    def edit_complete(self):
+        """Complete the word before the cursor, True if the key was used."""
+        try:
+            before = self.edit_text[:self.edit_pos]
+            if self.completion_data:
+                if (not self.completion_data['completed'] or
+                        self.completion_data['position'] != self.edit_pos or
+                        not before.endswith(self.completion_data['completed'])):
+                    self.completion_data.clear()
+                else:
+                    before = before[:-len(self.completion_data['completed'])]
+            complet = self.completion_cb(before, self.completion_data)
+            self.completion_data['completed'] = complet[len(before):]
+            self.set_edit_text(complet + self.edit_text[self.edit_pos:])
+            self.set_edit_pos(len(complet))
+            self.completion_data['position'] = self.edit_pos
+            return True
+        except AttributeError:
+            # No completion method defined
+            return False
+
 
 class SearchWidget(urwid.Edit):
 
@@ -125,7 +152,7 @@ class TodoWidget(urwid.Button):
 
     def update_todo(self):
         if self.parent_ui.searching and self.parent_ui.search_string:
-            text = urwid.Text(self.todo.highlight_search_matches(), wrap=self.wrapping)
+            text = urwid.Text(self.todo.highlight_search_matches(self.parent_ui.search_matches(self.todo)), wrap=self.wrapping)
         else:
             if self.border == 'bordered':
                 text = urwid.Text(self.todo.highlight(show_due_date=False, show_contexts=False, show_projects=False), wrap=self.wrapping)
@@ -159,18 +186,15 @@ class TodoWidget(urwid.Button):
     def completions(self, text, completion_data={}):
         space = text.rfind(" ")
         start = text[space + 1:]
-        words = self.parent_ui.todos.all_contexts() + self.parent_ui.todos.all_projects()
+        words = self.parent_ui.todos.complete_tag(start)
+        if not words:
+            return text
         try:
-            start_idx = words.index(completion_data['last_word']) + 1
-            if start_idx == len(words):
-                start_idx = 0
+            idx = (words.index(completion_data['last_word']) + 1) % len(words)
         except (KeyError, ValueError):
-            start_idx = 0
-        for idx in list(range(start_idx, len(words))) + list(range(0, start_idx)):
-            if words[idx].lower().startswith(start.lower()):
-                completion_data['last_word'] = words[idx]
-                return text[:space + 1] + words[idx] + (': ' if space < 0 else '')
-        return text
+            idx = 0
+        completion_data['last_word'] = words[idx]
+        return text[:space + 1] + words[idx] + (': ' if space < 0 else '')
 
     def save_item(self):
         self.todo.update(self._w.original_widget.edit_text.strip())
@@ -312,16 +336,200 @@ class ViListBox(urwid.ListBox):
         self._command_map = command_map
 
 
+class TodoListWalker(urwid.ListWalker):
+    """
+    ListWalker over a list of todos, or a views.TodoView.
+
+    TodoWidgets are only built for the rows the ListBox asks for and kept in
+    a small LRU cache keyed by todo, so the cost of filling or refilling the
+    list does not depend on how many todos there are. Widgets that are being
+    edited are never evicted. A view is read as far as the rows shown and
+    only copied into a list when rows are inserted, removed or swapped.
+    """
+
+    def __init__(self, parent_ui, todos=None, cache_size=256):
+        self.parent_ui = parent_ui
+        self.todos = list(todos or [])
+        self.cache_size = cache_size
+        self.focus = 0
+        self._widgets = collections.OrderedDict()
+
+    def __len__(self):
+        return len(self.todos)
+
+    def __getitem__(self, position):
+        if position < 0:
+            raise IndexError(position)
+        return self.widget(self.todos[position])
+
+    def widget(self, todo, editing=False):
+        widget = self._widgets.pop(todo, None)
+        if widget is None:
+            widget = TodoWidget(todo, self.parent_ui.key_bindings, self.parent_ui.colorscheme, self.parent_ui,
+                                editing=editing, wrapping=self.parent_ui.wrapping[0], border=self.parent_ui.border[0])
+        self._widgets[todo] = widget
+        if len(self._widgets) > self.cache_size:
+            self._evict()
+        return widget
+
+    def _evict(self):
+        for todo, widget in list(self._widgets.items()):
+            if len(self._widgets) <= self.cache_size:
+                break
+            if not widget.editing:
+                del self._widgets[todo]
+
+    def cached_widgets(self):
+        return list(self._widgets.values())
+
+    def update_widgets(self, **attributes):
+        """Set *attributes* on the widgets built so far and redraw them."""
+        for widget in self.cached_widgets():
+            for name, value in attributes.items():
+                setattr(widget, name, value)
+            widget.update_todo()
+        self._modified()
+
+    def next_position(self, position):
+        # indexing rather than len(), which would read a whole view
+        self.todos[position + 1]
+        return position + 1
+
+    def prev_position(self, position):
+        if position <= 0:
+            raise IndexError(position - 1)
+        return position - 1
+
+    def positions(self, reverse=False):
+        if reverse:
+            return range(len(self.todos) - 1, -1, -1)
+        return range(len(self.todos))
+
+    def set_focus(self, position):
+        self.focus = position
+        self._modified()
+
+    def _clamp_focus(self):
+        self.focus = max(0, min(self.focus, len(self.todos) - 1))
+
+    def append(self, todo, editing=False):
+        self.insert(len(self.todos), todo, editing)
+
+    def _editable_todos(self):
+        if isinstance(self.todos, TodoView):
+            self.todos = list(self.todos)
+        return self.todos
+
+    def insert(self, position, todo, editing=False):
+        self._editable_todos().insert(position, todo)
+        if editing:
+            self.widget(todo, editing=True)
+        self._modified()
+
+    def pop(self, position=-1):
+        todo = self._editable_todos().pop(position)
+        self._widgets.pop(todo, None)
+        self._clamp_focus()
+        self._modified()
+        return todo
+
+    def __delitem__(self, position):
+        self.pop(position)
+
+    def swap(self, first, second):
+        todos = self._editable_todos()
+        todos[first], todos[second] = todos[second], todos[first]
+        self._modified()
+
+    def replace(self, todos, keep_widgets=False, focus_todo=None):
+        """
+        Show *todos* instead of the current contents, signalling once.
+
+        With *keep_widgets* the cached widgets of todos that are still shown
+        are kept. Focus moves to *focus_todo* if it is among *todos*, stays
+        where it was if it is not, and goes to the top without one. A
+        views.TodoView is kept as it is rather than copied.
+        """
+        self.todos = todos if isinstance(todos, TodoView) else list(todos)
+        if keep_widgets:
+            shown = set(self.todos)
+            for todo in list(self._widgets):
+                if todo not in shown:
+                    del self._widgets[todo]
+        else:
+            self._widgets.clear()
+        if focus_todo is None:
+            self.focus = 0
+        else:
+            try:
+                self.focus = self.todos.index(focus_todo)
+            except ValueError:
+                self._clamp_focus()
+        self._modified()
+
+    def forget(self, todos):
+        """Drop the cached widgets of *todos*, e.g. after their text changed."""
+        for todo in todos:
+            self._widgets.pop(todo, None)
+
+    def is_editing(self):
+        return any(widget.editing for widget in self._widgets.values())
+
+
 class UrwidUI:
 
-    def __init__(self, todos, key_bindings, colorscheme):
+    def __init__(self, todos, key_bindings, colorscheme, saver=None, watcher=None, sort_keys=('raw',)):
         self.wrapping = collections.deque(['clip', 'space'])
         self.border = collections.deque(['no border', 'bordered'])
-        self.sorting = collections.deque(["Unsorted", "Descending", "Ascending"])
-        self.sorting_display = {"Unsorted": "-", "Descending": "v", "Ascending": "^"}
+        # rotated right, so the modes come up in reverse order
+        self.sorting = collections.deque(["Unsorted", "Next", "Descending", "Ascending"])
+        self.sorting_display = {"Unsorted": "-", "Descending": "v", "Ascending": "^", "Next": "!"}
+        # what the Ascending and Descending modes sort by, see sorting.SORT_KEYS
+        self.sort_keys = tuple(sort_keys)
 
         self.todos = todos
+        # a storage.BackgroundSaver, todos are saved in the foreground without one
+        self.saver = saver
+        # written to by other threads to get work done on the UI thread
+        self.wake_pipe = None
+        # a watch.FileWatcher for todos.file_path, no automatic reloads without one
+        self.watcher = watcher
+        self.external_change = False
+        # todo.txt changed on disk while we had unsaved changes
+        self.save_conflict = False
+        self.header_message = ""
         self.key_bindings = key_bindings
+        # listed in the order the keystroke if/elif chain used to test them
+        self.key_handlers = key_bindings.dispatchTable([
+            ('quit', self.quit),
+            # Movement
+            ('top', self.move_selection_top),
+            ('bottom', self.move_selection_bottom),
+            ('swap-down', self.swap_down),
+            ('swap-up', self.swap_up),
+            ('change-focus', self.change_focus),
+            # View options
+            ('toggle-help', self.toggle_help_panel),
+            ('toggle-toolbar', self.toggle_toolbar),
+            ('toggle-filter', self.toggle_filter_panel),
+            ('clear-filter', self.clear_filters),
+            ('toggle-wrapping', self.toggle_wrapping),
+            ('toggle-borders', self.toggle_border),
+            ('toggle-sorting', self.toggle_sorting),
+            ('search', self.start_search),
+            ('search-clear', self.search_clear),
+            # Editing
+            ('toggle-complete', self.toggle_complete),
+            ('archive', self.archive_done_todos),
+            ('delete', self.delete_todo),
+            ('append', lambda: self.add_new_todo(position='append')),
+            ('insert-before', lambda: self.add_new_todo(position='insert_before')),
+            ('insert-after', lambda: self.add_new_todo(position='insert_after')),
+            ('priority-up', self.priority_up),
+            ('priority-down', self.priority_down),
+            ('save', self.save_todos),
+            ('reload', self.reload_todos_from_file),
+        ])
 
         self.colorscheme = colorscheme
         self.palette = [(key, '', '', '', value['fg'], value['bg']) for key, value in self.colorscheme.colors.items()]
@@ -335,6 +543,7 @@ class UrwidUI:
         self.filtering = False
         self.searching = False
         self.search_string = ''
+        self.search_session = SearchSession(todos)
         self.yanked_text = ''
 
     def visible_lines(self):
@@ -352,10 +561,13 @@ class UrwidUI:
         self.listbox.keypress((0, self.visible_lines()), 'up')
 
     def move_selection_top(self):
-        self.listbox.set_focus(0)
+        # the list can be empty, e.g. the Next mode when everything is done
+        if self.listbox.body.todos:
+            self.listbox.set_focus(0)
 
     def move_selection_bottom(self):
-        self.listbox.set_focus(len(self.listbox.body) - 1)
+        if self.listbox.body.todos:
+            self.listbox.set_focus(len(self.listbox.body) - 1)
 
     def toggle_help_panel(self, button=None):
         if self.filter_panel_is_open:
@@ -376,18 +588,29 @@ class UrwidUI:
             #     header_column[0].set_wrap_mode('clip')
 
     def toggle_sorting(self, button=None):
-        self.delete_todo_widgets()
+        # todo.txt keeps its order, the sorted modes show a sorted view of it
         self.sorting.rotate(1)
-        if self.sorting[0] == 'Ascending':
-            self.todos.sorted()
-        elif self.sorting[0] == 'Descending':
-            self.todos.sorted_reverse()
-        elif self.sorting[0] == 'Unsorted':
-            self.todos.sorted_raw()
-        self.reload_todos_from_memory()
+        self.refresh_todo_list()
         self.move_selection_top()
         self.update_header()
 
+    def sorted_todos(self, todos=None):
+        """*todos*, all of them by default, in the order of the sort mode."""
+        if self.sorting[0] == 'Unsorted':
+            return self.todos.todo_items if todos is None else todos
+        if self.sorting[0] == 'Next':
+            # pending todos only, overdue first, then by priority and due date
+            view, reverse = self.todos.next_action_index(), False
+        else:
+            view, reverse = self.todos.sorted_view(self.sort_keys), self.sorting[0] == 'Descending'
+        if todos is None:
+            return view.items(reverse)
+        return view.in_view_order(todos, reverse)
+
+    def search_matches(self, todo):
+        """The parts of *todo* matched by the current search."""
+        return self.search_session.results.matches(todo)
+
     def toggle_filter_panel(self, button=None):
         if self.help_panel_is_open:
             self.toggle_help_panel()
@@ -401,17 +624,13 @@ class UrwidUI:
 
     def toggle_wrapping(self, checkbox=None, state=None):
         self.wrapping.rotate(1)
-        for widget in self.listbox.body:
-            widget.wrapping = self.wrapping[0]
-            widget.update_todo()
+        self.listbox.body.update_widgets(wrapping=self.wrapping[0])
         if self.toolbar_is_open:
             self.update_header()
 
     def toggle_border(self, checkbox=None, state=None):
         self.border.rotate(1)
-        for widget in self.listbox.body:
-            widget.border = self.border[0]
-            widget.update_todo()
+        self.listbox.body.update_widgets(border=self.border[0])
         if self.toolbar_is_open:
             self.update_header()
 
@@ -421,148 +640,194 @@ class UrwidUI:
 
     def swap_down(self):
         focus, focus_index = self.listbox.get_focus()
-        if not self.filtering and not self.searching:
+        if focus is not None and not self.filtering and not self.searching and self.sorting[0] == 'Unsorted':
             if focus_index + 1 < len(self.listbox.body):
                 self.todos.swap(focus_index, focus_index + 1)
-                self.listbox.body[focus_index].todo = self.todos[focus_index]
-                self.listbox.body[focus_index + 1].todo = self.todos[focus_index + 1]
-                self.listbox.body[focus_index].update_todo()
-                self.listbox.body[focus_index + 1].update_todo()
+                self.listbox.body.swap(focus_index, focus_index + 1)
                 self.move_selection_down()
 
     def swap_up(self):
         focus, focus_index = self.listbox.get_focus()
-        if not self.filtering and not self.searching:
+        if focus is not None and not self.filtering and not self.searching and self.sorting[0] == 'Unsorted':
             if focus_index > 0:
                 self.todos.swap(focus_index, focus_index - 1)
-                self.listbox.body[focus_index].todo = self.todos[focus_index]
-                self.listbox.body[focus_index - 1].todo = self.todos[focus_index - 1]
-                self.listbox.body[focus_index].update_todo()
-                self.listbox.body[focus_index - 1].update_todo()
+                self.listbox.body.swap(focus_index, focus_index - 1)
                 self.move_selection_up()
 
     def save_todos(self, button=None):
-        self.todos.save()
-        self.update_header("Saved")
+        if self.save_conflict:
+            # keep our version over the one changed on disk
+            self.collect_saves(wait=True)
+            self.save_conflict = False
+            self.todos.compact()
+            self.update_header("Saved")
+        elif self.saver is not None:
+            if self.saver.save():
+                self.update_header("Saving")
+            else:
+                self.update_header("No changes")
+        elif self.todos.save():
+            self.update_header("Saved")
+        else:
+            self.update_header("No changes")
+
+    def wake_ui(self, reason=b'.'):
+        """Get background_work() called on the UI thread, safe from any thread."""
+        if self.wake_pipe is not None:
+            os.write(self.wake_pipe, reason)
+
+    def background_work(self, data):
+        self.collect_saves()
+        return True
+
+    def every(self, seconds, callback):
+        """Call *callback* on the UI thread every *seconds* while the loop runs."""
+        def tick(loop, user_data):
+            callback()
+            loop.set_alarm_in(seconds, tick)
+        self.loop.set_alarm_in(seconds, tick)
+
+    def autosave(self):
+        if self.save_conflict:
+            return
+        if self.saver is not None:
+            if self.saver.save():
+                self.update_header("Saving")
+        elif self.todos.save():
+            self.update_header("Saved")
+
+    def collect_saves(self, wait=False):
+        """Apply finished background saves, waiting for queued ones if *wait*."""
+        if self.saver is None:
+            return
+        errors = self.saver.wait() if wait else self.saver.collect()
+        if errors:
+            self.update_header("Save failed: {0}".format(errors[-1]))
+        elif self.header_message == "Saving" and not self.todos.is_modified():
+            self.update_header("Saved")
 
     def archive_done_todos(self):
+        self.collect_saves(wait=True)
         if self.todos.archive_done():
-            self.delete_todo_widgets()
             self.reload_todos_from_memory()
             self.move_selection_top()
             self.update_header()
 
-    def reload_todos_from_file(self, button=None):
-        self.delete_todo_widgets()
-
-        self.todos.reload_from_file()
-
-        for t in self.todos.todo_items:
-            self.listbox.body.append(TodoWidget(t, self.key_bindings, self.colorscheme, self, wrapping=self.wrapping[0], border=self.border[0]))
+    def reload_todos_from_file(self, button=None, lines=None):
+        self.collect_saves(wait=True)
+        self.save_conflict = False
+        focus = self.listbox.get_focus()[0]
+        changeset = self.todos.reload_from_file(lines)
+        self.listbox.body.forget(self.todos[index] for index in changeset.modified)
+        self.refresh_todo_list(focus.todo if focus is not None else None)
+        if self.filter_panel_is_open:
+            self.update_filter_panel()
 
         self.update_header("Reloaded")
 
+    def refresh_todo_list(self, focus_todo=None):
+        """Show the todos again after they changed underneath the list."""
+        if self.searching and self.search_string:
+            self.search_todo_list(self.search_string, keep_widgets=True, focus_todo=focus_todo)
+        elif self.filtering:
+            self.filter_todo_list(keep_widgets=True, focus_todo=focus_todo)
+        else:
+            self.listbox.body.replace(self.sorted_todos(), keep_widgets=True, focus_todo=focus_todo)
+
+    def file_events(self):
+        if self.watcher.read_events():
+            self.check_file()
+
+    def check_file(self):
+        """Reload todo.txt if another program changed it."""
+        self.collect_saves()
+        if self.watcher.changed():
+            self.external_change = True
+        if not self.external_change:
+            return
+        if self.listbox.body.is_editing():
+            # try again once the edit is done
+            self.loop.set_alarm_in(1, lambda loop, user_data: self.check_file())
+            return
+        self.external_change = False
+        try:
+            with open(self.todos.file_path, "r") as todotxt_file:
+                lines = todotxt_file.readlines()
+        except (IOError, OSError):
+            return  # gone for now, e.g. in the middle of being replaced
+        if content_hash(lines) == self.todos.file_hash:
+            return  # our own save
+        journal = self.todos.journal
+        if self.todos.is_modified() or (journal is not None and not journal.is_empty()):
+            self.save_conflict = True
+            self.update_header("todo.txt changed on disk, R reloads it, S keeps yours")
+            return
+        self.reload_todos_from_file(lines=lines)
+
     def keystroke(self, input):
-        focus, focus_index = self.listbox.get_focus()
+        handler = self.key_handlers.get(input)
+        if handler is not None:
+            handler()
 
-        if self.key_bindings.is_binded_to(input, 'quit'):
-            raise urwid.ExitMainLoop()
+    def quit(self):
+        raise urwid.ExitMainLoop()
 
-        # Movement
-        elif self.key_bindings.is_binded_to(input, 'top'):
-            self.move_selection_top()
-        elif self.key_bindings.is_binded_to(input, 'bottom'):
-            self.move_selection_bottom()
-        elif self.key_bindings.is_binded_to(input, 'swap-down'):
-            self.swap_down()
-        elif self.key_bindings.is_binded_to(input, 'swap-up'):
-            self.swap_up()
-        elif self.key_bindings.is_binded_to(input, 'change-focus'):
-            current_focus = self.frame.get_focus()
-            if current_focus == 'body':
-
-                if self.filter_panel_is_open and self.toolbar_is_open:
-
-                    if self.view.focus_position == 1:
-                        self.view.focus_position = 0
-                        self.frame.focus_position = 'header'
-                    elif self.view.focus_position == 0:
-                        self.view.focus_position = 1
-
-                elif self.toolbar_is_open:
-                    self.frame.focus_position = 'header'
+    def change_focus(self):
+        current_focus = self.frame.get_focus()
+        if current_focus == 'body':
 
-                elif self.filter_panel_is_open:
-                    if self.view.focus_position == 1:
-                        self.view.focus_position = 0
-                    elif self.view.focus_position == 0:
-                        self.view.focus_position = 1
+            if self.filter_panel_is_open and self.toolbar_is_open:
 
-            elif current_focus == 'header':
-                self.frame.focus_position = 'body'
+                if self.view.focus_position == 1:
+                    self.view.focus_position = 0
+                    self.frame.focus_position = 'header'
+                elif self.view.focus_position == 0:
+                    self.view.focus_position = 1
 
-        # View options
-        elif self.key_bindings.is_binded_to(input, 'toggle-help'):
-            self.toggle_help_panel()
-        elif self.key_bindings.is_binded_to(input, 'toggle-toolbar'):
-            self.toggle_toolbar()
-        elif self.key_bindings.is_binded_to(input, 'toggle-filter'):
-            self.toggle_filter_panel()
-        elif self.key_bindings.is_binded_to(input, 'clear-filter'):
-            self.clear_filters()
-        elif self.key_bindings.is_binded_to(input, 'toggle-wrapping'):
-            self.toggle_wrapping()
-        elif self.key_bindings.is_binded_to(input, 'toggle-borders'):
-            self.toggle_border()
-        elif self.key_bindings.is_binded_to(input, 'toggle-sorting'):
-            self.toggle_sorting()
-
-        elif self.key_bindings.is_binded_to(input, 'search'):
-            self.start_search()
-        elif self.key_bindings.is_binded_to(input, 'search-clear'):
-            if self.searching:
-                self.clear_search_term()
-
-        # Editing
-        elif self.key_bindings.is_binded_to(input, 'toggle-complete'):
-            if focus.todo.is_complete():
-                focus.todo.incomplete()
-            else:
-                focus.todo.complete()
-            focus.update_todo()
-            self.update_header()
+            elif self.toolbar_is_open:
+                self.frame.focus_position = 'header'
 
-        elif self.key_bindings.is_binded_to(input, 'archive'):
-            self.archive_done_todos()
+            elif self.filter_panel_is_open:
+                if self.view.focus_position == 1:
+                    self.view.focus_position = 0
+                elif self.view.focus_position == 0:
+                    self.view.focus_position = 1
 
-        elif self.key_bindings.is_binded_to(input, 'delete'):
-            if self.todos.todo_items:
-                i = focus.todo.raw_index
-                self.todos.delete(i)
-                del self.listbox.body[focus_index]
-                self.update_header()
+        elif current_focus == 'header':
+            self.frame.focus_position = 'body'
 
-        elif self.key_bindings.is_binded_to(input, 'append'):
-            self.add_new_todo(position='append')
-        elif self.key_bindings.is_binded_to(input, 'insert-before'):
-            self.add_new_todo(position='insert_before')
-        elif self.key_bindings.is_binded_to(input, 'insert-after'):
-            self.add_new_todo(position='insert_after')
+    def search_clear(self):
+        if self.searching:
+            self.clear_search_term()
+
+    def toggle_complete(self):
+        focus = self.listbox.get_focus()[0]
+        if focus is None:
+            return
+        if focus.todo.is_complete():
+            focus.todo.incomplete()
+        else:
+            focus.todo.complete()
+        focus.update_todo()
+        self.update_header()
+
+    def delete_todo(self):
+        focus, focus_index = self.listbox.get_focus()
+        if self.todos.todo_items and focus is not None:
+            self.todos.delete(self.todos.position(focus.todo))
+            del self.listbox.body[focus_index]
+            self.update_header()
 
-        elif self.key_bindings.is_binded_to(input, 'priority-up'):
+    def priority_up(self):
+        focus = self.listbox.get_focus()[0]
+        if focus is not None:
             self.adjust_priority(focus, up=True)
 
-        elif self.key_bindings.is_binded_to(input, 'priority-down'):
+    def priority_down(self):
+        focus = self.listbox.get_focus()[0]
+        if focus is not None:
             self.adjust_priority(focus, up=False)
 
-        # Save current file
-        elif self.key_bindings.is_binded_to(input, 'save'):
-            self.save_todos()
-
-        # Reload original file
-        elif self.key_bindings.is_binded_to(input, 'reload'):
-            self.reload_todos_from_file()
-
     def adjust_priority(self, focus, up=True):
             priorities = ['', 'A', 'B', 'C', 'D', 'E', 'F']
             if up:
@@ -580,7 +845,7 @@ class UrwidUI:
             focus.update_todo()
 
     def add_new_todo(self, position=False):
-        if len(self.listbox.body) == 0:
+        if not self.listbox.body.todos:
             position = 'append'
         else:
             focus_index = self.listbox.get_focus()[1]
@@ -588,22 +853,24 @@ class UrwidUI:
         if self.filtering:
             position = 'append'
 
-        if position is 'append':
+        if position == 'append':
             new_index = self.todos.append('', add_creation_date=False)
-            self.listbox.body.append(TodoWidget(self.todos[new_index], self.key_bindings, self.colorscheme, self, editing=True, wrapping=self.wrapping[0], border=self.border[0]))
+            self.listbox.body.append(self.todos[new_index], editing=True)
         else:
-            if position is 'insert_after':
-                new_index = self.todos.insert(focus_index + 1, '', add_creation_date=False)
-            elif position is 'insert_before':
-                new_index = self.todos.insert(focus_index, '', add_creation_date=False)
-
-            self.listbox.body.insert(new_index, TodoWidget(self.todos[new_index], self.key_bindings, self.colorscheme, self, editing=True, wrapping=self.wrapping[0], border=self.border[0]))
+            offset = 1 if position == 'insert_after' else 0
+            if self.searching or self.sorting[0] != 'Unsorted':
+                # the list shows the todos in another order than todo_items
+                index = self.todos.position(self.listbox.body.todos[focus_index]) + offset
+            else:
+                index = focus_index + offset
+            new_index = self.todos.insert(index, '', add_creation_date=False)
+            self.listbox.body.insert(focus_index + offset, self.todos[new_index], editing=True)
 
         if position:
-            if self.filtering:
+            if position == 'append':
                 self.listbox.set_focus(len(self.listbox.body) - 1)
             else:
-                self.listbox.set_focus(new_index)
+                self.listbox.set_focus(focus_index + offset)
             # edit_widget = self.listbox.body[new_index]._w
             # edit_widget.edit_text += ' '
             # edit_widget.set_edit_pos(len(self.todos[new_index].raw) + 1)
@@ -658,14 +925,11 @@ class UrwidUI:
         self.search_string = new_contents
         self.search_todo_list(self.search_string)
 
-    def search_todo_list(self, search_string=""):
+    def search_todo_list(self, search_string="", keep_widgets=False, focus_todo=None):
         if search_string:
-            self.delete_todo_widgets()
-
             self.searching = True
-
-            for t in self.todos.search(search_string):
-                self.listbox.body.append(TodoWidget(t, self.key_bindings, self.colorscheme, self, wrapping=self.wrapping[0], border=self.border[0]))
+            self.listbox.body.replace(self.sorted_todos(self.search_session.search(search_string)),
+                                      keep_widgets=keep_widgets, focus_todo=focus_todo)
 
     def start_search(self):
         self.searching = True
@@ -675,13 +939,12 @@ class UrwidUI:
     def finalize_search(self):
         self.search_string = ''
         self.frame.set_focus('body')
-        for widget in self.listbox.body:
-            widget.update_todo()
+        self.listbox.body.update_widgets()
 
     def clear_search_term(self, button=None):
-        self.delete_todo_widgets()
         self.searching = False
         self.search_string = ''
+        self.search_session.reset()
         self.update_footer()
         self.reload_todos_from_memory()
 
@@ -823,8 +1086,8 @@ Sorting
                         # [ urwid.Divider(u'─') ] +
 
                         [urwid.Text("""
-{0} - toggle sort order (Unsorted, Ascending, Descending)
-               sort order is saved on quit
+{0} - toggle sort order (Unsorted, Ascending, Descending, Next actions)
+               only the view is sorted, todo.txt keeps its order
 """.format(
                             self.key_bindings["toggle-sorting"].ljust(key_column_width),
                         ))] +
@@ -866,9 +1129,9 @@ Searching
                             self.key_bindings,
                             [urwid.Text('Contexts & Projects', align='center')] +
                             [urwid.Divider(u'─')] +
-                            [urwid.AttrWrap(urwid.CheckBox(c, state=(c in self.active_contexts), on_state_change=self.checkbox_clicked, user_data=['context', c]), 'context_dialog_color', 'context_selected') for c in self.todos.all_contexts()] +
+                            [urwid.AttrWrap(urwid.CheckBox(self.filter_label(c), state=(c in self.active_contexts), on_state_change=self.checkbox_clicked, user_data=['context', c]), 'context_dialog_color', 'context_selected') for c in self.todos.all_contexts()] +
                             [urwid.Divider(u'─')] +
-                            [urwid.AttrWrap(urwid.CheckBox(p, state=(p in self.active_projects), on_state_change=self.checkbox_clicked, user_data=['project', p]), 'project_dialog_color', 'project_selected') for p in self.todos.all_projects()] +
+                            [urwid.AttrWrap(urwid.CheckBox(self.filter_label(p), state=(p in self.active_projects), on_state_change=self.checkbox_clicked, user_data=['project', p]), 'project_dialog_color', 'project_selected') for p in self.todos.all_projects()] +
                             [urwid.Divider(u'─')] +
                             [urwid.AttrMap(urwid.Button(['Clear ', ('header_file_dialog_color', 'F'), 'ilters'], on_press=self.clear_filters), 'dialog_color', 'plain_selected')]
                         )
@@ -889,16 +1152,13 @@ Searching
                           ('fixed top', 1), ('fixed bottom', 2))
         return w
 
-    def delete_todo_widgets(self):
-        for i in range(len(self.listbox.body) - 1, -1, -1):
-            self.listbox.body.pop(i)
+    def filter_label(self, tag):
+        return "{0} ({1})".format(tag, self.todos.tag_count(tag))
 
     def reload_todos_from_memory(self):
-        for t in self.todos.todo_items:
-            self.listbox.body.append(TodoWidget(t, self.key_bindings, self.colorscheme, self, wrapping=self.wrapping[0], border=self.border[0]))
+        self.listbox.body.replace(self.sorted_todos())
 
     def clear_filters(self, button=None):
-        self.delete_todo_widgets()
         self.reload_todos_from_memory()
 
         self.active_projects = []
@@ -925,11 +1185,10 @@ Searching
         else:
             self.clear_filters()
 
-    def filter_todo_list(self):
-        self.delete_todo_widgets()
-
-        for t in self.todos.filter_contexts_and_projects(self.active_contexts, self.active_projects):
-            self.listbox.body.append(TodoWidget(t, self.key_bindings, self.colorscheme, self, wrapping=self.wrapping[0], border=self.border[0]))
+    def filter_todo_list(self, keep_widgets=False, focus_todo=None):
+        self.listbox.body.replace(self.sorted_todos(
+            self.todos.filter_contexts_and_projects(self.active_contexts, self.active_projects)),
+            keep_widgets=keep_widgets, focus_todo=focus_todo)
 
         self.filtering = True
 
@@ -949,6 +1208,7 @@ Searching
             self.view.widget_list.append(self.filter_panel)
 
     def update_header(self, message=""):
+        self.header_message = message
         if self.toolbar_is_open:
             self.frame.header = urwid.Pile([self.create_header(message), self.create_toolbar()])
         else:
@@ -961,14 +1221,14 @@ Searching
              enable_borders=False,
              enable_word_wrap=False,
              show_toolbar=False,
-             show_filter_panel=False):
+             show_filter_panel=False,
+             autosave_interval=0,
+             watch_interval=2):
 
         self.header = self.create_header()
         self.footer = self.create_footer()
 
-        self.listbox = ViListBox(self.key_bindings, urwid.SimpleListWalker(
-            [TodoWidget(t, self.key_bindings, self.colorscheme, self) for t in self.todos.todo_items]
-        ))
+        self.listbox = ViListBox(self.key_bindings, TodoListWalker(self, self.todos.todo_items))
 
         self.frame = urwid.Frame(urwid.AttrMap(self.listbox, 'plain'), header=self.header, footer=self.footer)
 
@@ -979,6 +1239,16 @@ Searching
 
         self.loop = urwid.MainLoop(self.view, self.palette, unhandled_input=self.keystroke)
         self.loop.screen.set_terminal_properties(colors=256)
+        self.wake_pipe = self.loop.watch_pipe(self.background_work)
+        if self.saver is not None:
+            self.saver.on_done = self.wake_ui
+        if autosave_interval > 0:
+            self.every(autosave_interval, self.autosave)
+        if self.watcher is not None:
+            if self.watcher.fileno() is not None:
+                self.loop.watch_file(self.watcher.fileno(), self.file_events)
+            else:
+                self.every(watch_interval, self.check_file)
 
         if enable_borders:
             self.toggle_border()
@@ -0,0 +1,170 @@
+#!/usr/bin/env python
+# coding=utf-8
+
+
+class TodoView(object):
+    """
+    A read only sequence of todos worked out as it is read.
+
+    Todos.search and Todos.filter_contexts_and_projects return these, and
+    they compose: view.search(regex), view.filter(predicate) and
+    view.sorted(key) each return a new view over the first one. Nothing is
+    matched or sorted until the items are asked for, and then only as far
+    as needed, so the UI can show the first screen of a large result set
+    without going through the rest. Items already produced are kept, so
+    indexing and iterating again are cheap; len(), negative indices,
+    slices and index() go through everything once, the latter building a
+    position map.
+
+    A view takes a snapshot of its source where it starts (a list, or
+    another view). It does not follow later changes to the todos: make a
+    new one after an edit.
+    """
+
+    def __init__(self, source=()):
+        self._source = source
+        self._generator = None
+        self._items = []
+        self._complete = False
+        self._positions = None
+
+    def _generate(self):
+        return iter(self._source)
+
+    def _fill(self, count=None):
+        """Produce items until there are more than *count*, or all of them."""
+        if self._complete:
+            return
+        if self._generator is None:
+            self._generator = self._generate()
+        items = self._items
+        for todo in self._generator:
+            items.append(todo)
+            if count is not None and len(items) > count:
+                return
+        self._complete = True
+        self._generator = None
+
+    def __iter__(self):
+        index = 0
+        while True:
+            if index >= len(self._items):
+                self._fill(index)
+                if index >= len(self._items):
+                    return
+            yield self._items[index]
+            index += 1
+
+    def __getitem__(self, index):
+        if isinstance(index, slice) or index < 0:
+            self._fill()
+        else:
+            self._fill(index)
+        return self._items[index]
+
+    def __len__(self):
+        self._fill()
+        return len(self._items)
+
+    def __bool__(self):
+        self._fill(0)
+        return bool(self._items)
+
+    __nonzero__ = __bool__
+
+    def __eq__(self, other):
+        if isinstance(other, (TodoView, list, tuple)):
+            return list(self) == list(other)
+        return NotImplemented
+
+    def __ne__(self, other):
+        equal = self.__eq__(other)
+        return equal if equal is NotImplemented else not equal
+
+    __hash__ = None
+
+    def __contains__(self, todo):
+        return todo in self._position_map()
+
+    def _position_map(self):
+        if self._positions is None:
+            self._fill()
+            self._positions = dict(zip(self._items, range(len(self._items))))
+        return self._positions
+
+    def index(self, todo):
+        try:
+            return self._position_map()[todo]
+        except KeyError:
+            raise ValueError("{0!r} is not in the view".format(todo))
+
+    def matches(self, todo):
+        """
+        What the search in this view (or in the ones under it) matched in
+        *todo*, once the view has read that far.
+        """
+        if isinstance(self._source, TodoView):
+            return self._source.matches(todo)
+        return ()
+
+    def search(self, regex):
+        return SearchView(self, regex)
+
+    def filter(self, predicate):
+        return FilterView(self, predicate)
+
+    def sorted(self, key, reverse=False):
+        return SortedResults(self, key, reverse)
+
+    def __repr__(self):
+        return "<{0} {1!r}{2}>".format(type(self).__name__, self._items, "" if self._complete else " ...")
+
+
+class FilterView(TodoView):
+    """The todos of *source* for which *predicate* is true."""
+
+    def __init__(self, source, predicate):
+        super(FilterView, self).__init__(source)
+        self.predicate = predicate
+
+    def _generate(self):
+        predicate = self.predicate
+        return (todo for todo in self._source if predicate(todo))
+
+
+class SearchView(TodoView):
+    """
+    The todos of *source* whose text *regex* matches. The groups of each
+    match are kept here, for matches(), rather than on the todo.
+    """
+
+    def __init__(self, source, regex):
+        super(SearchView, self).__init__(source)
+        self.regex = regex
+        self._matches = {}
+
+    def _generate(self):
+        search = self.regex.search
+        for todo in self._source:
+            match = search(todo.raw)
+            if match:
+                self._matches[todo] = match.groups()
+                yield todo
+
+    def matches(self, todo):
+        matches = self._matches.get(todo)
+        if matches is None:
+            return super(SearchView, self).matches(todo)
+        return matches
+
+
+class SortedResults(TodoView):
+    """The todos of *source* sorted by *key*, sorted when first read."""
+
+    def __init__(self, source, key, reverse=False):
+        super(SortedResults, self).__init__(source)
+        self.key = key
+        self.reverse = reverse
+
+    def _generate(self):
+        return iter(sorted(self._source, key=self.key, reverse=self.reverse))
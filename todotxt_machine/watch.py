@@ -0,0 +1,108 @@
+#!/usr/bin/env python
+# coding=utf-8
+import os
+import errno
+import struct
+
+try:
+    import ctypes
+    import ctypes.util
+except ImportError:
+    ctypes = None
+
+_IN_MODIFY = 0x00000002
+_IN_CLOSE_WRITE = 0x00000008
+_IN_MOVED_TO = 0x00000080
+_IN_CREATE = 0x00000100
+_IN_DELETE = 0x00000200
+_IN_NONBLOCK = 0o4000
+_IN_CLOEXEC = 0o2000000
+_event_header = struct.Struct('iIII')
+
+
+def _load_inotify():
+    if ctypes is None or not hasattr(os, 'uname') or os.uname()[0] != 'Linux':
+        return None
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+        libc.inotify_init1, libc.inotify_add_watch
+    except (OSError, AttributeError):
+        return None
+    return libc
+
+
+class FileWatcher(object):
+    """
+    Notices when another program changes a file.
+
+    On Linux the file's directory is watched with inotify (the file itself
+    would be lost when an editor replaces it by renaming a new file over
+    it) and fileno() returns a descriptor that becomes readable on changes,
+    for the UI's event loop to watch. Elsewhere fileno() is None and the
+    caller has to call changed() every so often. Either way changed() has
+    the final say, comparing the file's size, mtime and inode with the last
+    time it was called.
+    """
+
+    def __init__(self, path, use_inotify=True):
+        self.path = os.path.abspath(path)
+        self._fd = None
+        libc = _load_inotify() if use_inotify else None
+        if libc is not None:
+            fd = libc.inotify_init1(_IN_NONBLOCK | _IN_CLOEXEC)
+            if fd >= 0:
+                mask = _IN_MODIFY | _IN_CLOSE_WRITE | _IN_MOVED_TO | _IN_CREATE | _IN_DELETE
+                directory = os.path.dirname(self.path).encode('utf-8')
+                if libc.inotify_add_watch(fd, directory, mask) >= 0:
+                    self._fd = fd
+                else:
+                    os.close(fd)
+        self._state = self._stat()
+
+    def fileno(self):
+        return self._fd
+
+    def _stat(self):
+        try:
+            st = os.stat(self.path)
+        except OSError:
+            return None
+        return (st.st_size, getattr(st, 'st_mtime_ns', st.st_mtime), st.st_ino)
+
+    def read_events(self):
+        """
+        Drain the pending inotify events, True if any of them was about the
+        watched file.
+        """
+        if self._fd is None:
+            return False
+        name = os.path.basename(self.path).encode('utf-8')
+        found = False
+        while True:
+            try:
+                data = os.read(self._fd, 64 * 1024)
+            except OSError as e:
+                if e.errno in (errno.EAGAIN, errno.EWOULDBLOCK):
+                    return found
+                raise
+            offset = 0
+            while offset + _event_header.size <= len(data):
+                wd, mask, cookie, length = _event_header.unpack_from(data, offset)
+                offset += _event_header.size
+                if data[offset:offset + length].rstrip(b'\0') == name:
+                    found = True
+                offset += length
+
+    def changed(self):
+        """True if the file changed since the last call (or since the watcher was made)."""
+        state = self._stat()
+        if state == self._state:
+            return False
+        self._state = state
+        return True
+
+    def close(self):
+        """Release the inotify descriptor, if any; fileno() is None afterwards."""
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None